@@ -0,0 +1,208 @@
+import zlib
+from collections.abc import Collection
+from typing import Protocol
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class Decompressor(Protocol):
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        """Decodes data, raising DecompressedTooLargeError past max_length bytes."""
+        ...
+
+    def flush(self) -> bytes: ...
+
+
+class UnsupportedEncodingError(ValueError):
+    pass
+
+
+class DecompressedTooLargeError(ValueError):
+    pass
+
+
+# Raised by the decoders on a truncated or corrupt body
+CORRUPT_STREAM_ERRORS: tuple[type[Exception], ...] = (zlib.error,)
+if zstandard is not None:
+    CORRUPT_STREAM_ERRORS += (zstandard.ZstdError,)
+
+
+def _too_large(max_length: int) -> DecompressedTooLargeError:
+    return DecompressedTooLargeError(f"Decompressed body exceeds {max_length} bytes")
+
+
+class _Identity:
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        if len(data) > max_length:
+            raise _too_large(max_length)
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Gzip:
+    def __init__(self) -> None:
+        self._decoder = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        # zlib stops at max_length and keeps the rest in unconsumed_tail,
+        # so a zip bomb is never inflated past the limit
+        out = self._decoder.decompress(data, max_length + 1)
+        if len(out) > max_length:
+            raise _too_large(max_length)
+        return out
+
+    def flush(self) -> bytes:
+        return self._decoder.flush()
+
+
+class _CappedSink:
+    """Collects a zstd stream_writer's output and aborts it past a limit."""
+
+    def __init__(self) -> None:
+        self.limit = 0
+        self.size = 0
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.limit:
+            raise _too_large(self.limit)
+        self.chunks.append(data)
+        return len(data)
+
+    def reset(self, max_length: int) -> None:
+        self.limit, self.size, self.chunks = max_length, 0, []
+
+
+class _Zstd:
+    # zstandard's decompressobj() has no output limit; its stream_writer hands
+    # output over in write_size pieces, which the sink can refuse
+    def __init__(self) -> None:
+        self._sink = _CappedSink()
+        self._writer = zstandard.ZstdDecompressor().stream_writer(
+            self._sink, write_size=64 * 1024
+        )
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        self._sink.reset(max_length)
+        self._writer.write(data)
+        return b"".join(self._sink.chunks)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def stream_decompressor(content_encoding: str | None) -> Decompressor:
+    """
+    Incremental decoder for a request body's Content-Encoding.
+    zstd needs the optional 'zstandard' package; without it the encoding is
+    reported as unsupported rather than failing at import time.
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return _Identity()
+    if encoding in ("gzip", "x-gzip"):
+        return _Gzip()
+    if encoding == "zstd" and zstandard is not None:
+        return _Zstd()
+    raise UnsupportedEncodingError(f"Unsupported Content-Encoding: {encoding}")
+
+
+class DecompressionMiddleware:
+    """
+    Lets clients such as gcore send gzip/zstd request bodies.
+    The body is decoded before routing, so FastAPI only ever parses plain
+    bytes and a bad encoding is answered with 415/400/413 instead of a
+    generic body error. Paths in streaming_paths decode their own stream.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_bytes: int,
+        streaming_paths: Collection[str] = (),
+    ) -> None:
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.streaming_paths = streaming_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.streaming_paths:
+            await self.app(scope, receive, send)
+            return
+        encoding = Headers(scope=scope).get("content-encoding")
+        if encoding is None or encoding.strip().lower() == "identity":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            body = await self._read_body(stream_decompressor(encoding), receive)
+        except UnsupportedEncodingError as e:
+            error = JSONResponse(
+                {"detail": str(e)}, status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        except DecompressedTooLargeError as e:
+            error = JSONResponse(
+                {"detail": str(e)}, status_code=status.HTTP_413_CONTENT_TOO_LARGE
+            )
+        except CORRUPT_STREAM_ERRORS as e:
+            error = JSONResponse(
+                {"detail": f"Malformed compressed body: {e}"},
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        else:
+            await self.app(self._decoded_scope(scope, body), _replay(body, receive), send)
+            return
+        await error(scope, receive, send)
+
+    async def _read_body(self, decompressor: Decompressor, receive: Receive) -> bytes:
+        chunks: list[bytes] = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                # http.disconnect: the app will see it on its own next receive()
+                break
+            more_body = message.get("more_body", False)
+            data = message.get("body", b"")
+            if data:
+                chunk = decompressor.decompress(data, self.max_body_bytes - size)
+                size += len(chunk)
+                chunks.append(chunk)
+        chunks.append(decompressor.flush())
+        return b"".join(chunks)
+
+    @staticmethod
+    def _decoded_scope(scope: Scope, body: bytes) -> Scope:
+        headers = [
+            (name, value)
+            for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        return {**scope, "headers": headers}
+
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    """A receive callable that delivers the decoded body, then defers to the client."""
+    sent = False
+
+    async def decoded_receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return decoded_receive
@@ -24,6 +24,17 @@ class Settings(BaseSettings):
 
     GLIA_DEV_MODE: bool = False
 
+    # Group commit: rows from concurrent /ingest requests share one transaction
+    INGEST_MAX_BATCH_ROWS: int = 5000
+    INGEST_LINGER_MS: int = 5
+
+    # /ingest/stream: rows per writer hand-off and the longest accepted NDJSON line
+    INGEST_STREAM_CHUNK_ROWS: int = 1000
+    INGEST_STREAM_MAX_LINE_BYTES: int = 1024 * 1024
+
+    # Largest gzip/zstd request body once decoded (per received chunk on /ingest/stream)
+    MAX_DECOMPRESSED_BODY_BYTES: int = 64 * 1024 * 1024
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     @computed_field
@@ -0,0 +1,266 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
+from typing import Annotated, Any
+from uuid import UUID
+
+from fastapi import Depends
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.compression import Decompressor
+from backend.config import logger, settings
+from backend.database import AsyncSessionLocal
+from backend.models import IngestItemError, IngestStreamAck, Job, JobCreate
+
+
+class PayloadTooLargeError(ValueError):
+    pass
+
+
+def _validate_item(index: int, item: Any) -> JobCreate | IngestItemError:
+    try:
+        return JobCreate.model_validate(item)
+    except ValidationError as e:
+        run_id = item.get("run_id") if isinstance(item, dict) else None
+        detail = "; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc']) or 'item'}: {err['msg']}"
+            for err in e.errors()
+        )
+        return IngestItemError(
+            index=index,
+            run_id=str(run_id) if run_id is not None else None,
+            detail=detail,
+        )
+
+
+def validate_items(
+    items: Sequence[Any],
+) -> tuple[list[JobCreate], list[IngestItemError]]:
+    """
+    Validates a batch item by item, so one malformed job from a buggy client
+    only rejects itself instead of the whole batch.
+    """
+    valid: list[JobCreate] = []
+    rejected: list[IngestItemError] = []
+    for index, item in enumerate(items):
+        result = _validate_item(index, item)
+        if isinstance(result, IngestItemError):
+            rejected.append(result)
+        else:
+            valid.append(result)
+    return valid, rejected
+
+
+# ON CONFLICT is dialect specific; SQLite backs the test suite
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+async def bulk_insert_jobs(
+    session: AsyncSession, telemetry_in: Sequence[JobCreate]
+) -> dict[UUID, int]:
+    """
+    Persists a batch of jobs with a single multi-row INSERT ... RETURNING.
+    SQLAlchemy's insertmanyvalues pages very large batches, so the statement
+    count stays O(1) per batch instead of one refresh round trip per row.
+
+    Rows whose run_id already exists are skipped by ON CONFLICT DO NOTHING,
+    which makes re-sending a whole batch after a timeout safe and cheap.
+    Returns run_id -> id for the rows actually inserted.
+    """
+    if not telemetry_in:
+        return {}
+
+    dialect_insert = _DIALECT_INSERTS[session.get_bind().dialect.name]
+    rows = [t.model_dump() for t in telemetry_in]
+    statement = (
+        dialect_insert(Job)
+        .on_conflict_do_nothing(index_elements=[Job.run_id])
+        .returning(Job.run_id, Job.id)
+    )
+    result = await session.execute(statement, rows)
+    return {run_id: job_id for run_id, job_id in result}
+
+
+@dataclass
+class _PendingWrite:
+    jobs: Sequence[JobCreate]
+    future: asyncio.Future[dict[UUID, int]]
+
+
+class IngestWriter:
+    """
+    Group-commit writer for /ingest.
+    Requests hand their validated rows to a single writer task, which coalesces
+    everything that arrives within one tick (bounded by max_batch_rows and
+    linger_ms) into one transaction. Each request is acknowledged only once
+    the transaction holding its rows has committed.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        max_batch_rows: int,
+        linger_ms: int,
+    ) -> None:
+        self._session_factory = session_factory
+        self._max_batch_rows = max(1, max_batch_rows)
+        self._linger_sec = max(0, linger_ms) / 1000
+        self._queue: asyncio.Queue[_PendingWrite | None] = asyncio.Queue()
+        self._task: asyncio.Task[None] | None = None
+
+    async def submit(self, jobs: Sequence[JobCreate]) -> dict[UUID, int]:
+        if not jobs:
+            return {}
+
+        # Started lazily so the writer binds to the loop that serves requests
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        future: asyncio.Future[dict[UUID, int]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._queue.put_nowait(_PendingWrite(jobs, future))
+        return await future
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        # The sentinel lets requests already in the queue reach the database first
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+            pending = [first]
+            rows = len(first.jobs)
+            deadline = loop.time() + self._linger_sec
+
+            while rows < self._max_batch_rows:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except TimeoutError:
+                    break
+                if item is None:
+                    await self._commit(pending)
+                    return
+                pending.append(item)
+                rows += len(item.jobs)
+
+            await self._commit(pending)
+
+    async def _commit(self, pending: list[_PendingWrite]) -> None:
+        try:
+            async with self._session_factory() as session:
+                inserted = await bulk_insert_jobs(
+                    session, [job for p in pending for job in p.jobs]
+                )
+                await session.commit()
+        except Exception as e:
+            if len(pending) == 1:
+                if not pending[0].future.done():
+                    pending[0].future.set_exception(e)
+                return
+            # Retry each request on its own so one bad batch does not fail its neighbours
+            logger.warning(
+                f"Group commit of {len(pending)} requests failed, isolating: {e}"
+            )
+            for p in pending:
+                await self._commit([p])
+            return
+
+        for p in pending:
+            if not p.future.done():
+                p.future.set_result(
+                    {j.run_id: inserted[j.run_id] for j in p.jobs if j.run_id in inserted}
+                )
+
+
+async def ingest_ndjson_stream(
+    body: AsyncIterator[bytes],
+    decompressor: Decompressor,
+    writer: IngestWriter,
+    chunk_rows: int,
+    max_line_bytes: int,
+    max_decoded_chunk_bytes: int,
+    max_reported_errors: int = 100,
+) -> IngestStreamAck:
+    """
+    Consumes a newline-delimited JSON body as it arrives.
+    Rows are validated line by line and handed to the writer every chunk_rows,
+    so memory stays bounded by one chunk whatever the payload size.
+    No single received chunk may decode to more than max_decoded_chunk_bytes.
+    """
+    ack = IngestStreamAck()
+    pending: list[JobCreate] = []
+    tail = b""
+
+    async def flush_pending() -> None:
+        nonlocal pending
+        batch, pending = pending, []
+        inserted = await writer.submit(batch)
+        ack.count += len(inserted)
+        ack.duplicates += len(batch) - len(inserted)
+
+    def handle_line(line: bytes) -> None:
+        if not line.strip():
+            return
+        index = ack.received
+        ack.received += 1
+        try:
+            result = _validate_item(index, json.loads(line))
+        except ValueError as e:
+            result = IngestItemError(index=index, detail=f"invalid JSON: {e}")
+
+        if isinstance(result, IngestItemError):
+            ack.rejected_count += 1
+            if len(ack.rejected) < max_reported_errors:
+                ack.rejected.append(result)
+        else:
+            pending.append(result)
+
+    async def handle_data(data: bytes) -> None:
+        nonlocal tail
+        lines = (tail + data).split(b"\n")
+        tail = lines.pop()
+        if len(tail) > max_line_bytes:
+            raise PayloadTooLargeError(f"NDJSON line exceeds {max_line_bytes} bytes")
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise PayloadTooLargeError(f"NDJSON line exceeds {max_line_bytes} bytes")
+            handle_line(line)
+            if len(pending) >= chunk_rows:
+                await flush_pending()
+
+    async for chunk in body:
+        if chunk:
+            await handle_data(decompressor.decompress(chunk, max_decoded_chunk_bytes))
+    await handle_data(decompressor.flush())
+    handle_line(tail)
+    if pending:
+        await flush_pending()
+    return ack
+
+
+ingest_writer = IngestWriter(
+    AsyncSessionLocal,
+    max_batch_rows=settings.INGEST_MAX_BATCH_ROWS,
+    linger_ms=settings.INGEST_LINGER_MS,
+)
+
+
+def get_ingest_writer() -> IngestWriter:
+    return ingest_writer
+
+
+IngestWriterDep = Annotated[IngestWriter, Depends(get_ingest_writer)]
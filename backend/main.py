@@ -1,17 +1,33 @@
 from contextlib import asynccontextmanager
+from typing import Annotated, Any
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import Body, FastAPI, HTTPException, Request, Response, status
 from sqlalchemy.engine import Result
 from sqlmodel import select, text
 
+from backend.compression import (
+    CORRUPT_STREAM_ERRORS,
+    DecompressedTooLargeError,
+    DecompressionMiddleware,
+    UnsupportedEncodingError,
+    stream_decompressor,
+)
 from backend.config import logger, settings
 from backend.database import SessionDep, engine
-from backend.models import Job, JobCreate, JobRead
+from backend.ingest import (
+    IngestWriterDep,
+    PayloadTooLargeError,
+    ingest_ndjson_stream,
+    ingest_writer,
+    validate_items,
+)
+from backend.models import IngestAck, IngestStreamAck, Job, JobRead
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     yield
+    await ingest_writer.close()
     await engine.dispose()
 
 
@@ -21,6 +37,12 @@ app = FastAPI(
     version=settings.VERSION,
     lifespan=lifespan,
 )
+# Request bodies may arrive gzip/zstd encoded (see gcore CORE_COMPRESSION)
+app.add_middleware(
+    DecompressionMiddleware,
+    max_body_bytes=settings.MAX_DECOMPRESSED_BODY_BYTES,
+    streaming_paths={"/ingest/stream"},
+)
 
 
 @app.get("/health/live")
@@ -40,27 +62,107 @@ async def readiness_check(session: SessionDep):
         ) from e
 
 
-@app.post("/ingest", response_model=list[JobRead], status_code=status.HTTP_201_CREATED)
+@app.post(
+    "/ingest",
+    response_model=IngestAck | list[JobRead],
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def ingest_telemetry(
-    telemetry_in: list[JobCreate],
-    session: SessionDep,
+    items: Annotated[list[Any], Body()],
+    writer: IngestWriterDep,
+    response: Response,
+    echo: bool = False,
 ):
+    """
+    Machine clients get a lightweight ack by default.
+    Pass ?echo=true to get every newly persisted row back as JobRead (201).
+    Jobs whose run_id is already stored are skipped and reported as duplicates.
+    Items are validated one by one: valid jobs are persisted and the invalid
+    ones are listed under 'rejected' with a 207 Multi-Status.
+    """
+    telemetry_in, rejected = validate_items(items)
+    if rejected:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+
     try:
-        job_instances = [Job.model_validate(t) for t in telemetry_in]
-        session.add_all(job_instances)
-        await session.commit()
-        # Refreshing all might be slow and cause issues if session state is tricky
-        for job in job_instances:
-            await session.refresh(job)
-        return job_instances
+        inserted = await writer.submit(telemetry_in)
     except Exception as e:
-        await session.rollback()
         logger.error(f"Error persisting telemetry: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to persist telemetry data: {str(e)}",
         ) from e
 
+    if echo:
+        if not rejected:
+            response.status_code = status.HTTP_201_CREATED
+        return [
+            JobRead(**job.model_dump(), id=inserted.pop(job.run_id))
+            for job in telemetry_in
+            if job.run_id in inserted
+        ]
+
+    run_ids = list(dict.fromkeys(job.run_id for job in telemetry_in))
+    accepted = [run_id for run_id in run_ids if run_id in inserted]
+    return IngestAck(
+        count=len(accepted),
+        accepted=accepted,
+        duplicates=[run_id for run_id in run_ids if run_id not in inserted],
+        rejected=rejected,
+    )
+
+
+@app.post(
+    "/ingest/stream",
+    response_model=IngestStreamAck,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def ingest_telemetry_stream(
+    request: Request,
+    writer: IngestWriterDep,
+    response: Response,
+):
+    """
+    Newline-delimited JSON ingestion (optionally gzip or zstd encoded).
+    Rows are flushed to Postgres in bounded chunks while the body is still
+    arriving, so memory stays flat for very large batches and backfills.
+    """
+    try:
+        decompressor = stream_decompressor(request.headers.get("content-encoding"))
+    except UnsupportedEncodingError as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e)
+        ) from e
+
+    try:
+        ack = await ingest_ndjson_stream(
+            request.stream(),
+            decompressor,
+            writer,
+            chunk_rows=settings.INGEST_STREAM_CHUNK_ROWS,
+            max_line_bytes=settings.INGEST_STREAM_MAX_LINE_BYTES,
+            max_decoded_chunk_bytes=settings.MAX_DECOMPRESSED_BODY_BYTES,
+        )
+    except (PayloadTooLargeError, DecompressedTooLargeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(e)
+        ) from e
+    except CORRUPT_STREAM_ERRORS as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Malformed compressed body: {e}",
+        ) from e
+    except Exception as e:
+        logger.error(f"Error persisting streamed telemetry: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to persist telemetry data: {str(e)}",
+        ) from e
+
+    if ack.rejected_count:
+        response.status_code = status.HTTP_207_MULTI_STATUS
+    return ack
+
 
 @app.get("/telemetry", response_model=list[JobRead])
 async def list_telemetry(session: SessionDep, limit: int = 100):
@@ -0,0 +1,28 @@
+"""add job resources
+
+Revision ID: 3b8e5f1c2d47
+Revises: 69d02211b0b2
+Create Date: 2026-10-18 10:12:41.302117
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e5f1c2d47'
+down_revision: str | Sequence[str] | None = '69d02211b0b2'
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('resources', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'resources')
@@ -35,6 +35,11 @@ class JobBase(SQLModel):
         sa_column=Column(JSONB),
         description="Strictly for user-defined tags and business logic context",
     )
+    resources: dict[str, Any] | None = Field(
+        default=None,
+        sa_column=Column(JSONB(none_as_null=True), nullable=True),
+        description="Per-job peak RSS, CPU/RSS time series and I/O counters, when sampled",
+    )
 
 
 class Job(JobBase, table=True):
@@ -48,3 +53,32 @@ class JobCreate(JobBase):
 
 class JobRead(JobBase):
     id: int
+
+
+class IngestItemError(SQLModel):
+    index: int = Field(description="Position of the item in the submitted batch")
+    run_id: str | None = None
+    detail: str
+
+
+class IngestAck(SQLModel):
+    """Default /ingest response: counts and ids only, no echo of the rows."""
+
+    count: int
+    accepted: list[UUID]
+    # Already stored under this run_id (e.g. a retried batch); safe to treat as sent
+    duplicates: list[UUID] = Field(default_factory=list)
+    rejected: list[IngestItemError] = Field(default_factory=list)
+
+
+class IngestStreamAck(SQLModel):
+    """
+    /ingest/stream response. Only counts are returned so the reply stays small
+    however many rows were streamed; rejected lists the first few failures.
+    """
+
+    received: int = 0
+    count: int = 0
+    duplicates: int = 0
+    rejected_count: int = 0
+    rejected: list[IngestItemError] = Field(default_factory=list)
@@ -1,5 +1,9 @@
+import asyncio
+import gzip
+import json
 from datetime import UTC, datetime
-from uuid import uuid4
+from unittest.mock import patch
+from uuid import UUID, uuid4
 
 import pytest
 import pytest_asyncio
@@ -11,6 +15,7 @@ from sqlmodel import SQLModel, delete
 
 from backend.config import settings
 from backend.database import engine, get_db_session
+from backend.ingest import IngestWriter, bulk_insert_jobs, get_ingest_writer
 from backend.main import app
 from backend.models import Job
 
@@ -45,41 +50,47 @@ async def ingest_cleanup_client():
         await conn.run_sync(SQLModel.metadata.create_all)
         
     job_ids = [str(uuid4()) for _ in range(3)]
+    writer = IngestWriter(TestSessionLocal, max_batch_rows=5000, linger_ms=5)
+    app.dependency_overrides[get_ingest_writer] = lambda: writer
     async with AsyncClient(
         transport=ASGITransport(app=app),
         base_url="http://testserver",
     ) as client:
         yield client, job_ids
 
+    await writer.close()
+    del app.dependency_overrides[get_ingest_writer]
+
     print(f"\n[CLEANUP] Removing Job IDs: {job_ids}")
     async with test_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.drop_all)
 
 
+def make_job_payload(run_id: str, i: int = 0) -> dict:
+    return {
+        "run_id": run_id,
+        "program_name": f"pytest_runner_{i}.py",
+        "user_name": "ci_bot",
+        "hostname": "test-host",
+        "os_info": "Linux-Test",
+        "script_sha256": f"hash_{i}",
+        "started_at": datetime.now(UTC).isoformat(),
+        "ended_at": datetime.now(UTC).isoformat(),
+        "wall_time_ms": 100,
+        "exit_code_int": 0,
+        "cpu_time_sec": 1.2,
+        "cpu_percent": 15.5,
+        "max_rss_kb": 262144,
+        "meta": {"batch_index": i},
+    }
+
+
 @pytest.mark.asyncio
 async def test_ingest(ingest_cleanup_client):
     client, job_ids = ingest_cleanup_client
-    payloads = [
-        {
-            "run_id": job_id,
-            "program_name": f"pytest_runner_{i}.py",
-            "user_name": "ci_bot",
-            "hostname": "test-host",
-            "os_info": "Linux-Test",
-            "script_sha256": f"hash_{i}",
-            "started_at": datetime.now(UTC).isoformat(),
-            "ended_at": datetime.now(UTC).isoformat(),
-            "wall_time_ms": 100,
-            "exit_code_int": 0,
-            "cpu_time_sec": 1.2,
-            "cpu_percent": 15.5,
-            "max_rss_kb": 262144,
-            "meta": {"batch_index": i},
-        }
-        for i, job_id in enumerate(job_ids)
-    ]
+    payloads = [make_job_payload(job_id, i) for i, job_id in enumerate(job_ids)]
 
-    response = await client.post("/ingest", json=payloads)
+    response = await client.post("/ingest", params={"echo": True}, json=payloads)
 
     assert response.status_code == 201
     data = response.json()
@@ -87,3 +98,302 @@ async def test_ingest(ingest_cleanup_client):
     assert len(data) == 3
     for i, job in enumerate(data):
         assert job["run_id"] == job_ids[i]
+
+
+@pytest.mark.asyncio
+async def test_ingest_ack_mode_is_default(ingest_cleanup_client):
+    client, job_ids = ingest_cleanup_client
+    payloads = [make_job_payload(job_id, i) for i, job_id in enumerate(job_ids)]
+
+    response = await client.post("/ingest", json=payloads)
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "count": 3,
+        "accepted": job_ids,
+        "duplicates": [],
+        "rejected": [],
+    }
+
+
+@pytest.mark.asyncio
+async def test_ingest_bulk_batch_assigns_ids(ingest_cleanup_client):
+    client, _ = ingest_cleanup_client
+    payloads = [
+        {**make_job_payload(str(uuid4()), i), "argv": ["--index", str(i)]}
+        for i in range(1500)
+    ]
+
+    response = await client.post("/ingest", params={"echo": True}, json=payloads)
+
+    assert response.status_code == 201
+    data = response.json()
+    assert len(data) == 1500
+    assert len({job["id"] for job in data}) == 1500
+    assert [job["run_id"] for job in data] == [p["run_id"] for p in payloads]
+    assert data[42]["argv"] == ["--index", "42"]
+
+
+@pytest.mark.asyncio
+async def test_ingest_stores_sampled_resources(ingest_cleanup_client):
+    client, job_ids = ingest_cleanup_client
+    resources = {
+        "interval_sec": 0.5,
+        "samples": 2,
+        "peak_rss_kb": 524288,
+        "series": [[0.5, 98.0, 262144], [1.0, 12.5, 524288]],
+    }
+    payloads = [
+        {**make_job_payload(job_ids[0], 0), "resources": resources},
+        make_job_payload(job_ids[1], 1),
+    ]
+
+    response = await client.post("/ingest", params={"echo": True}, json=payloads)
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data[0]["resources"] == resources
+    # Jobs from clients without sampling leave the column NULL
+    assert data[1]["resources"] is None
+
+
+@pytest.mark.asyncio
+async def test_ingest_group_commit_coalesces_requests(ingest_cleanup_client):
+    client, _ = ingest_cleanup_client
+    payloads = [[make_job_payload(str(uuid4()), i)] for i in range(20)]
+
+    with patch(
+        "backend.ingest.bulk_insert_jobs", wraps=bulk_insert_jobs
+    ) as spy_insert:
+        responses = await asyncio.gather(
+            *(client.post("/ingest", json=p) for p in payloads)
+        )
+
+    assert all(r.status_code == 202 for r in responses)
+    for response, payload in zip(responses, payloads, strict=True):
+        assert response.json()["accepted"] == [payload[0]["run_id"]]
+    assert spy_insert.call_count < len(payloads)
+
+
+@pytest.mark.asyncio
+async def test_ingest_group_commit_isolates_failing_request(ingest_cleanup_client):
+    client, job_ids = ingest_cleanup_client
+    poisoned = UUID(job_ids[0])
+
+    async def failing_insert(session, telemetry_in):
+        if any(t.run_id == poisoned for t in telemetry_in):
+            raise RuntimeError("poisoned batch")
+        return await bulk_insert_jobs(session, telemetry_in)
+
+    with patch("backend.ingest.bulk_insert_jobs", side_effect=failing_insert):
+        good, bad = await asyncio.gather(
+            client.post("/ingest", json=[make_job_payload(job_ids[1])]),
+            client.post("/ingest", json=[make_job_payload(job_ids[0])]),
+        )
+
+    assert good.status_code == 202
+    assert bad.status_code == 500
+
+
+@pytest.mark.asyncio
+async def test_ingest_retried_batch_skips_duplicates(ingest_cleanup_client):
+    client, job_ids = ingest_cleanup_client
+    first = await client.post("/ingest", json=[make_job_payload(job_ids[0])])
+    assert first.status_code == 202
+
+    payloads = [make_job_payload(job_id, i) for i, job_id in enumerate(job_ids)]
+    retry = await client.post("/ingest", json=payloads)
+
+    assert retry.status_code == 202
+    assert retry.json() == {
+        "count": 2,
+        "accepted": job_ids[1:],
+        "duplicates": job_ids[:1],
+        "rejected": [],
+    }
+
+    listing = await client.get("/telemetry")
+    assert sorted(j["run_id"] for j in listing.json()) == sorted(job_ids)
+
+
+@pytest.mark.asyncio
+async def test_ingest_partial_success_rejects_only_bad_items(ingest_cleanup_client):
+    client, job_ids = ingest_cleanup_client
+    broken = make_job_payload(job_ids[1], 1)
+    del broken["started_at"]
+    payloads = [make_job_payload(job_ids[0], 0), broken, "not-a-job"]
+
+    response = await client.post("/ingest", json=payloads)
+
+    assert response.status_code == 207
+    ack = response.json()
+    assert ack["count"] == 1
+    assert ack["accepted"] == [job_ids[0]]
+    assert [r["index"] for r in ack["rejected"]] == [1, 2]
+    assert ack["rejected"][0]["run_id"] == job_ids[1]
+    assert "started_at" in ack["rejected"][0]["detail"]
+    assert ack["rejected"][1]["run_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_ingest_stream_ndjson_in_chunks(ingest_cleanup_client):
+    client, _ = ingest_cleanup_client
+    run_ids = [str(uuid4()) for _ in range(25)]
+    body = "\n".join(json.dumps(make_job_payload(r, i)) for i, r in enumerate(run_ids))
+
+    with patch.object(settings, "INGEST_STREAM_CHUNK_ROWS", 10):
+        response = await client.post(
+            "/ingest/stream",
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "received": 25,
+        "count": 25,
+        "duplicates": 0,
+        "rejected_count": 0,
+        "rejected": [],
+    }
+
+
+@pytest.mark.asyncio
+async def test_ingest_stream_rejects_oversized_complete_line(ingest_cleanup_client):
+    client, _ = ingest_cleanup_client
+    # Only the tail after the last newline used to be measured
+    body = "x" * 200 + "\n{}"
+
+    with patch.object(settings, "INGEST_STREAM_MAX_LINE_BYTES", 100):
+        response = await client.post(
+            "/ingest/stream",
+            content=body.encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_ingest_stream_gzip_reports_bad_lines(ingest_cleanup_client):
+    client, job_ids = ingest_cleanup_client
+    lines = [
+        json.dumps(make_job_payload(job_ids[0])),
+        "{not json",
+        json.dumps(make_job_payload(job_ids[1])),
+        "",
+    ]
+    body = gzip.compress("\n".join(lines).encode())
+
+    response = await client.post(
+        "/ingest/stream",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 207
+    ack = response.json()
+    assert ack["received"] == 3
+    assert ack["count"] == 2
+    assert ack["rejected_count"] == 1
+    assert ack["rejected"][0]["index"] == 1
+    assert ack["rejected"][0]["detail"].startswith("invalid JSON")
+
+
+@pytest.mark.asyncio
+async def test_ingest_stream_zstd(ingest_cleanup_client):
+    zstandard = pytest.importorskip("zstandard")
+    client, job_ids = ingest_cleanup_client
+    body = "\n".join(json.dumps(make_job_payload(j, i)) for i, j in enumerate(job_ids))
+
+    response = await client.post(
+        "/ingest/stream",
+        content=zstandard.ZstdCompressor().compress(body.encode()),
+        headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "zstd"},
+    )
+
+    assert response.status_code == 202
+    assert response.json()["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_ingest_stream_unsupported_encoding(ingest_cleanup_client):
+    client, _ = ingest_cleanup_client
+    response = await client.post(
+        "/ingest/stream", content=b"", headers={"Content-Encoding": "br"}
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_ingest_accepts_gzip_encoded_batch(ingest_cleanup_client):
+    client, job_ids = ingest_cleanup_client
+    payloads = [make_job_payload(job_id, i) for i, job_id in enumerate(job_ids)]
+
+    response = await client.post(
+        "/ingest",
+        content=gzip.compress(json.dumps(payloads).encode()),
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 202
+    assert response.json()["accepted"] == job_ids
+
+
+@pytest.mark.asyncio
+async def test_ingest_rejects_corrupt_gzip_body(ingest_cleanup_client):
+    client, _ = ingest_cleanup_client
+    response = await client.post(
+        "/ingest",
+        content=b"definitely not gzip",
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Malformed compressed body")
+
+
+@pytest.mark.asyncio
+async def test_ingest_unsupported_encoding(ingest_cleanup_client):
+    client, _ = ingest_cleanup_client
+    response = await client.post(
+        "/ingest",
+        content=b"[]",
+        headers={"Content-Type": "application/json", "Content-Encoding": "br"},
+    )
+    assert response.status_code == 415
+    assert response.json()["detail"] == "Unsupported Content-Encoding: br"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/ingest", "/ingest/stream"])
+async def test_ingest_rejects_gzip_bomb(ingest_cleanup_client, path):
+    client, _ = ingest_cleanup_client
+    # ~64 kB on the wire, one byte over the limit once inflated
+    bomb = gzip.compress(b" " * (settings.MAX_DECOMPRESSED_BODY_BYTES + 1))
+
+    response = await client.post(
+        path,
+        content=bomb,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Decompressed body exceeds")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/ingest", "/ingest/stream"])
+async def test_ingest_rejects_zstd_bomb(ingest_cleanup_client, path):
+    zstandard = pytest.importorskip("zstandard")
+    client, _ = ingest_cleanup_client
+    bomb = zstandard.ZstdCompressor().compress(
+        b" " * (settings.MAX_DECOMPRESSED_BODY_BYTES + 1)
+    )
+
+    response = await client.post(
+        path,
+        content=bomb,
+        headers={"Content-Type": "application/json", "Content-Encoding": "zstd"},
+    )
+
+    assert response.status_code == 413
@@ -1,28 +1,203 @@
-from typing import final
+from collections.abc import Iterable
+from typing import Any, final
 
 @final
-class PushResult:
+class FlushSummary:
     """
-    Result object returned by the Rust push_telemetry function.
-    Contains the raw HTTP status code and response body.
+    Outcome of the telemetry sent since the previous flush.
+    failed_jobs were lost; spilled_jobs were written to the on-disk spool
+    (CORE_SPOOL_DIR) and will be replayed once the backend is reachable.
     """
 
-    status: int
-    body: str
+    failed_jobs: int
+    spilled_jobs: int
+    common_errors: list[tuple[str, int]]
 
-def push_telemetry(json_payload: str, url: str, timeout: float) -> PushResult:
+@final
+class CoreStats:
+    """
+    Live counters of the gcore worker, totals since the client started.
+    Histograms are (upper bound, count) pairs ending with an inf bucket;
+    batch_jobs counts jobs per batch, send_latency_ms the backend round trip.
+    """
+
+    queue_depth: int
+    queue_limit: int
+    enqueued_jobs: int
+    sent_jobs: int
+    dropped_jobs: int
+    evicted_jobs: int
+    sampled_out_jobs: int
+    blocked_enqueues: int
+    block_timeouts: int
+    failed_jobs: int
+    spilled_jobs: int
+    batches_sent: int
+    bytes_sent: int
+    batch_jobs: list[tuple[float, int]]
+    send_latency_ms: list[tuple[float, int]]
+    last_error: str | None
+
+class ProcessMetrics:
     """
-    Pushes the JSON payload to the Glia backend.
+    One reading of this process from /proc/self and its cgroup v2 files.
+    CPU times are seconds since the process started; I/O counters are None
+    where /proc/self/io is unreadable, cgroup_* fields outside cgroup v2.
+    """
+
+    user_sec: float
+    system_sec: float
+    # Children that have exited and been waited for, as RUSAGE_CHILDREN
+    children_user_sec: float
+    children_system_sec: float
+    rss_kb: int
+    peak_rss_kb: int
+    read_bytes: int | None
+    write_bytes: int | None
+    read_count: int | None
+    write_count: int | None
+    cgroup_cpu_usage_sec: float | None
+    cgroup_nr_throttled: int | None
+    cgroup_throttled_sec: float | None
+    cgroup_memory_current_kb: int | None
+    cgroup_memory_peak_kb: int | None
+
+def enqueue_to_background(json_payload: str, url: str, timeout: float = 1.0) -> None:
+    """
+    Queues a JSON list of JobMetrics for the background gcore worker.
 
     Args:
-        json_payload: A valid JSON string representing JobMetrics.
+        json_payload: A JSON list string of job records.
         url: The URL of the Glia backend ingestion endpoint, defined in GLIA_API_URL (e.g., http://host:8000/ingest).
         timeout: Request timeout in seconds.
 
+    Raises:
+        RuntimeError: If the queue is full and the overflow policy refused the payload.
+    """
+    ...
+
+def enqueue_record(record: dict[str, Any], url: str, timeout: float = 1.0) -> None:
+    """
+    Queues one job record for the background gcore worker, serialized in Rust
+    straight into the batch body. datetime/date values become ISO 8601 strings;
+    other non-JSON objects (e.g. UUID) are converted with str().
+
+    Raises:
+        RuntimeError: If the queue is full and the overflow policy refused the record.
+    """
+    ...
+
+def enqueue_many(records: Iterable[dict[str, Any]], url: str, timeout: float = 1.0) -> int:
+    """
+    Queues many job records in one call, e.g. sub-jobs reported by a scheduler.
+    They reach the worker as one message per batch rather than one per job.
+
     Returns:
-        PushResult: An object containing .status (int) and .body (str).
+        int: The number of records queued.
+
+    Raises:
+        RuntimeError: If the queue filled up; the message says how many were queued.
+    """
+    ...
+
+def configure(**settings: Any) -> None:
+    """
+    Changes settings of the running gcore worker; new batches use them at once.
+
+    Settings: queue_limit, batch_size, batch_max_bytes, linger_ms, min_linger_ms,
+    adaptive_batching, max_in_flight, overflow_policy ("drop-newest",
+    "drop-oldest", "block", "spill", "sample"), overflow_block_ms, sample_rate,
+    compression ("none", "gzip", "zstd"),
+    compression_min_bytes, max_retries, retry_base_ms, retry_max_ms,
+    breaker_threshold, breaker_cooldown_ms, flush_timeout_sec.
+    Each defaults to its CORE_* environment variable.
+
+    Raises:
+        ValueError: If a setting is unknown or invalid; nothing is changed then.
+    """
+    ...
+
+def flush_queue() -> FlushSummary:
+    """
+    Blocks until queued telemetry has been sent (bounded by flush_timeout_sec)
+    and returns the summary of what was lost or spooled.
+    """
+    ...
+
+def stats() -> CoreStats:
+    """
+    Returns the worker's live counters. Unlike flush_queue, nothing is reset,
+    so it can be polled, e.g. to see queue_depth approach queue_limit.
+    """
+    ...
+
+def process_metrics() -> ProcessMetrics:
+    """
+    Reads CPU times, RSS, I/O and cgroup counters of this process directly
+    from /proc, without psutil. Hot paths should use the narrow readers
+    below, which read only the file they need.
+
+    Raises:
+        OSError: Off Linux, or if /proc cannot be read.
+    """
+    ...
+
+def process_cpu_times() -> tuple[float, float, float, float]:
+    """
+    Returns (user, system, children user, children system) CPU seconds,
+    from one read of /proc/self/stat.
+
+    Raises:
+        OSError: Off Linux.
+    """
+    ...
+
+def process_memory() -> tuple[int, int]:
+    """
+    Returns (RSS, peak RSS) in kB, from one read of /proc/self/status.
 
     Raises:
-        ConnectionError: If the network is unreachable (DNS, Refused, Timeout).
+        OSError: Off Linux.
     """
     ...
+
+def process_usage() -> tuple[float, float, int]:
+    """
+    Returns (user CPU seconds, system CPU seconds, RSS in kB): what a
+    resource sampler needs per tick, in one call.
+
+    Raises:
+        OSError: Off Linux.
+    """
+    ...
+
+def process_io() -> tuple[int, int, int, int]:
+    """
+    Returns (read calls, write calls, read bytes, write bytes) from
+    /proc/self/io.
+
+    Raises:
+        OSError: Off Linux, or where /proc/self/io is not readable.
+    """
+    ...
+
+def process_cgroup() -> tuple[float, int, float, int | None, int | None] | None:
+    """
+    Returns (CPU seconds, nr_throttled, throttled seconds, memory kB, peak
+    memory kB) of this process's cgroup v2, or None outside one.
+    """
+    ...
+
+def process_tree_rss() -> tuple[int, int]:
+    """
+    Returns (RSS in kB, process count) summed over this process and all its
+    live descendants, from one scan of /proc.
+
+    Raises:
+        OSError: Off Linux.
+    """
+    ...
+
+def trigger_panic() -> None:
+    """Raises RuntimeError from a deliberate Rust panic, to test FFI safety."""
+    ...
@@ -0,0 +1,391 @@
+//! Node-local agent mode.
+//!
+//! With CORE_AGENT_SOCKET set, a gcore client hands its queued jobs to a
+//! long-lived agent over a Unix domain socket instead of POSTing them itself.
+//! The agent feeds every job into a single GliaClient, so jobs from many
+//! short-lived processes share batches and one pooled connection to the backend.
+//!
+//! The wire format is newline-delimited `SpoolRecord`s, one client batch per line.
+//! The agent answers every frame with one `Ack` line once it has queued the
+//! batch, or refused it because its own queue is full. A connection carries
+//! one frame at a time, so a busy agent slows its clients down; a client's
+//! concurrent sends each take a connection from a small pool.
+
+use crate::gcore::{env_or, GliaClient, WorkerConfig};
+use crate::spool::SpoolRecord;
+use serde::{Deserialize, Serialize};
+use std::fmt;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex};
+use std::time::Duration;
+use tokio::io::{AsyncBufReadExt, AsyncWriteExt, BufReader};
+use tokio::net::{UnixListener, UnixStream};
+
+/// The agent's answer to one frame.
+#[derive(Serialize, Deserialize, Debug, PartialEq)]
+struct Ack {
+    queued: bool,
+    #[serde(default, skip_serializing_if = "Option::is_none")]
+    error: Option<String>,
+}
+
+/// Idle connections kept for later sends; more than the worker's
+/// `max_in_flight` are rarely needed.
+const MAX_IDLE_CONNECTIONS: usize = 8;
+
+/// Why a batch did not make it into the agent's queue.
+#[derive(Debug)]
+pub enum ForwardError {
+    /// The agent never got the frame, or refused it: the caller still owns the batch
+    NotDelivered(std::io::Error),
+    /// The frame was written but no ack came back, so the agent may have
+    /// queued it; sending it anywhere else could duplicate the batch
+    Unacknowledged(std::io::Error),
+}
+
+impl fmt::Display for ForwardError {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        match self {
+            ForwardError::NotDelivered(e) => write!(f, "{}", e),
+            ForwardError::Unacknowledged(e) => write!(f, "no ack from the agent: {}", e),
+        }
+    }
+}
+
+type Connection = BufReader<UnixStream>;
+
+/// Client side of the socket, shared by a worker's concurrent send tasks.
+pub struct AgentLink {
+    path: PathBuf,
+    idle: Mutex<Vec<Connection>>,
+}
+
+impl AgentLink {
+    pub fn new(path: impl Into<PathBuf>) -> Self {
+        Self {
+            path: path.into(),
+            idle: Mutex::new(Vec::new()),
+        }
+    }
+
+    async fn connect(&self) -> std::io::Result<Connection> {
+        Ok(BufReader::new(UnixStream::connect(&self.path).await?))
+    }
+
+    /// Writes a batch to the agent as one frame and waits for its ack.
+    /// A pooled connection that turns out to be broken (e.g. the agent
+    /// restarted) is replaced once, but only while the frame could not be
+    /// written. Once it is written the frame is never sent again: a missing
+    /// ack is reported as `Unacknowledged`, and everything else as
+    /// `NotDelivered` so the caller can fall back to sending directly.
+    pub async fn forward(&self, batch: &SpoolRecord) -> Result<(), ForwardError> {
+        let mut frame = serde_json::to_vec(batch).map_err(|e| ForwardError::NotDelivered(e.into()))?;
+        frame.push(b'\n');
+        let ack_timeout = Duration::from_secs_f64(batch.timeout_sec.max(0.1));
+
+        let pooled = self.idle.lock().unwrap().pop();
+        let reused = pooled.is_some();
+        let mut connection = match pooled {
+            Some(connection) => connection,
+            None => self.connect().await.map_err(ForwardError::NotDelivered)?,
+        };
+        if let Err(e) = Self::write_frame(&mut connection, &frame, ack_timeout).await {
+            match e {
+                ForwardError::NotDelivered(_) if reused => {
+                    connection = self.connect().await.map_err(ForwardError::NotDelivered)?;
+                    Self::write_frame(&mut connection, &frame, ack_timeout).await?;
+                }
+                e => return Err(e),
+            }
+        }
+
+        // From here on the frame is the agent's; its connection is only
+        // pooled again once the ack has kept it in step
+        let ack = match tokio::time::timeout(ack_timeout, Self::read_ack(&mut connection)).await {
+            Ok(Ok(ack)) => ack,
+            Ok(Err(e)) => return Err(ForwardError::Unacknowledged(e)),
+            Err(_) => {
+                return Err(ForwardError::Unacknowledged(std::io::Error::new(
+                    std::io::ErrorKind::TimedOut,
+                    format!("none within {:?}", ack_timeout),
+                )));
+            }
+        };
+        {
+            let mut idle = self.idle.lock().unwrap();
+            if idle.len() < MAX_IDLE_CONNECTIONS {
+                idle.push(connection);
+            }
+        }
+
+        if ack.queued {
+            Ok(())
+        } else {
+            Err(ForwardError::NotDelivered(std::io::Error::new(
+                std::io::ErrorKind::WouldBlock,
+                format!("agent refused the batch: {}", ack.error.unwrap_or_default()),
+            )))
+        }
+    }
+
+    /// A write that fails outright left the agent without a complete frame;
+    /// one that stalls past the timeout may still reach it.
+    async fn write_frame(connection: &mut Connection, frame: &[u8], timeout: Duration) -> Result<(), ForwardError> {
+        match tokio::time::timeout(timeout, connection.write_all(frame)).await {
+            Ok(Ok(())) => Ok(()),
+            Ok(Err(e)) => Err(ForwardError::NotDelivered(e)),
+            Err(_) => Err(ForwardError::Unacknowledged(std::io::Error::new(
+                std::io::ErrorKind::TimedOut,
+                "the agent stopped reading",
+            ))),
+        }
+    }
+
+    async fn read_ack(connection: &mut Connection) -> std::io::Result<Ack> {
+        let mut line = String::new();
+        if connection.read_line(&mut line).await? == 0 {
+            return Err(std::io::Error::new(std::io::ErrorKind::UnexpectedEof, "agent closed the connection"));
+        }
+        serde_json::from_str::<Ack>(&line).map_err(std::io::Error::from)
+    }
+}
+
+/// Accepts client connections until the listener fails.
+pub async fn serve(listener: UnixListener, client: Arc<GliaClient>, debug_mode: bool) {
+    loop {
+        match listener.accept().await {
+            Ok((stream, _)) => {
+                tokio::spawn(handle_connection(stream, Arc::clone(&client), debug_mode));
+            }
+            Err(e) => eprintln!("[CORE] Agent failed to accept a connection: {}", e),
+        }
+    }
+}
+
+async fn handle_connection(stream: UnixStream, client: Arc<GliaClient>, debug_mode: bool) {
+    let (reader, mut writer) = stream.into_split();
+    let mut lines = BufReader::new(reader).lines();
+    while let Ok(Some(line)) = lines.next_line().await {
+        let ack = match serde_json::from_str::<SpoolRecord>(&line) {
+            Ok(record) => {
+                // Re-parsed so a multi-job payload counts as its jobs in the agent's batches
+                let queued = match serde_json::from_str::<serde_json::Value>(&record.body) {
+                    Ok(records) => client.enqueue_record(records, &record.url, record.timeout_sec),
+                    Err(_) => client.enqueue_to_background(&record.body, &record.url, record.timeout_sec),
+                };
+                match queued {
+                    Ok(()) => Ack { queued: true, error: None },
+                    // The client keeps the batch and sends it itself
+                    Err(e) => Ack { queued: false, error: Some(e) },
+                }
+            }
+            // A client that died mid-write leaves a torn last line
+            Err(e) => {
+                if debug_mode {
+                    eprintln!("[CORE DEBUG] Agent skipped a malformed frame: {}", e);
+                }
+                Ack { queued: false, error: Some(format!("malformed frame: {}", e)) }
+            }
+        };
+        let mut answer = serde_json::to_vec(&ack).unwrap_or_default();
+        answer.push(b'\n');
+        if writer.write_all(&answer).await.is_err() {
+            break;
+        }
+    }
+}
+
+/// Runs the agent in the foreground until Ctrl-C / SIGINT, then flushes.
+/// The agent's own client always talks to the backend directly.
+pub fn run_agent(socket_path: &Path) -> std::io::Result<()> {
+    let config = WorkerConfig {
+        agent_socket: None,
+        ..WorkerConfig::from_env()
+    };
+    let debug_mode = config.debug_mode;
+    // The agent absorbs the queues of every process on the node
+    let client = Arc::new(GliaClient::with_config(env_or("CORE_QUEUE_LIMIT", 100_000), config));
+
+    let rt = tokio::runtime::Builder::new_current_thread()
+        .enable_all()
+        .build()?;
+
+    rt.block_on(async {
+        if UnixStream::connect(socket_path).await.is_ok() {
+            return Err(std::io::Error::new(
+                std::io::ErrorKind::AddrInUse,
+                format!("an agent is already listening on {}", socket_path.display()),
+            ));
+        }
+        // Left behind by an agent that did not shut down cleanly
+        let _ = std::fs::remove_file(socket_path);
+
+        let listener = UnixListener::bind(socket_path)?;
+        eprintln!("[CORE] Agent listening on {}", socket_path.display());
+        tokio::select! {
+            _ = serve(listener, Arc::clone(&client), debug_mode) => {}
+            _ = tokio::signal::ctrl_c() => {}
+        }
+        Ok(())
+    })?;
+
+    let _ = std::fs::remove_file(socket_path);
+    let summary = client.flush();
+    if summary.failed_jobs > 0 {
+        eprintln!("[CORE] Agent exited with {} failed jobs", summary.failed_jobs);
+    }
+    Ok(())
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::sync::atomic::{AtomicUsize, Ordering};
+    use std::time::Duration;
+
+    #[tokio::test]
+    async fn test_jobs_from_several_clients_share_one_batch() {
+        let socket = std::env::temp_dir().join(format!("gcore-agent-{}.sock", std::process::id()));
+        let _ = std::fs::remove_file(&socket);
+
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+        let mock = server.mock("POST", "/ingest")
+            .match_body(mockito::Matcher::JsonString(r#"[{"id": 1}, {"id": 2}]"#.to_string()))
+            .expect(1)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        let agent = Arc::new(GliaClient::with_config(100, WorkerConfig {
+            agent_socket: None,
+            ..WorkerConfig::from_env()
+        }));
+        let listener = UnixListener::bind(&socket).unwrap();
+        tokio::spawn(serve(listener, Arc::clone(&agent), false));
+
+        // Two "processes", each with its own link to the agent
+        for id in 1..=2 {
+            let link = AgentLink::new(&socket);
+            link.forward(&SpoolRecord {
+                url: url.clone(),
+                timeout_sec: 1.0,
+                jobs: 1,
+                body: format!("[{{\"id\": {}}}]", id),
+            }).await.unwrap();
+            // Keep the arrival order deterministic
+            tokio::time::sleep(Duration::from_millis(50)).await;
+        }
+
+        let summary = tokio::task::spawn_blocking(move || agent.flush()).await.unwrap();
+        assert_eq!(summary.failed_jobs, 0);
+        mock.assert_async().await;
+        let _ = std::fs::remove_file(&socket);
+    }
+
+    #[tokio::test]
+    async fn test_full_agent_refuses_instead_of_dropping() {
+        let socket = std::env::temp_dir().join(format!("gcore-agent-full-{}.sock", std::process::id()));
+        let _ = std::fs::remove_file(&socket);
+
+        let agent = Arc::new(GliaClient::with_config(0, WorkerConfig {
+            agent_socket: None,
+            ..WorkerConfig::from_env()
+        }));
+        let listener = UnixListener::bind(&socket).unwrap();
+        tokio::spawn(serve(listener, Arc::clone(&agent), false));
+
+        let link = AgentLink::new(&socket);
+        let batch = SpoolRecord {
+            url: "http://test-host".to_string(),
+            timeout_sec: 1.0,
+            jobs: 1,
+            body: "[{}]".to_string(),
+        };
+        let error = link.forward(&batch).await.unwrap_err();
+        assert!(matches!(&error, ForwardError::NotDelivered(e) if e.kind() == std::io::ErrorKind::WouldBlock));
+        assert!(error.to_string().contains("no available capacity"));
+        let _ = std::fs::remove_file(&socket);
+    }
+
+    /// Counts connections and frames; acks each frame after `ack_after`, or never.
+    async fn fake_agent(listener: UnixListener, ack_after: Option<Duration>, connections: Arc<AtomicUsize>, frames: Arc<AtomicUsize>) {
+        while let Ok((stream, _)) = listener.accept().await {
+            connections.fetch_add(1, Ordering::SeqCst);
+            let frames = Arc::clone(&frames);
+            tokio::spawn(async move {
+                let (reader, mut writer) = stream.into_split();
+                let mut lines = BufReader::new(reader).lines();
+                while let Ok(Some(_)) = lines.next_line().await {
+                    frames.fetch_add(1, Ordering::SeqCst);
+                    let Some(delay) = ack_after else { continue };
+                    tokio::time::sleep(delay).await;
+                    let _ = writer.write_all(b"{\"queued\": true}\n").await;
+                }
+            });
+        }
+    }
+
+    fn test_batch(timeout_sec: f64) -> SpoolRecord {
+        SpoolRecord {
+            url: "http://test-host".to_string(),
+            timeout_sec,
+            jobs: 1,
+            body: "[{}]".to_string(),
+        }
+    }
+
+    #[tokio::test]
+    async fn test_concurrent_sends_use_pooled_connections() {
+        let socket = std::env::temp_dir().join(format!("gcore-agent-pool-{}.sock", std::process::id()));
+        let _ = std::fs::remove_file(&socket);
+        let (connections, frames) = (Arc::new(AtomicUsize::new(0)), Arc::new(AtomicUsize::new(0)));
+        let listener = UnixListener::bind(&socket).unwrap();
+        tokio::spawn(fake_agent(listener, Some(Duration::from_millis(200)), Arc::clone(&connections), Arc::clone(&frames)));
+
+        let link = AgentLink::new(&socket);
+        let batch = test_batch(1.0);
+        let started = std::time::Instant::now();
+        let (first, second) = tokio::join!(link.forward(&batch), link.forward(&batch));
+        assert!(first.is_ok() && second.is_ok());
+        // Both round trips ran side by side rather than one after the other
+        assert!(started.elapsed() < Duration::from_millis(380));
+        assert_eq!(connections.load(Ordering::SeqCst), 2);
+
+        // Later sends reuse an idle connection
+        link.forward(&batch).await.unwrap();
+        assert_eq!(connections.load(Ordering::SeqCst), 2);
+        assert_eq!(frames.load(Ordering::SeqCst), 3);
+        let _ = std::fs::remove_file(&socket);
+    }
+
+    #[tokio::test]
+    async fn test_unacknowledged_frame_is_not_resent() {
+        let socket = std::env::temp_dir().join(format!("gcore-agent-mute-{}.sock", std::process::id()));
+        let _ = std::fs::remove_file(&socket);
+        let (connections, frames) = (Arc::new(AtomicUsize::new(0)), Arc::new(AtomicUsize::new(0)));
+        let listener = UnixListener::bind(&socket).unwrap();
+        tokio::spawn(fake_agent(listener, None, Arc::clone(&connections), Arc::clone(&frames)));
+
+        let link = AgentLink::new(&socket);
+        let error = link.forward(&test_batch(0.2)).await.unwrap_err();
+        assert!(matches!(error, ForwardError::Unacknowledged(_)));
+
+        tokio::time::sleep(Duration::from_millis(50)).await;
+        assert_eq!(frames.load(Ordering::SeqCst), 1);
+        assert_eq!(connections.load(Ordering::SeqCst), 1);
+        let _ = std::fs::remove_file(&socket);
+    }
+
+    #[tokio::test]
+    async fn test_forward_fails_without_agent() {
+        let link = AgentLink::new("/nonexistent/glia-agent.sock");
+        let batch = SpoolRecord {
+            url: "http://test-host".to_string(),
+            timeout_sec: 1.0,
+            jobs: 1,
+            body: "[{}]".to_string(),
+        };
+        assert!(link.forward(&batch).await.is_err());
+    }
+}
@@ -0,0 +1,247 @@
+use crate::gcore::{Payload, WorkerConfig};
+use crate::spool::SpoolRecord;
+use std::time::Duration;
+use tokio::time::Instant;
+
+/// Where a batch goes. Jobs for different backends, or with different
+/// request timeouts, are never merged into one body.
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
+pub struct Destination {
+    pub url: String,
+    timeout_bits: u64,
+}
+
+impl Destination {
+    pub fn new(url: &str, timeout_sec: f64) -> Self {
+        Self {
+            url: url.to_string(),
+            timeout_bits: timeout_sec.to_bits(),
+        }
+    }
+
+    pub fn timeout_sec(&self) -> f64 {
+        f64::from_bits(self.timeout_bits)
+    }
+}
+
+/// A batch being assembled by the worker.
+/// The JSON array body grows as jobs arrive, so its size in bytes is always known.
+pub struct PendingBatch {
+    pub url: String,
+    pub timeout_sec: f64,
+    pub jobs: usize,
+    pub started: Instant,
+    body: Vec<u8>,
+}
+
+impl PendingBatch {
+    pub fn new(destination: &Destination) -> Self {
+        let mut body = Vec::with_capacity(4096);
+        body.push(b'[');
+        Self {
+            url: destination.url.clone(),
+            timeout_sec: destination.timeout_sec(),
+            jobs: 0,
+            started: Instant::now(),
+            body,
+        }
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.jobs == 0
+    }
+
+    /// Size of the finished body, closing bracket included.
+    pub fn body_len(&self) -> usize {
+        self.body.len() + 1
+    }
+
+    /// Appends a payload's jobs. Returns false, leaving the batch untouched, if
+    /// that would take a non-empty batch past `max_bytes`; a single oversized
+    /// payload is still accepted into an empty batch.
+    pub fn push(&mut self, payload: &Payload, max_bytes: usize) -> bool {
+        let mark = self.body.len();
+        if self.jobs > 0 {
+            self.body.push(b',');
+        }
+        if !payload.write_items(&mut self.body) {
+            self.body.truncate(mark);
+            return true;
+        }
+        if self.jobs > 0 && self.body_len() > max_bytes {
+            self.body.truncate(mark);
+            return false;
+        }
+        self.jobs += payload.jobs();
+        true
+    }
+
+    pub fn finish(mut self) -> SpoolRecord {
+        self.body.push(b']');
+        SpoolRecord {
+            url: self.url,
+            timeout_sec: self.timeout_sec,
+            jobs: self.jobs,
+            // Always valid UTF-8: it is assembled from &str and serde_json output
+            body: String::from_utf8(self.body).unwrap_or_default(),
+        }
+    }
+}
+
+const MIN_ADAPTIVE_JOBS: usize = 16;
+
+/// Picks the job target and linger for the next batch.
+/// Static mode uses CORE_BATCH_SIZE and CORE_BATCH_TIMEOUT_MS as they are.
+/// Adaptive mode lingers about as long as the backend takes to answer, since
+/// waiting while the previous batch is in flight costs no extra latency, and
+/// grows the job target while producers keep the queue backed up.
+pub struct BatchTuner {
+    adaptive: bool,
+    max_jobs: usize,
+    min_linger: Duration,
+    max_linger: Duration,
+    target_jobs: usize,
+    latency_ewma: Option<Duration>,
+}
+
+impl BatchTuner {
+    pub fn new(config: &WorkerConfig) -> Self {
+        let max_jobs = config.batch_size.max(1);
+        Self {
+            adaptive: config.adaptive_batching,
+            max_jobs,
+            min_linger: Duration::from_millis(config.batch_min_linger_ms.min(config.batch_linger_ms)),
+            max_linger: Duration::from_millis(config.batch_linger_ms),
+            target_jobs: if config.adaptive_batching { MIN_ADAPTIVE_JOBS.min(max_jobs) } else { max_jobs },
+            latency_ewma: None,
+        }
+    }
+
+    /// Takes new limits from `GliaClient::configure`, keeping the latency
+    /// observed so far.
+    pub fn reconfigure(&mut self, config: &WorkerConfig) {
+        let latency_ewma = self.latency_ewma;
+        *self = Self::new(config);
+        self.latency_ewma = latency_ewma;
+    }
+
+    pub fn target_jobs(&self) -> usize {
+        self.target_jobs
+    }
+
+    pub fn linger(&self) -> Duration {
+        if !self.adaptive {
+            return self.max_linger;
+        }
+        self.latency_ewma
+            .unwrap_or(self.min_linger)
+            .clamp(self.min_linger, self.max_linger)
+    }
+
+    /// Records how long a batch took to be acknowledged by the backend.
+    pub fn observe_latency(&mut self, latency: Duration) {
+        self.latency_ewma = Some(match self.latency_ewma {
+            None => latency,
+            Some(average) => average.mul_f64(0.8) + latency.mul_f64(0.2),
+        });
+    }
+
+    /// `full` is true when the batch hit its job or byte limit rather than its
+    /// linger; `backlog` is the number of messages still waiting in the queue.
+    pub fn on_dispatch(&mut self, jobs: usize, full: bool, backlog: usize) {
+        if !self.adaptive {
+            return;
+        }
+        let min_jobs = MIN_ADAPTIVE_JOBS.min(self.max_jobs);
+        if full && backlog > 0 {
+            // Producers outpace the batches: spread each request over more jobs
+            self.target_jobs = (self.target_jobs * 2).min(self.max_jobs);
+        } else if !full {
+            // The linger expired first: follow the actual arrival rate
+            self.target_jobs = (jobs * 2).clamp(min_jobs, self.max_jobs);
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn config(adaptive: bool) -> WorkerConfig {
+        WorkerConfig {
+            batch_size: 1000,
+            batch_linger_ms: 2000,
+            batch_min_linger_ms: 5,
+            adaptive_batching: adaptive,
+            ..WorkerConfig::from_env()
+        }
+    }
+
+    #[test]
+    fn test_batch_respects_byte_cap() {
+        let record = Payload::Json("[{\"id\": 1}]".to_string());
+        let mut batch = PendingBatch::new(&Destination::new("http://test-host", 1.0));
+
+        // Three 9-byte jobs, two commas and the brackets make 31 bytes
+        assert!(batch.push(&record, 31));
+        assert!(batch.push(&record, 31));
+        assert!(batch.push(&record, 31));
+        assert!(!batch.push(&record, 31));
+        assert_eq!(batch.jobs, 3);
+        assert_eq!(batch.body_len(), 31);
+
+        let finished = batch.finish();
+        assert_eq!(finished.body, "[{\"id\": 1},{\"id\": 1},{\"id\": 1}]");
+        assert_eq!(finished.jobs, 3);
+    }
+
+    #[test]
+    fn test_oversized_job_is_sent_alone() {
+        let mut batch = PendingBatch::new(&Destination::new("http://test-host", 1.0));
+        assert!(batch.push(&Payload::Json("[{\"big\": \"xxxxxxxx\"}]".to_string()), 8));
+        assert_eq!(batch.jobs, 1);
+    }
+
+    #[test]
+    fn test_destinations_differ_by_url_and_timeout() {
+        let primary = Destination::new("http://primary/ingest", 1.0);
+        assert_eq!(primary, Destination::new("http://primary/ingest", 1.0));
+        assert_ne!(primary, Destination::new("http://mirror/ingest", 1.0));
+        assert_ne!(primary, Destination::new("http://primary/ingest", 5.0));
+        assert_eq!(PendingBatch::new(&primary).timeout_sec, 1.0);
+    }
+
+    #[test]
+    fn test_static_tuner_uses_configured_limits() {
+        let mut tuner = BatchTuner::new(&config(false));
+        tuner.observe_latency(Duration::from_millis(30));
+        tuner.on_dispatch(1000, true, 500);
+        assert_eq!(tuner.target_jobs(), 1000);
+        assert_eq!(tuner.linger(), Duration::from_millis(2000));
+    }
+
+    #[test]
+    fn test_adaptive_tuner_follows_load_and_latency() {
+        let mut tuner = BatchTuner::new(&config(true));
+        assert_eq!(tuner.target_jobs(), MIN_ADAPTIVE_JOBS);
+        assert_eq!(tuner.linger(), Duration::from_millis(5));
+
+        // A backed-up queue grows the batches up to CORE_BATCH_SIZE
+        for _ in 0..10 {
+            tuner.on_dispatch(tuner.target_jobs(), true, 100);
+        }
+        assert_eq!(tuner.target_jobs(), 1000);
+
+        // A trickle shrinks them back towards the arrival rate
+        tuner.on_dispatch(3, false, 0);
+        assert_eq!(tuner.target_jobs(), MIN_ADAPTIVE_JOBS);
+
+        // Linger tracks backend latency within its bounds
+        tuner.observe_latency(Duration::from_millis(40));
+        assert_eq!(tuner.linger(), Duration::from_millis(40));
+        for _ in 0..50 {
+            tuner.observe_latency(Duration::from_secs(10));
+        }
+        assert_eq!(tuner.linger(), Duration::from_millis(2000));
+    }
+}
@@ -0,0 +1,23 @@
+//! Per-host agent that batches telemetry from every gcore client on the node.
+//!
+//! Usage: glia-agent [SOCKET_PATH]
+//! The socket defaults to CORE_AGENT_SOCKET, then /tmp/glia-agent.sock.
+//! Clients opt in by exporting the same CORE_AGENT_SOCKET.
+
+use std::path::PathBuf;
+use std::process::ExitCode;
+
+fn main() -> ExitCode {
+    let socket = std::env::args()
+        .nth(1)
+        .or_else(|| std::env::var("CORE_AGENT_SOCKET").ok())
+        .unwrap_or_else(|| "/tmp/glia-agent.sock".to_string());
+
+    match gcore::agent::run_agent(&PathBuf::from(socket)) {
+        Ok(()) => ExitCode::SUCCESS,
+        Err(e) => {
+            eprintln!("[CORE] Agent failed: {}", e);
+            ExitCode::FAILURE
+        }
+    }
+}
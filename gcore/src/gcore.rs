@@ -1,45 +1,678 @@
 use std::time::Duration;
-use tokio::sync::mpsc::{channel, Sender};
+use tokio::sync::mpsc::{self, unbounded_channel, UnboundedSender};
+use tokio::sync::Notify;
+use tokio::task::JoinSet;
 use std::thread;
 use std::env;
 use std::sync::atomic::{AtomicUsize, Ordering};
 use std::collections::HashMap;
-use std::sync::{Arc, Mutex};
+use std::sync::{Arc, Mutex, RwLock};
+use std::io::Write;
+use std::str::FromStr;
+use serde::Deserialize;
+use serde_json::Value;
+use crate::retry::{CircuitBreaker, RetryPolicy};
+use crate::spool::{Spool, SpoolRecord};
+#[cfg(unix)]
+use crate::agent::{AgentLink, ForwardError};
+use crate::batching::{BatchTuner, Destination, PendingBatch};
+use crate::overflow::{OverflowPolicy, QueueGate};
+use crate::stats::{CoreStats, Histogram, BATCH_JOBS_BOUNDS, LATENCY_MS_BOUNDS};
+use tokio::time::Instant;
 
+/// One queued job, either as the JSON text clients used to hand over or as a
+/// structured record that is serialized straight into the batch body.
+pub enum Payload {
+    /// A JSON list string like "[{...}]"
+    Json(String),
+    Record(serde_json::Value),
+    /// Many records handed over in one FFI call and one channel message
+    Records(Vec<serde_json::Value>),
+}
+
+impl Payload {
+    /// Appends this payload's items to the JSON array being built in `body`,
+    /// without brackets. Returns false if there was nothing to write.
+    pub(crate) fn write_items(&self, body: &mut Vec<u8>) -> bool {
+        match self {
+            Payload::Json(json) => {
+                let stripped = json.trim().trim_start_matches('[').trim_end_matches(']');
+                body.extend_from_slice(stripped.as_bytes());
+                !stripped.is_empty()
+            }
+            Payload::Records(items) => {
+                for (i, item) in items.iter().enumerate() {
+                    if i > 0 {
+                        body.push(b',');
+                    }
+                    if serde_json::to_writer(&mut *body, item).is_err() {
+                        return false;
+                    }
+                }
+                !items.is_empty()
+            }
+            Payload::Record(record) => serde_json::to_writer(&mut *body, record).is_ok(),
+        }
+    }
+
+    /// The payload as a standalone JSON list, for the spool and the agent.
+    pub fn to_json_list(&self) -> String {
+        match self {
+            Payload::Json(json) => json.clone(),
+            Payload::Record(record) => format!("[{}]", record),
+            Payload::Records(items) => serde_json::to_string(items).unwrap_or_default(),
+        }
+    }
+
+    /// Number of jobs this payload counts for in batching and stats.
+    /// A JSON string is one job, as the clients have always sent it.
+    pub fn jobs(&self) -> usize {
+        match self {
+            Payload::Records(items) => items.len(),
+            _ => 1,
+        }
+    }
+}
+
+/// A job waiting in the worker's queue.
+pub struct QueuedJob {
+    payload: Payload,
+    url: String,
+    timeout_sec: f64,
+}
+
+/// Overflowing jobs that may wait for the worker's spool writer under the
+/// spill policy. Past that, disk cannot keep up and new jobs are refused.
+const SPILL_BACKLOG: usize = 64;
+
+/// Control messages for the worker. Jobs themselves wait in the bounded
+/// `QueueGate`; the worker is woken through `GliaClient::wake` to take them.
 pub enum TelemetryMessage {
-    Data {
-        payload: String,
-        url: String,
-        timeout_sec: f64,
-    },
     Flush(std::sync::mpsc::Sender<()>),
+    /// Settings from `GliaClient::configure`; batches already in flight keep the old ones
+    Configure(Arc<WorkerConfig>),
+}
+
+/// Content-Encoding applied to batch bodies above `compression_min_bytes`.
+/// Batches of near-identical job records compress extremely well.
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Compression {
+    None,
+    Gzip,
+    Zstd,
+}
+
+impl FromStr for Compression {
+    type Err = String;
+
+    fn from_str(s: &str) -> Result<Self, Self::Err> {
+        match s.trim().to_lowercase().as_str() {
+            "none" | "identity" | "" => Ok(Compression::None),
+            "gzip" => Ok(Compression::Gzip),
+            "zstd" => Ok(Compression::Zstd),
+            other => Err(format!("Unknown compression '{}'", other)),
+        }
+    }
+}
+
+impl Compression {
+    fn content_encoding(&self) -> Option<&'static str> {
+        match self {
+            Compression::None => None,
+            Compression::Gzip => Some("gzip"),
+            Compression::Zstd => Some("zstd"),
+        }
+    }
+
+    fn encode(&self, body: &[u8]) -> std::io::Result<Vec<u8>> {
+        match self {
+            Compression::None => Ok(body.to_vec()),
+            Compression::Gzip => {
+                let mut encoder = flate2::write::GzEncoder::new(
+                    Vec::with_capacity(body.len() / 4),
+                    flate2::Compression::fast(),
+                );
+                encoder.write_all(body)?;
+                encoder.finish()
+            }
+            Compression::Zstd => zstd::encode_all(body, 3),
+        }
+    }
+}
+
+pub(crate) fn env_or<T: FromStr>(key: &str, default: T) -> T {
+    env::var(key)
+        .ok()
+        .and_then(|s| s.parse::<T>().ok())
+        .unwrap_or(default)
+}
+
+/// Worker settings, read from the environment when the worker thread starts
+/// and changed afterwards through `GliaClient::configure`.
+#[derive(Clone, Debug)]
+pub struct WorkerConfig {
+    /// Most jobs per batch; the adaptive tuner stays at or below it
+    pub batch_size: usize,
+    pub batch_max_bytes: usize,
+    pub batch_linger_ms: u64,
+    pub batch_min_linger_ms: u64,
+    pub adaptive_batching: bool,
+    pub compression: Compression,
+    pub compression_min_bytes: usize,
+    pub max_in_flight: usize,
+    pub overflow_policy: OverflowPolicy,
+    pub overflow_block_ms: u64,
+    pub sample_rate: f64,
+    pub retry: RetryPolicy,
+    pub breaker_threshold: usize,
+    pub breaker_cooldown_ms: u64,
+    pub spool_dir: Option<String>,
+    pub spool_max_bytes: u64,
+    pub spool_segment_bytes: u64,
+    pub spool_replay_sec: u64,
+    pub agent_socket: Option<String>,
+    pub flush_timeout_sec: u64,
+    pub debug_mode: bool,
+}
+
+impl WorkerConfig {
+    pub fn from_env() -> Self {
+        Self {
+            batch_size: env_or("CORE_BATCH_SIZE", 1000),
+            batch_max_bytes: env_or("CORE_BATCH_MAX_BYTES", 4 * 1024 * 1024),
+            // CORE_BATCH_TIMEOUT_MS allows sub-second lingers; the whole-second variable still works
+            batch_linger_ms: env_or("CORE_BATCH_TIMEOUT_MS", env_or("CORE_BATCH_TIMEOUT_SEC", 2u64) * 1000),
+            batch_min_linger_ms: env_or("CORE_BATCH_MIN_LINGER_MS", 5),
+            adaptive_batching: env::var("CORE_ADAPTIVE_BATCHING")
+                .map_or(false, |v| matches!(v.trim().to_ascii_lowercase().as_str(), "1" | "true" | "yes" | "on")),
+            compression: env_or("CORE_COMPRESSION", Compression::Gzip),
+            compression_min_bytes: env_or("CORE_COMPRESSION_MIN_BYTES", 4096),
+            max_in_flight: env_or("CORE_MAX_IN_FLIGHT", 4),
+            // A configured spool keeps absorbing overflow, as it always has
+            overflow_policy: env_or(
+                "CORE_OVERFLOW_POLICY",
+                if env::var("CORE_SPOOL_DIR").map_or(false, |d| !d.is_empty()) {
+                    OverflowPolicy::Spill
+                } else {
+                    OverflowPolicy::DropNewest
+                },
+            ),
+            overflow_block_ms: env_or("CORE_OVERFLOW_BLOCK_MS", 100),
+            sample_rate: env_or("CORE_OVERFLOW_SAMPLE_RATE", 0.1),
+            retry: RetryPolicy {
+                max_retries: env_or("CORE_MAX_RETRIES", 2),
+                base_backoff_ms: env_or("CORE_RETRY_BASE_MS", 200),
+                max_backoff_ms: env_or("CORE_RETRY_MAX_MS", 5000),
+            },
+            breaker_threshold: env_or("CORE_BREAKER_THRESHOLD", 3),
+            breaker_cooldown_ms: env_or("CORE_BREAKER_COOLDOWN_MS", 30_000),
+            // The spool is opt-in: undeliverable batches are only kept if a directory is given
+            spool_dir: env::var("CORE_SPOOL_DIR").ok().filter(|d| !d.is_empty()),
+            spool_max_bytes: env_or("CORE_SPOOL_MAX_MB", 256u64) * 1024 * 1024,
+            spool_segment_bytes: env_or("CORE_SPOOL_SEGMENT_MB", 8u64) * 1024 * 1024,
+            spool_replay_sec: env_or("CORE_SPOOL_REPLAY_SEC", 10),
+            // Forward jobs to a node-local agent instead of the backend (see agent.rs)
+            agent_socket: env::var("CORE_AGENT_SOCKET").ok().filter(|p| !p.is_empty()),
+            flush_timeout_sec: env_or("CORE_FLUSH_TIMEOUT_SEC", 5),
+            debug_mode: env::var("CORE_DEBUG").is_ok(),
+        }
+    }
+
+    /// Changes one setting by the name `configure` accepts.
+    /// The spool and agent settings only take effect when a client starts.
+    pub fn apply(&mut self, key: &str, value: &Value) -> Result<(), String> {
+        match key {
+            "batch_size" => self.batch_size = setting_u64(key, value)? as usize,
+            "batch_max_bytes" => self.batch_max_bytes = setting_u64(key, value)? as usize,
+            "linger_ms" => self.batch_linger_ms = setting_u64(key, value)?,
+            "min_linger_ms" => self.batch_min_linger_ms = setting_u64(key, value)?,
+            "adaptive_batching" => {
+                self.adaptive_batching = value.as_bool()
+                    .ok_or_else(|| format!("Setting '{}' must be a boolean, got {}", key, value))?;
+            }
+            "max_in_flight" => self.max_in_flight = setting_u64(key, value)? as usize,
+            "overflow_policy" => {
+                self.overflow_policy = value.as_str()
+                    .ok_or_else(|| format!("Setting '{}' must be a string, got {}", key, value))?
+                    .parse()?;
+            }
+            "overflow_block_ms" => self.overflow_block_ms = setting_u64(key, value)?,
+            "sample_rate" => {
+                self.sample_rate = value.as_f64()
+                    .filter(|rate| (0.0..=1.0).contains(rate))
+                    .ok_or_else(|| format!("Setting '{}' must be a number between 0 and 1, got {}", key, value))?;
+            }
+            "compression" => {
+                self.compression = value.as_str()
+                    .ok_or_else(|| format!("Setting '{}' must be a string, got {}", key, value))?
+                    .parse()?;
+            }
+            "compression_min_bytes" => self.compression_min_bytes = setting_u64(key, value)? as usize,
+            "max_retries" => self.retry.max_retries = setting_u64(key, value)? as u32,
+            "retry_base_ms" => self.retry.base_backoff_ms = setting_u64(key, value)?,
+            "retry_max_ms" => self.retry.max_backoff_ms = setting_u64(key, value)?,
+            "breaker_threshold" => self.breaker_threshold = setting_u64(key, value)? as usize,
+            "breaker_cooldown_ms" => self.breaker_cooldown_ms = setting_u64(key, value)?,
+            "flush_timeout_sec" => self.flush_timeout_sec = setting_u64(key, value)?,
+            other => return Err(format!("Unknown setting '{}'", other)),
+        }
+        Ok(())
+    }
+
+    fn open_spool(&self) -> Option<Arc<Spool>> {
+        let dir = self.spool_dir.as_ref()?;
+        match Spool::open(dir, self.spool_max_bytes, self.spool_segment_bytes) {
+            Ok(spool) => Some(Arc::new(spool)),
+            Err(e) => {
+                eprintln!("[CORE] Spool disabled, cannot open {}: {}", dir, e);
+                None
+            }
+        }
+    }
+}
+
+/// R hands every number over as a double, so whole floats are accepted too.
+fn setting_u64(key: &str, value: &Value) -> Result<u64, String> {
+    value.as_u64()
+        .or_else(|| value.as_f64().filter(|v| *v >= 0.0 && v.fract() == 0.0).map(|v| v as u64))
+        .ok_or_else(|| format!("Setting '{}' must be a non-negative integer, got {}", key, value))
 }
 
 pub struct FlushSummary {
     pub failed_jobs: usize,
+    /// Jobs written to the on-disk spool for later replay instead of being lost
+    pub spilled_jobs: usize,
     pub common_errors: Vec<(String, usize)>,
 }
 
+/// The parts of the backend's /ingest ack that gcore cares about.
+/// On a 207 Multi-Status only the rejected items failed; the rest were stored.
+#[derive(Deserialize)]
+struct IngestAck {
+    #[serde(default)]
+    rejected: Vec<RejectedItem>,
+}
+
+#[derive(Deserialize)]
+struct RejectedItem {
+    #[serde(default)]
+    detail: String,
+}
+
 struct Stats {
+    // Reset by every flush
     failed_count: AtomicUsize,
+    spilled_count: AtomicUsize,
     error_frequency: Mutex<HashMap<String, usize>>,
+    // Totals since client start, for stats()
+    enqueued_total: AtomicUsize,
+    sent_total: AtomicUsize,
+    dropped_total: AtomicUsize,
+    evicted_total: AtomicUsize,
+    sampled_out_total: AtomicUsize,
+    blocked_total: AtomicUsize,
+    block_timeouts: AtomicUsize,
+    failed_total: AtomicUsize,
+    spilled_total: AtomicUsize,
+    batches_sent: AtomicUsize,
+    bytes_sent: AtomicUsize,
+    batch_jobs: Histogram,
+    send_latency_ms: Histogram,
+    last_error: Mutex<Option<String>>,
+}
+
+impl Stats {
+    fn new() -> Self {
+        Self {
+            failed_count: AtomicUsize::new(0),
+            spilled_count: AtomicUsize::new(0),
+            error_frequency: Mutex::new(HashMap::new()),
+            enqueued_total: AtomicUsize::new(0),
+            sent_total: AtomicUsize::new(0),
+            dropped_total: AtomicUsize::new(0),
+            evicted_total: AtomicUsize::new(0),
+            sampled_out_total: AtomicUsize::new(0),
+            blocked_total: AtomicUsize::new(0),
+            block_timeouts: AtomicUsize::new(0),
+            failed_total: AtomicUsize::new(0),
+            spilled_total: AtomicUsize::new(0),
+            batches_sent: AtomicUsize::new(0),
+            bytes_sent: AtomicUsize::new(0),
+            batch_jobs: Histogram::new(BATCH_JOBS_BOUNDS),
+            send_latency_ms: Histogram::new(LATENCY_MS_BOUNDS),
+            last_error: Mutex::new(None),
+        }
+    }
+
+    fn record_failures(&self, failures: Vec<(String, usize)>, batch_jobs: usize, debug_mode: bool) {
+        if failures.is_empty() { return; }
+
+        let mut freq = self.error_frequency.lock().unwrap();
+        for (err, failed_jobs) in failures {
+            self.failed_count.fetch_add(failed_jobs, Ordering::SeqCst);
+            self.failed_total.fetch_add(failed_jobs, Ordering::SeqCst);
+
+            if debug_mode {
+                eprintln!("[CORE DEBUG] Batch push failed ({} of {} jobs): {}", failed_jobs, batch_jobs, err);
+            }
+            *self.last_error.lock().unwrap() = Some(err.clone());
+            *freq.entry(err).or_insert(0) += 1;
+        }
+    }
+
+    fn record_spilled(&self, jobs: usize) {
+        self.spilled_count.fetch_add(jobs, Ordering::SeqCst);
+        self.spilled_total.fetch_add(jobs, Ordering::SeqCst);
+    }
+
+    /// A batch that reached the backend or the agent. Jobs the backend
+    /// rejected are left to `record_failures`.
+    fn record_sent(&self, jobs: usize, failures: &[(String, usize)], bytes: usize, latency: Option<Duration>) {
+        let rejected: usize = failures.iter().map(|(_, failed)| failed).sum();
+        self.sent_total.fetch_add(jobs.saturating_sub(rejected), Ordering::Relaxed);
+        self.batches_sent.fetch_add(1, Ordering::Relaxed);
+        self.bytes_sent.fetch_add(bytes, Ordering::Relaxed);
+        self.batch_jobs.record(jobs as f64);
+        if let Some(latency) = latency {
+            self.send_latency_ms.record(latency.as_secs_f64() * 1000.0);
+        }
+    }
+}
+
+/// Runs spool file I/O on tokio's blocking pool, off the worker's only thread.
+async fn blocking<T: Send + 'static>(
+    f: impl FnOnce() -> std::io::Result<T> + Send + 'static,
+) -> std::io::Result<T> {
+    tokio::task::spawn_blocking(f)
+        .await
+        .unwrap_or_else(|e| Err(std::io::Error::new(std::io::ErrorKind::Other, e)))
+}
+
+/// What one POST attempt tells us about a batch.
+enum SendOutcome {
+    /// The backend answered; the listed (error, failed jobs) pairs are final
+    Answered(Vec<(String, usize)>),
+    /// Connect errors, timeouts, 429 and 5xx: worth another attempt
+    Retryable { error: String, retry_after: Option<Duration> },
+    /// The request could not even be built (e.g. a malformed URL)
+    Failed(String),
+}
+
+/// Where a batch ended up once its retry budget was spent.
+enum Delivery {
+    /// The backend answered; the listed (error, failed jobs) pairs are final
+    Answered(Vec<(String, usize)>),
+    /// The backend stayed unreachable or overloaded; the batch can be spooled
+    Undelivered(String),
+}
+
+/// Everything a send task needs, cheap to clone into each spawned batch.
+#[derive(Clone)]
+struct BatchSender {
+    client: reqwest::Client,
+    stats: Arc<Stats>,
+    config: Arc<WorkerConfig>,
+    /// One breaker per backend URL, so an unreachable mirror does not stall the others
+    breakers: Arc<Mutex<HashMap<String, Arc<CircuitBreaker>>>>,
+    spool: Option<Arc<Spool>>,
+    #[cfg(unix)]
+    agent: Option<Arc<AgentLink>>,
+}
+
+impl BatchSender {
+    fn breaker(&self, url: &str) -> Arc<CircuitBreaker> {
+        let mut breakers = self.breakers.lock().unwrap();
+        let breaker = breakers.entry(url.to_string()).or_insert_with(|| {
+            Arc::new(CircuitBreaker::new(
+                self.config.breaker_threshold,
+                Duration::from_millis(self.config.breaker_cooldown_ms),
+            ))
+        });
+        Arc::clone(breaker)
+    }
+
+    /// Sends one batch and returns how long the backend took to take it,
+    /// which feeds the adaptive batch tuner.
+    async fn send_batch(self, batch: PendingBatch) -> Option<Duration> {
+        if batch.is_empty() { return None; }
+        let record = batch.finish();
+
+        #[cfg(unix)]
+        if let Some(agent) = &self.agent {
+            match agent.forward(&record).await {
+                // Acked: the jobs are in the agent's queue
+                Ok(()) => {
+                    self.stats.record_sent(record.jobs, &[], record.body.len(), None);
+                    return None;
+                }
+                // The agent may have queued it; sending it again would duplicate the batch
+                Err(e @ ForwardError::Unacknowledged(_)) => {
+                    self.stats.record_failures(vec![(e.to_string(), record.jobs)], record.jobs, self.config.debug_mode);
+                    return None;
+                }
+                // Without a running agent, or when its queue is full, the batch goes straight to the backend
+                Err(e) if self.config.debug_mode => {
+                    eprintln!("[CORE DEBUG] Agent unavailable, sending directly: {}", e);
+                }
+                Err(_) => {}
+            }
+        }
+
+        let started = Instant::now();
+        let jobs = record.jobs;
+        let (failures, latency) = match self.deliver(&record).await {
+            Delivery::Answered(failures) => (failures, Some(started.elapsed())),
+            Delivery::Undelivered(error) => (self.spill(record, error).await, None),
+        };
+        self.stats.record_failures(failures, jobs, self.config.debug_mode);
+        latency
+    }
+
+    /// POSTs one merged batch, retrying transient failures per the retry policy.
+    async fn deliver(&self, record: &SpoolRecord) -> Delivery {
+        let config = &self.config;
+        let jobs = record.jobs;
+
+        let mut body = record.body.as_bytes().to_vec();
+        let mut content_encoding = None;
+        if let Some(encoding) = config.compression.content_encoding() {
+            if body.len() >= config.compression_min_bytes {
+                match config.compression.encode(&body) {
+                    Ok(encoded) => {
+                        body = encoded;
+                        content_encoding = Some(encoding);
+                    }
+                    // Fall back to sending the batch uncompressed
+                    Err(e) if config.debug_mode => {
+                        eprintln!("[CORE DEBUG] {} compression failed: {}", encoding, e);
+                    }
+                    Err(_) => {}
+                }
+            }
+        }
+
+        let breaker = self.breaker(&record.url);
+        let mut attempt: u32 = 0;
+        loop {
+            if !breaker.allow() {
+                // Fail fast instead of paying a full timeout per batch while the backend is down
+                return Delivery::Undelivered("Circuit open: backend unavailable".to_string());
+            }
+
+            let mut request = self.client.post(&record.url)
+                .header("Content-Type", "application/json")
+                .timeout(Duration::from_secs_f64(record.timeout_sec));
+            if let Some(encoding) = content_encoding {
+                request = request.header("Content-Encoding", encoding);
+            }
+
+            let attempt_started = Instant::now();
+            match Self::classify(request.body(body.clone()).send().await, jobs).await {
+                SendOutcome::Answered(failures) => {
+                    breaker.record_success();
+                    self.stats.record_sent(jobs, &failures, body.len(), Some(attempt_started.elapsed()));
+                    return Delivery::Answered(failures);
+                }
+                SendOutcome::Failed(error) => return Delivery::Answered(vec![(error, jobs)]),
+                SendOutcome::Retryable { error, retry_after } => {
+                    breaker.record_failure();
+                    if attempt >= config.retry.max_retries {
+                        return Delivery::Undelivered(error);
+                    }
+
+                    let delay = retry_after
+                        .map(|d| d.min(Duration::from_millis(config.retry.max_backoff_ms)))
+                        .unwrap_or_else(|| config.retry.backoff(attempt));
+                    if config.debug_mode {
+                        eprintln!("[CORE DEBUG] Retrying batch ({} jobs) in {:?} after: {}", jobs, delay, error);
+                    }
+                    tokio::time::sleep(delay).await;
+                    attempt += 1;
+                }
+            }
+        }
+    }
+
+    /// Parks an undeliverable batch in the spool; without one, the batch is lost.
+    async fn spill(&self, record: SpoolRecord, error: String) -> Vec<(String, usize)> {
+        let jobs = record.jobs;
+        let Some(spool) = self.spool.clone() else {
+            return vec![(error, jobs)];
+        };
+
+        match blocking(move || spool.append(&record)).await {
+            Ok(()) => {
+                self.stats.record_spilled(jobs);
+                *self.stats.last_error.lock().unwrap() = Some(error.clone());
+                if self.config.debug_mode {
+                    eprintln!("[CORE DEBUG] Spooled batch ({} jobs) after: {}", jobs, error);
+                }
+                Vec::new()
+            }
+            Err(e) => vec![(format!("{} (spool: {})", error, e), jobs)],
+        }
+    }
+
+    /// Writes jobs that overflowed the queue to the spool, off the producer's thread.
+    async fn write_overflow(self, records: Vec<SpoolRecord>) {
+        let Some(spool) = self.spool.clone() else { return };
+        let written = blocking(move || {
+            Ok(records.into_iter().map(|record| (record.jobs, spool.append(&record))).collect::<Vec<_>>())
+        }).await.unwrap_or_default();
+
+        let mut failures = Vec::new();
+        for (jobs, result) in written {
+            match result {
+                Ok(()) => self.stats.record_spilled(jobs),
+                Err(e) => failures.push((format!("no available capacity (spool: {})", e), jobs)),
+            }
+        }
+        let jobs = failures.iter().map(|(_, jobs)| jobs).sum();
+        self.stats.record_failures(failures, jobs, self.config.debug_mode);
+    }
+
+    /// Re-sends spooled batches, oldest segment first, including those left by
+    /// earlier processes. Stops at the first batch the backend still cannot take;
+    /// its segment goes back to the spool for the next round.
+    async fn replay_spool(self) {
+        let Some(spool) = self.spool.clone() else { return };
+
+        let sealing = Arc::clone(&spool);
+        let _ = blocking(move || Ok(sealing.seal())).await;
+        loop {
+            let claiming = Arc::clone(&spool);
+            let claimed = blocking(move || {
+                let Some(segment) = claiming.claim() else { return Ok(None) };
+                let records = segment.records()?;
+                Ok(Some((segment, records)))
+            }).await;
+            let Ok(Some((segment, records))) = claimed else { return };
+
+            let mut delivered = true;
+            for record in records {
+                if self.breaker(&record.url).is_open() {
+                    delivered = false;
+                    break;
+                }
+                match self.deliver(&record).await {
+                    Delivery::Answered(failures) => {
+                        self.stats.record_failures(failures, record.jobs, self.config.debug_mode);
+                    }
+                    Delivery::Undelivered(_) => {
+                        delivered = false;
+                        break;
+                    }
+                }
+            }
+            // Dropping an incomplete segment renames it back for the next round
+            let _ = blocking(move || Ok(if delivered { segment.complete() } else { drop(segment) })).await;
+            if !delivered {
+                return;
+            }
+        }
+    }
+
+    async fn classify(res: Result<reqwest::Response, reqwest::Error>, jobs: usize) -> SendOutcome {
+        match res {
+            Ok(resp) if resp.status() == reqwest::StatusCode::MULTI_STATUS => {
+                // Partial success: only the items the backend rejected are lost
+                SendOutcome::Answered(match resp.json::<IngestAck>().await {
+                    Ok(ack) => ack.rejected
+                        .into_iter()
+                        .map(|item| (format!("Rejected: {}", item.detail), 1))
+                        .collect(),
+                    Err(e) => vec![(format!("HTTP 207 with unreadable body: {}", e), 0)],
+                })
+            }
+            Ok(resp) if resp.status().is_success() => SendOutcome::Answered(Vec::new()),
+            Ok(resp) if resp.status() == reqwest::StatusCode::TOO_MANY_REQUESTS
+                || resp.status().is_server_error() =>
+            {
+                let retry_after = resp.headers()
+                    .get(reqwest::header::RETRY_AFTER)
+                    .and_then(|v| v.to_str().ok())
+                    .and_then(|v| v.trim().parse::<u64>().ok())
+                    .map(Duration::from_secs);
+                SendOutcome::Retryable { error: format!("HTTP {}", resp.status()), retry_after }
+            }
+            // If the whole batch fails, we count ALL jobs in it as failed
+            Ok(resp) => SendOutcome::Answered(vec![(format!("HTTP {}", resp.status()), jobs)]),
+            Err(e) if e.is_builder() => SendOutcome::Failed(e.to_string()),
+            Err(e) => SendOutcome::Retryable { error: e.to_string(), retry_after: None },
+        }
+    }
 }
 
 pub struct GliaClient {
-    sender: Sender<TelemetryMessage>,
+    sender: UnboundedSender<TelemetryMessage>,
     stats: Arc<Stats>,
+    /// Hands overflowing jobs to the worker's spool writer; None without a spool
+    spill: Option<mpsc::Sender<SpoolRecord>>,
+    config: RwLock<Arc<WorkerConfig>>,
+    gate: Arc<QueueGate<QueuedJob>>,
+    wake: Arc<Notify>,
     _worker_handle: thread::JoinHandle<()>,
 }
 
 impl GliaClient {
     pub fn new(limit: usize) -> Self {
-        let (s, mut r) = channel(limit);
-        let stats = Arc::new(Stats {
-            failed_count: AtomicUsize::new(0),
-            error_frequency: Mutex::new(HashMap::new()),
-        });
+        Self::with_config(limit, WorkerConfig::from_env())
+    }
+
+    pub fn with_config(limit: usize, config: WorkerConfig) -> Self {
+        let (s, mut r) = unbounded_channel();
+        let gate = Arc::new(QueueGate::new(limit));
+        let wake = Arc::new(Notify::new());
+        let stats = Arc::new(Stats::new());
+        let config = Arc::new(config);
+        let spool = config.open_spool();
+        let (spill, mut spill_r) = mpsc::channel(SPILL_BACKLOG);
 
         let stats_clone = Arc::clone(&stats);
+        let spool_clone = spool.clone();
+        let gate_clone = Arc::clone(&gate);
+        let wake_clone = Arc::clone(&wake);
+        let worker_config = Arc::clone(&config);
         let handle = thread::spawn(move || {
             let rt = tokio::runtime::Builder::new_current_thread()
                 .enable_all()
@@ -47,214 +680,758 @@ impl GliaClient {
                 .expect("Failed to create tokio runtime");
 
             rt.block_on(async move {
-                let client = reqwest::Client::new();
-                let debug_mode = env::var("CORE_DEBUG").is_ok();
-                
-                let batch_size = env::var("CORE_BATCH_SIZE")
-                    .ok()
-                    .and_then(|s| s.parse::<usize>().ok())
-                    .unwrap_or(1000);
-                
-                let batch_timeout_sec = env::var("CORE_BATCH_TIMEOUT_SEC")
-                    .ok()
-                    .and_then(|s| s.parse::<u64>().ok())
-                    .unwrap_or(2);
-
-                let mut buffer: Vec<(String, String, f64)> = Vec::with_capacity(batch_size);
-                let mut last_send = tokio::time::Instant::now();
+                let config = worker_config;
+                let gate = gate_clone;
+                let wake = wake_clone;
+                let mut sender = BatchSender {
+                    client: reqwest::Client::new(),
+                    stats: stats_clone,
+                    breakers: Arc::new(Mutex::new(HashMap::new())),
+                    config: Arc::clone(&config),
+                    spool: spool_clone,
+                    #[cfg(unix)]
+                    agent: config.agent_socket.as_ref().map(|path| Arc::new(AgentLink::new(path))),
+                };
+
+                let mut tuner = BatchTuner::new(&config);
+                // One batch per destination, each lingering from its own first job
+                let mut pending: HashMap<Destination, PendingBatch> = HashMap::new();
+                let mut in_flight: JoinSet<Option<Duration>> = JoinSet::new();
+                let mut spilling: JoinSet<()> = JoinSet::new();
+                // The first tick fires immediately, picking up what earlier processes left behind
+                let mut replay_tick = tokio::time::interval(Duration::from_secs(config.spool_replay_sec.max(1)));
+                let mut replay: Option<tokio::task::JoinHandle<()>> = None;
 
                 loop {
-                    let timeout = tokio::time::Duration::from_secs(batch_timeout_sec);
-                    let sleep = tokio::time::sleep_until(last_send + timeout);
-                    
+                    let linger = tuner.linger();
+                    let linger_deadline = pending.values().map(|batch| batch.started + linger).min();
+                    let sleep = tokio::time::sleep_until(
+                        linger_deadline.unwrap_or_else(|| Instant::now() + Duration::from_secs(3600)),
+                    );
+
                     tokio::select! {
+                        _ = wake.notified() => {
+                            // Only what is queued now; jobs pushed meanwhile leave a new wake-up
+                            for _ in 0..gate.depth() {
+                                let Some(job) = gate.pop() else { break };
+                                Self::batch_job(&mut pending, &mut in_flight, &sender, &mut tuner, job, gate.depth()).await;
+                            }
+                        }
                         msg = r.recv() => {
                             match msg {
-                                Some(TelemetryMessage::Data { payload, url, timeout_sec }) => {
-                                    buffer.push((payload, url, timeout_sec));
-                                    if buffer.len() >= batch_size {
-                                        Self::send_batch(&client, &mut buffer, &stats_clone, debug_mode).await;
-                                        last_send = tokio::time::Instant::now();
-                                    }
-                                }
                                 Some(TelemetryMessage::Flush(ack_sender)) => {
-                                    if !buffer.is_empty() {
-                                        Self::send_batch(&client, &mut buffer, &stats_clone, debug_mode).await;
+                                    // Everything queued before the flush was requested
+                                    while let Some(job) = gate.pop() {
+                                        Self::batch_job(&mut pending, &mut in_flight, &sender, &mut tuner, job, gate.depth()).await;
+                                    }
+                                    for (_, batch) in pending.drain() {
+                                        Self::dispatch_batch(&mut in_flight, &sender, &mut tuner, batch, false, 0).await;
+                                    }
+                                    // Flush covers every outstanding send, not just the last batch
+                                    while let Some(result) = in_flight.join_next().await {
+                                        if let Ok(Some(latency)) = result {
+                                            tuner.observe_latency(latency);
+                                        }
+                                    }
+                                    Self::spill_pending(&mut spill_r, &mut spilling, &sender);
+                                    while spilling.join_next().await.is_some() {}
+                                    if let Some(spool) = &sender.spool {
+                                        // Spilled batches become replayable by other processes even if we exit now
+                                        let spool = Arc::clone(spool);
+                                        let _ = blocking(move || Ok(spool.seal())).await;
                                     }
                                     let _ = ack_sender.send(());
-                                    last_send = tokio::time::Instant::now();
+                                }
+                                Some(TelemetryMessage::Configure(new_config)) => {
+                                    if new_config.breaker_threshold != sender.config.breaker_threshold
+                                        || new_config.breaker_cooldown_ms != sender.config.breaker_cooldown_ms
+                                    {
+                                        sender.breakers = Arc::new(Mutex::new(HashMap::new()));
+                                    }
+                                    tuner.reconfigure(&new_config);
+                                    sender.config = new_config;
                                 }
                                 None => break, // Channel closed
                             }
                         }
-                        _ = sleep => {
-                            if !buffer.is_empty() {
-                                Self::send_batch(&client, &mut buffer, &stats_clone, debug_mode).await;
+                        // Reap finished sends so their slots free up
+                        Some(result) = in_flight.join_next(), if !in_flight.is_empty() => {
+                            if let Ok(Some(latency)) = result {
+                                tuner.observe_latency(latency);
+                            }
+                        }
+                        Some(record) = spill_r.recv(), if sender.spool.is_some() => {
+                            let records = std::iter::once(record).chain(std::iter::from_fn(|| spill_r.try_recv().ok())).collect();
+                            spilling.spawn(sender.clone().write_overflow(records));
+                        }
+                        Some(_) = spilling.join_next(), if !spilling.is_empty() => {}
+                        _ = replay_tick.tick(), if sender.spool.is_some() => {
+                            // One replay at a time; it runs alongside regular batching
+                            if replay.as_ref().map_or(true, |h| h.is_finished()) {
+                                replay = Some(tokio::spawn(sender.clone().replay_spool()));
+                            }
+                        }
+                        _ = sleep, if linger_deadline.is_some() => {
+                            let now = Instant::now();
+                            let expired: Vec<Destination> = pending.iter()
+                                .filter(|(_, batch)| batch.started + linger <= now)
+                                .map(|(destination, _)| destination.clone())
+                                .collect();
+                            for destination in expired {
+                                let batch = pending.remove(&destination).unwrap();
+                                Self::dispatch_batch(&mut in_flight, &sender, &mut tuner, batch, false, gate.depth()).await;
                             }
-                            last_send = tokio::time::Instant::now();
                         }
                     }
                 }
+
+                while let Some(job) = gate.pop() {
+                    Self::batch_job(&mut pending, &mut in_flight, &sender, &mut tuner, job, 0).await;
+                }
+                for (_, batch) in pending.drain() {
+                    Self::dispatch_batch(&mut in_flight, &sender, &mut tuner, batch, false, 0).await;
+                }
+                while in_flight.join_next().await.is_some() {}
+                Self::spill_pending(&mut spill_r, &mut spilling, &sender);
+                while spilling.join_next().await.is_some() {}
             });
         });
 
         Self {
             sender: s,
             stats,
+            spill: spool.is_some().then_some(spill),
+            config: RwLock::new(config),
+            gate,
+            wake,
             _worker_handle: handle,
         }
     }
 
-    async fn send_batch(
-        client: &reqwest::Client,
-        buffer: &mut Vec<(String, String, f64)>,
-        stats: &Arc<Stats>,
-        debug_mode: bool
-    ) {
-        if buffer.is_empty() { return; }
-
-        // For now, we assume all items in a batch go to the same URL and have same timeout
-        // (This matches current usage where GLIA_PYTHON sends all to one GLIA_API_URL)
-        let (_first_payload, url, timeout_sec) = &buffer[0];
-        let url = url.clone();
-        let timeout_sec = *timeout_sec;
-
-        // Merge payloads. Each payload is a JSON list string like "[{...}]"
-        // We want to merge them into a single list "[{...},{...},...]"
-        let mut merged_payload = String::from("[");
-        for (i, (payload, _, _)) in buffer.iter().enumerate() {
-            let stripped = payload.trim().trim_start_matches('[').trim_end_matches(']');
-            if !stripped.is_empty() {
-                if i > 0 {
-                    merged_payload.push(',');
-                }
-                merged_payload.push_str(stripped);
-            }
-        }
-        merged_payload.push(']');
+    /// Starts writing whatever overflow is still waiting for the spool writer.
+    fn spill_pending(
+        spill_r: &mut mpsc::Receiver<SpoolRecord>,
+        spilling: &mut JoinSet<()>,
+        sender: &BatchSender,
+    ) {
+        let records: Vec<SpoolRecord> = std::iter::from_fn(|| spill_r.try_recv().ok()).collect();
+        if !records.is_empty() {
+            spilling.spawn(sender.clone().write_overflow(records));
+        }
+    }
+
+    /// Adds a job to its destination's pending batch, dispatching the batch
+    /// once it reaches its job or byte target.
+    async fn batch_job(
+        pending: &mut HashMap<Destination, PendingBatch>,
+        in_flight: &mut JoinSet<Option<Duration>>,
+        sender: &BatchSender,
+        tuner: &mut BatchTuner,
+        job: QueuedJob,
+        backlog: usize,
+    ) {
+        let QueuedJob { payload, url, timeout_sec } = job;
+        let destination = Destination::new(&url, timeout_sec);
+        let batch = pending.entry(destination.clone())
+            .or_insert_with(|| PendingBatch::new(&destination));
+        if !batch.push(&payload, sender.config.batch_max_bytes) {
+            // This job would take the batch past the byte cap: ship what we have first
+            let full = std::mem::replace(batch, PendingBatch::new(&destination));
+            batch.push(&payload, sender.config.batch_max_bytes);
+            Self::dispatch_batch(in_flight, sender, tuner, full, true, backlog).await;
+        }
+
+        let reached_limit = pending.get(&destination).map_or(false, |batch| {
+            batch.jobs >= tuner.target_jobs() || batch.body_len() >= sender.config.batch_max_bytes
+        });
+        if reached_limit {
+            let full = pending.remove(&destination).unwrap();
+            Self::dispatch_batch(in_flight, sender, tuner, full, true, backlog).await;
+        }
+    }
+
+    /// Hands a finished batch to a concurrent send task.
+    /// At most `max_in_flight` sends run at once; past that the worker waits
+    /// for a slot, and the queue absorbs new telemetry meanwhile.
+    async fn dispatch_batch(
+        in_flight: &mut JoinSet<Option<Duration>>,
+        sender: &BatchSender,
+        tuner: &mut BatchTuner,
+        batch: PendingBatch,
+        full: bool,
+        backlog: usize,
+    ) {
+        tuner.on_dispatch(batch.jobs, full, backlog);
+        while in_flight.len() >= sender.config.max_in_flight.max(1) {
+            if let Some(Ok(Some(latency))) = in_flight.join_next().await {
+                tuner.observe_latency(latency);
+            }
+        }
+
+        in_flight.spawn(sender.clone().send_batch(batch));
+    }
+
+    /// Changes settings of the running client, e.g. `{"batch_size": 500, "linger_ms": 100}`.
+    /// Keys are those of `WorkerConfig::apply`, plus `queue_limit`. Nothing is
+    /// changed if any setting is invalid; otherwise new batches use the new
+    /// settings right away.
+    pub fn configure(&self, settings: &serde_json::Map<String, Value>) -> Result<(), String> {
+        let mut config = WorkerConfig::clone(&self.config.read().unwrap());
+        let mut queue_limit = None;
+        for (key, value) in settings {
+            match key.as_str() {
+                "queue_limit" => queue_limit = Some(setting_u64(key, value)? as usize),
+                _ => config.apply(key, value)?,
+            }
+        }
+
+        let config = Arc::new(config);
+        *self.config.write().unwrap() = Arc::clone(&config);
+        if let Some(limit) = queue_limit {
+            self.gate.set_limit(limit);
+        }
+        self.sender.send(TelemetryMessage::Configure(config)).map_err(|e| e.to_string())
+    }
+
+    pub fn enqueue_to_background(&self, json_payload: &str, url: &str, timeout_sec: f64) -> Result<(), String> {
+        self.enqueue(Payload::Json(json_payload.to_string()), url, timeout_sec)
+    }
+
+    /// Queues one job record (or a JSON array of them) without a JSON round trip.
+    pub fn enqueue_record(&self, record: serde_json::Value, url: &str, timeout_sec: f64) -> Result<(), String> {
+        match record {
+            serde_json::Value::Array(records) => self.enqueue(Payload::Records(records), url, timeout_sec),
+            record => self.enqueue(Payload::Record(record), url, timeout_sec),
+        }
+    }
+
+    /// Queues many records with one channel message per batch-sized chunk,
+    /// instead of one per job. Returns how many records were queued.
+    pub fn enqueue_many(&self, mut records: Vec<serde_json::Value>, url: &str, timeout_sec: f64) -> Result<usize, String> {
+        let total = records.len();
+        let batch_size = self.config.read().unwrap().batch_size.max(1);
+        let mut queued = 0;
+        while !records.is_empty() {
+            let rest = records.split_off(records.len().min(batch_size));
+            let chunk = std::mem::replace(&mut records, rest);
+            let jobs = chunk.len();
+            self.enqueue(Payload::Records(chunk), url, timeout_sec)
+                .map_err(|e| format!("{} (queued {} of {} records)", e, queued, total))?;
+            queued += jobs;
+        }
+        Ok(queued)
+    }
+
+    fn enqueue(&self, payload: Payload, url: &str, timeout_sec: f64) -> Result<(), String> {
+        let jobs = payload.jobs();
+        let result = self.try_enqueue(payload, url, timeout_sec);
+        if result.is_err() {
+            self.stats.dropped_total.fetch_add(jobs, Ordering::Relaxed);
+        }
+        result
+    }
+
+    fn try_enqueue(&self, payload: Payload, url: &str, timeout_sec: f64) -> Result<(), String> {
+        if self.sender.is_closed() {
+            return Err("telemetry worker has stopped".to_string());
+        }
+        let jobs = payload.jobs();
+        let job = QueuedJob { payload, url: url.to_string(), timeout_sec };
+
+        // Fast path: plenty of room, no need to look at the overflow policy
+        let job = if self.gate.under_pressure() { Err(job) } else { self.gate.try_push(job) };
+        let Err(job) = job else {
+            self.queued(jobs);
+            return Ok(());
+        };
+
+        let config = Arc::clone(&self.config.read().unwrap());
+        if config.overflow_policy == OverflowPolicy::Sample && !self.gate.sample(config.sample_rate) {
+            self.stats.sampled_out_total.fetch_add(jobs, Ordering::Relaxed);
+            return Ok(());
+        }
+        let Err(job) = self.gate.try_push(job) else {
+            self.queued(jobs);
+            return Ok(());
+        };
+
+        match config.overflow_policy {
+            OverflowPolicy::DropNewest | OverflowPolicy::Sample => Err("no available capacity".to_string()),
+            OverflowPolicy::DropOldest => {
+                // The queue keeps its limit; the evicted jobs are freed right here
+                let evicted: usize = self.gate.push_evicting(job).iter().map(|j| j.payload.jobs()).sum();
+                self.stats.evicted_total.fetch_add(evicted, Ordering::Relaxed);
+                self.queued(jobs);
+                Ok(())
+            }
+            OverflowPolicy::Block => {
+                self.stats.blocked_total.fetch_add(1, Ordering::Relaxed);
+                match self.gate.push_blocking(job, Duration::from_millis(config.overflow_block_ms)) {
+                    Ok(()) => {
+                        self.queued(jobs);
+                        Ok(())
+                    }
+                    Err(_) => {
+                        self.stats.block_timeouts.fetch_add(1, Ordering::Relaxed);
+                        Err(format!("no available capacity after blocking {} ms", config.overflow_block_ms))
+                    }
+                }
+            }
+            OverflowPolicy::Spill => self.spill_overflow(job.payload, url, timeout_sec),
+        }
+    }
+
+    /// Counts jobs that made it into the queue and wakes the worker for them.
+    fn queued(&self, jobs: usize) {
+        self.stats.enqueued_total.fetch_add(jobs, Ordering::Relaxed);
+        self.wake.notify_one();
+    }
+
+    /// A full queue spills to disk instead of dropping the job. The worker
+    /// does the write, so the caller never waits on disk I/O.
+    fn spill_overflow(&self, payload: Payload, url: &str, timeout_sec: f64) -> Result<(), String> {
+        let Some(spill) = &self.spill else {
+            return Err("no available capacity (no spool configured)".to_string());
+        };
+        let record = SpoolRecord {
+            url: url.to_string(),
+            timeout_sec,
+            jobs: payload.jobs(),
+            body: payload.to_json_list(),
+        };
+        spill.try_send(record).map_err(|e| match e {
+            mpsc::error::TrySendError::Full(_) => "no available capacity (spill backlog full)".to_string(),
+            mpsc::error::TrySendError::Closed(_) => "telemetry worker has stopped".to_string(),
+        })
+    }
+
+    /// Current counters, without resetting anything (unlike `flush`).
+    pub fn stats(&self) -> CoreStats {
+        let stats = &self.stats;
+        CoreStats {
+            queue_depth: self.gate.depth(),
+            queue_limit: self.gate.limit(),
+            enqueued_jobs: stats.enqueued_total.load(Ordering::Relaxed),
+            sent_jobs: stats.sent_total.load(Ordering::Relaxed),
+            dropped_jobs: stats.dropped_total.load(Ordering::Relaxed),
+            evicted_jobs: stats.evicted_total.load(Ordering::Relaxed),
+            sampled_out_jobs: stats.sampled_out_total.load(Ordering::Relaxed),
+            blocked_enqueues: stats.blocked_total.load(Ordering::Relaxed),
+            block_timeouts: stats.block_timeouts.load(Ordering::Relaxed),
+            failed_jobs: stats.failed_total.load(Ordering::SeqCst),
+            spilled_jobs: stats.spilled_total.load(Ordering::SeqCst),
+            batches_sent: stats.batches_sent.load(Ordering::Relaxed),
+            bytes_sent: stats.bytes_sent.load(Ordering::Relaxed),
+            batch_jobs: stats.batch_jobs.snapshot(),
+            send_latency_ms: stats.send_latency_ms.snapshot(),
+            last_error: stats.last_error.lock().unwrap().clone(),
+        }
+    }
+
+    pub fn flush(&self) -> FlushSummary {
+        let timeout_sec = self.config.read().unwrap().flush_timeout_sec;
+
+        let (ack_sender, ack_receiver) = std::sync::mpsc::channel();
+        if self.sender.send(TelemetryMessage::Flush(ack_sender)).is_ok() {
+            let _ = ack_receiver.recv_timeout(Duration::from_secs(timeout_sec));
+        }
+
+        let failed_jobs = self.stats.failed_count.swap(0, Ordering::SeqCst);
+        let spilled_jobs = self.stats.spilled_count.swap(0, Ordering::SeqCst);
+        let mut freq_map = self.stats.error_frequency.lock().unwrap();
+        let common_errors: Vec<_> = freq_map.drain().collect();
+
+        FlushSummary {
+            failed_jobs,
+            spilled_jobs,
+            common_errors,
+        }
+    }
+}
+
+/// A canary function to test FFI panic handling.
+pub fn trigger_panic() {
+    panic!("[CORE] INTENTIONAL PANIC: Testing FFI boundary safety.");
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn setup_client(limit: usize) -> GliaClient {
+        GliaClient::new(limit)
+    }
+
+    #[test]
+    fn test_queue_overflow() {
+        // Create a client with a very small queue
+        let client = setup_client(2);
+        
+        // Fill the queue
+        assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
+        assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
+        
+        // The third one should fail because the queue is full
+        let result = client.enqueue_to_background("{}", "http://test-host", 1.0);
+        assert!(result.is_err());
+        assert!(result.unwrap_err().to_string().to_lowercase().contains("capacity"));
+    }
+
+    fn settings(json: &str) -> serde_json::Map<String, Value> {
+        serde_json::from_str(json).unwrap()
+    }
+
+    /// A client with its own retry budget and breaker, with near-instant backoff.
+    fn retrying_client(max_retries: u32, breaker_threshold: usize) -> GliaClient {
+        let defaults = WorkerConfig::from_env();
+        GliaClient::with_config(100, WorkerConfig {
+            retry: RetryPolicy { max_retries, base_backoff_ms: 1, ..defaults.retry.clone() },
+            breaker_threshold,
+            ..defaults
+        })
+    }
+
+    #[test]
+    fn test_configure_rejects_bad_settings_atomically() {
+        let client = setup_client(100);
+        assert!(client.configure(&settings(r#"{"batch_size": 10, "no_such_setting": 1}"#))
+            .unwrap_err()
+            .contains("no_such_setting"));
+        assert!(client.configure(&settings(r#"{"batch_size": -1}"#)).is_err());
+        assert!(client.configure(&settings(r#"{"compression": "brotli"}"#)).is_err());
+        // Nothing from the rejected calls was applied
+        assert_eq!(client.config.read().unwrap().batch_size, WorkerConfig::from_env().batch_size);
+
+        // Whole floats are accepted, as R sends them
+        client.configure(&settings(r#"{"batch_size": 10.0, "compression": "zstd"}"#)).unwrap();
+        let config = client.config.read().unwrap();
+        assert_eq!(config.batch_size, 10);
+        assert_eq!(config.compression, Compression::Zstd);
+    }
+
+    #[test]
+    fn test_queue_limit_can_change_at_runtime() {
+        let client = setup_client(100);
+        client.configure(&settings(r#"{"queue_limit": 0}"#)).unwrap();
+        let result = client.enqueue_to_background("{}", "http://test-host", 1.0);
+        assert!(result.unwrap_err().contains("no available capacity"));
+
+        client.configure(&settings(r#"{"queue_limit": 10}"#)).unwrap();
+        assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
+    }
+
+    #[test]
+    fn test_drop_oldest_makes_room_instead_of_refusing() {
+        let client = setup_client(100);
+        client.configure(&settings(r#"{"queue_limit": 0, "overflow_policy": "drop-oldest"}"#)).unwrap();
+        for _ in 0..3 {
+            assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
+        }
+
+        // Evicted on the producer's side: the queue never outgrows its limit
+        let stats = client.stats();
+        assert_eq!(stats.evicted_jobs, 3);
+        assert_eq!(stats.dropped_jobs, 0);
+        assert_eq!(stats.queue_depth, 0);
+    }
+
+    #[test]
+    fn test_block_waits_for_space_until_its_deadline() {
+        let client = setup_client(100);
+        client.configure(&settings(r#"{"queue_limit": 0, "overflow_policy": "block", "overflow_block_ms": 50}"#)).unwrap();
+        let result = client.enqueue_to_background("{}", "http://test-host", 1.0);
+        assert!(result.unwrap_err().contains("after blocking 50 ms"));
+
+        client.configure(&settings(r#"{"overflow_block_ms": 5000}"#)).unwrap();
+        std::thread::scope(|scope| {
+            scope.spawn(|| {
+                std::thread::sleep(Duration::from_millis(50));
+                client.configure(&settings(r#"{"queue_limit": 10}"#)).unwrap();
+            });
+            assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
+        });
+
+        let stats = client.stats();
+        assert_eq!(stats.blocked_enqueues, 2);
+        assert_eq!(stats.block_timeouts, 1);
+        assert_eq!(stats.dropped_jobs, 1);
+    }
+
+    #[test]
+    fn test_sample_thins_out_jobs_under_pressure() {
+        let client = setup_client(100);
+        client.configure(&settings(r#"{"queue_limit": 0, "overflow_policy": "sample", "sample_rate": 0.5}"#)).unwrap();
+        let refused = (0..10)
+            .filter(|_| client.enqueue_to_background("{}", "http://test-host", 1.0).is_err())
+            .count();
+
+        // Half are sampled out quietly; the kept half still find the queue full
+        let stats = client.stats();
+        assert_eq!(stats.sampled_out_jobs, 5);
+        assert_eq!(refused, 5);
+        assert_eq!(stats.dropped_jobs, 5);
+    }
+
+    #[tokio::test]
+    async fn test_configure_applies_to_running_worker() {
+        let client = setup_client(100);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .expect(2)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        client.configure(&settings(r#"{"batch_size": 2, "linger_ms": 60000}"#)).unwrap();
+        for _ in 0..4 {
+            client.enqueue_to_background("{}", &url, 1.0).unwrap();
+        }
+
+        // Two full batches go out without waiting for the linger or a flush
+        tokio::time::sleep(Duration::from_millis(300)).await;
+        mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_enqueue_to_background_success() {
+        let client = setup_client(100);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .with_status(200)
+            .with_body("ok")
+            .create_async()
+            .await;
+
+        let result = client.enqueue_to_background("{}", &url, 1.0);
+        assert!(result.is_ok());
+        
+        let summary = client.flush();
+        assert_eq!(summary.failed_jobs, 0);
+        mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_stats_are_not_reset_by_reading() {
+        let client = retrying_client(0, 3);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let ok = server.mock("POST", "/ok")
+            .with_status(202)
+            .create_async()
+            .await;
+        let failing = server.mock("POST", "/ingest")
+            .with_status(400)
+            .create_async()
+            .await;
+
+        client.enqueue_to_background(r#"[{"id": 1}, {"id": 2}]"#, &format!("{}/ok", server.url()), 1.0).unwrap();
+        client.enqueue_record(serde_json::json!({"id": 3}), &url, 1.0).unwrap();
+        let _ = client.flush();
+        ok.assert_async().await;
+        failing.assert_async().await;
+
+        client.configure(&settings(r#"{"queue_limit": 0}"#)).unwrap();
+        assert!(client.enqueue_to_background("{}", &url, 1.0).is_err());
+
+        let stats = client.stats();
+        assert_eq!(stats.queue_depth, 0);
+        assert_eq!(stats.queue_limit, 0);
+        assert_eq!(stats.enqueued_jobs, 2);
+        assert_eq!(stats.sent_jobs, 1);
+        assert_eq!(stats.failed_jobs, 1);
+        assert_eq!(stats.dropped_jobs, 1);
+        assert_eq!(stats.batches_sent, 2);
+        assert!(stats.bytes_sent > 0);
+        assert_eq!(stats.batch_jobs.iter().map(|(_, n)| n).sum::<usize>(), 2);
+        assert_eq!(stats.send_latency_ms.iter().map(|(_, n)| n).sum::<usize>(), 2);
+        assert_eq!(stats.last_error.as_deref(), Some("HTTP 400 Bad Request"));
+
+        // A flush resets its own summary, never the totals
+        assert_eq!(client.flush().failed_jobs, 0);
+        assert_eq!(client.stats().failed_jobs, 1);
+    }
+
+    #[tokio::test]
+    async fn test_enqueue_to_background_server_error() {
+        let client = retrying_client(0, 3);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .with_status(500)
+            .create_async()
+            .await;
+
+        let _ = client.enqueue_to_background("{}", &url, 1.0);
+        let summary = client.flush();
+        
+        assert_eq!(summary.failed_jobs, 1);
+        assert!(summary.common_errors.iter().any(|(e, _)| e.contains("HTTP 500")));
+        mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_retryable_errors_are_retried() {
+        let client = retrying_client(2, 3);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        // One initial attempt plus two retries, then the batch is given up on
+        let mock = server.mock("POST", "/ingest")
+            .expect(3)
+            .with_status(503)
+            .create_async()
+            .await;
+
+        client.enqueue_to_background("{}", &url, 1.0).unwrap();
+        let summary = client.flush();
+
+        assert_eq!(summary.failed_jobs, 1);
+        assert!(summary.common_errors.iter().any(|(e, _)| e.contains("HTTP 503")));
+        mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_client_errors_are_not_retried() {
+        let client = retrying_client(2, 3);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
 
-        let res = client.post(&url)
-            .header("Content-Type", "application/json")
-            .timeout(Duration::from_secs_f64(timeout_sec))
-            .body(merged_payload)
-            .send()
+        let mock = server.mock("POST", "/ingest")
+            .expect(1)
+            .with_status(422)
+            .create_async()
             .await;
 
-        let error_msg = match res {
-            Ok(resp) if resp.status().is_success() => None,
-            Ok(resp) => Some(format!("HTTP {}", resp.status())),
-            Err(e) => Some(e.to_string()),
-        };
-
-        if let Some(err) = error_msg {
-            // If the whole batch fails, we count ALL jobs in it as failed
-            stats.failed_count.fetch_add(buffer.len(), Ordering::SeqCst);
-            let mut freq = stats.error_frequency.lock().unwrap();
-            *freq.entry(err.clone()).or_insert(0) += 1;
-            
-            if debug_mode {
-                eprintln!("[CORE DEBUG] Batch push failed ({} jobs): {}", buffer.len(), err);
-            }
-        }
+        client.enqueue_to_background("{}", &url, 1.0).unwrap();
+        let summary = client.flush();
 
-        buffer.clear();
+        assert_eq!(summary.failed_jobs, 1);
+        mock.assert_async().await;
     }
 
-    pub fn enqueue_to_background(&self, json_payload: &str, url: &str, timeout_sec: f64) -> Result<(), String> {
-        self.sender.try_send(TelemetryMessage::Data {
-            payload: json_payload.to_string(),
-            url: url.to_string(),
-            timeout_sec,
-        }).map_err(|e| e.to_string())
-    }
+    #[tokio::test]
+    async fn test_open_circuit_fails_fast() {
+        let client = retrying_client(0, 1);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
 
-    pub fn flush(&self) -> FlushSummary {
-        let timeout_sec = env::var("CORE_FLUSH_TIMEOUT_SEC")
-            .ok()
-            .and_then(|s| s.parse::<u64>().ok())
-            .unwrap_or(5);
+        // Only the first batch reaches the backend; it trips the breaker
+        let mock = server.mock("POST", "/ingest")
+            .expect(1)
+            .with_status(503)
+            .create_async()
+            .await;
 
-        let (ack_sender, ack_receiver) = std::sync::mpsc::channel();
-        if self.sender.try_send(TelemetryMessage::Flush(ack_sender)).is_ok() {
-            let _ = ack_receiver.recv_timeout(Duration::from_secs(timeout_sec));
-        }
+        client.enqueue_to_background("{}", &url, 1.0).unwrap();
+        let _ = client.flush();
 
-        let failed_jobs = self.stats.failed_count.swap(0, Ordering::SeqCst);
-        let mut freq_map = self.stats.error_frequency.lock().unwrap();
-        let common_errors: Vec<_> = freq_map.drain().collect();
+        client.enqueue_to_background("{}", &url, 1.0).unwrap();
+        let summary = client.flush();
 
-        FlushSummary {
-            failed_jobs,
-            common_errors,
-        }
+        assert_eq!(summary.failed_jobs, 1);
+        assert!(summary.common_errors.iter().any(|(e, _)| e.contains("Circuit open")));
+        mock.assert_async().await;
     }
-}
 
-/// A canary function to test FFI panic handling.
-pub fn trigger_panic() {
-    panic!("[CORE] INTENTIONAL PANIC: Testing FFI boundary safety.");
-}
+    #[tokio::test]
+    async fn test_partial_success_counts_only_rejected_jobs() {
+        let client = setup_client(100);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
 
-#[cfg(test)]
-mod tests {
-    use super::*;
+        let mock = server.mock("POST", "/ingest")
+            .with_status(207)
+            .with_body(r#"{"count": 2, "accepted": [], "duplicates": [], "rejected": [{"index": 1, "run_id": null, "detail": "started_at: Field required"}]}"#)
+            .create_async()
+            .await;
 
-    fn setup_client(limit: usize) -> GliaClient {
-        GliaClient::new(limit)
-    }
+        for _ in 0..3 {
+            client.enqueue_to_background("{}", &url, 1.0).unwrap();
+        }
+        let summary = client.flush();
 
-    #[test]
-    fn test_queue_overflow() {
-        // Create a client with a very small queue
-        let client = setup_client(2);
-        
-        // Fill the queue
-        assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
-        assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
-        
-        // The third one should fail because the channel is bounded and full
-        let result = client.enqueue_to_background("{}", "http://test-host", 1.0);
-        assert!(result.is_err());
-        // tokio mpsc try_send error message contains "no available capacity" or similar
-        assert!(result.unwrap_err().to_string().to_lowercase().contains("capacity"));
+        assert_eq!(summary.failed_jobs, 1);
+        assert!(summary.common_errors.iter().any(|(e, _)| e.contains("started_at: Field required")));
+        mock.assert_async().await;
     }
 
     #[tokio::test]
-    async fn test_enqueue_to_background_success() {
+    async fn test_records_and_json_payloads_share_one_body() {
         let client = setup_client(100);
         let mut server = mockito::Server::new_async().await;
         let url = format!("{}/ingest", server.url());
 
         let mock = server.mock("POST", "/ingest")
-            .with_status(200)
-            .with_body("ok")
+            .match_body(mockito::Matcher::JsonString(r#"[{"id": 1}, {"id": 2, "argv": ["a"]}]"#.to_string()))
+            .expect(1)
+            .with_status(202)
             .create_async()
             .await;
 
-        let result = client.enqueue_to_background("{}", &url, 1.0);
-        assert!(result.is_ok());
-        
+        client.enqueue_to_background("[{\"id\": 1}]", &url, 1.0).unwrap();
+        client.enqueue_record(serde_json::json!({"id": 2, "argv": ["a"]}), &url, 1.0).unwrap();
         let summary = client.flush();
+
         assert_eq!(summary.failed_jobs, 0);
         mock.assert_async().await;
     }
 
     #[tokio::test]
-    async fn test_enqueue_to_background_server_error() {
-        let client = setup_client(100);
+    async fn test_each_destination_gets_its_own_batch() {
+        let client = retrying_client(0, 3);
+        let mut primary = mockito::Server::new_async().await;
+        let mut mirror = mockito::Server::new_async().await;
+        let primary_url = format!("{}/ingest", primary.url());
+        let mirror_url = format!("{}/ingest", mirror.url());
+
+        let primary_mock = primary.mock("POST", "/ingest")
+            .match_body(mockito::Matcher::JsonString(r#"[{"id": 1}, {"id": 3}]"#.to_string()))
+            .expect(1)
+            .with_status(202)
+            .create_async()
+            .await;
+        // A failing mirror neither receives the primary's jobs nor stalls them
+        let mirror_mock = mirror.mock("POST", "/ingest")
+            .match_body(mockito::Matcher::JsonString(r#"[{"id": 2}]"#.to_string()))
+            .expect(1)
+            .with_status(503)
+            .create_async()
+            .await;
+
+        client.enqueue_to_background(r#"[{"id": 1}]"#, &primary_url, 1.0).unwrap();
+        client.enqueue_to_background(r#"[{"id": 2}]"#, &mirror_url, 1.0).unwrap();
+        client.enqueue_to_background(r#"[{"id": 3}]"#, &primary_url, 1.0).unwrap();
+        let summary = client.flush();
+
+        assert_eq!(summary.failed_jobs, 1);
+        primary_mock.assert_async().await;
+        mirror_mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_enqueue_many_is_batched_by_jobs() {
+        let client = GliaClient::with_config(100, WorkerConfig { batch_size: 3, ..WorkerConfig::from_env() });
         let mut server = mockito::Server::new_async().await;
         let url = format!("{}/ingest", server.url());
 
+        // 7 records with a batch size of 3: two full batches plus the flushed remainder
         let mock = server.mock("POST", "/ingest")
-            .with_status(500)
+            .expect(3)
+            .with_status(202)
             .create_async()
             .await;
 
-        let _ = client.enqueue_to_background("{}", &url, 1.0);
+        let records = (0..7).map(|i| serde_json::json!({"id": i})).collect();
+        assert_eq!(client.enqueue_many(records, &url, 1.0).unwrap(), 7);
         let summary = client.flush();
-        
-        assert_eq!(summary.failed_jobs, 1);
-        assert!(summary.common_errors.iter().any(|(e, _)| e.contains("HTTP 500")));
+
+        assert_eq!(summary.failed_jobs, 0);
         mock.assert_async().await;
     }
 
@@ -291,10 +1468,11 @@ mod tests {
 
     #[tokio::test]
     async fn test_batching_by_count() {
-        std::env::set_var("CORE_BATCH_SIZE", "2000"); // Ensure they don't auto-send
-        std::env::set_var("CORE_BATCH_TIMEOUT_SEC", "60"); // Don't time out
-        
-        let client = GliaClient::new(2000);
+        let client = GliaClient::with_config(2000, WorkerConfig {
+            batch_size: 2000, // Ensure they don't auto-send
+            batch_linger_ms: 60_000, // Don't time out
+            ..WorkerConfig::from_env()
+        });
         let mut server = mockito::Server::new_async().await;
         let url = format!("{}/ingest", server.url());
 
@@ -315,9 +1493,6 @@ mod tests {
         let summary = client.flush();
         assert_eq!(summary.failed_jobs, 0);
         mock.assert_async().await;
-        
-        std::env::remove_var("CORE_BATCH_SIZE");
-        std::env::remove_var("CORE_BATCH_TIMEOUT_SEC");
     }
 
     #[tokio::test]
@@ -346,6 +1521,47 @@ mod tests {
         mock.assert_async().await;
     }
 
+    #[tokio::test]
+    async fn test_batching_by_bytes() {
+        // Room for two {"id": 1} jobs per body, not three
+        let client = GliaClient::with_config(100, WorkerConfig { batch_max_bytes: 25, ..WorkerConfig::from_env() });
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .expect(3)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        for _ in 0..5 {
+            client.enqueue_to_background("[{\"id\": 1}]", &url, 1.0).unwrap();
+        }
+        let summary = client.flush();
+
+        assert_eq!(summary.failed_jobs, 0);
+        mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_sub_second_linger() {
+        let client = GliaClient::with_config(100, WorkerConfig { batch_linger_ms: 100, ..WorkerConfig::from_env() });
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .expect(1)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        client.enqueue_to_background("{\"id\": 1}", &url, 1.0).unwrap();
+
+        // Sent by the linger timer, well before the old whole-second default
+        tokio::time::sleep(Duration::from_millis(600)).await;
+        mock.assert_async().await;
+    }
+
     #[tokio::test]
     async fn test_batching_with_env_vars() {
         std::env::set_var("CORE_BATCH_SIZE", "5");
@@ -376,6 +1592,206 @@ mod tests {
         std::env::remove_var("CORE_BATCH_TIMEOUT_SEC");
     }
 
+    #[test]
+    fn test_compression_round_trip() {
+        use std::io::Read;
+
+        let body = br#"[{"hostname":"node-1"},{"hostname":"node-1"}]"#.repeat(50);
+
+        let gzipped = Compression::Gzip.encode(&body).unwrap();
+        let mut decoded = Vec::new();
+        flate2::read::GzDecoder::new(&gzipped[..]).read_to_end(&mut decoded).unwrap();
+        assert_eq!(decoded, body);
+        assert!(gzipped.len() < body.len());
+
+        let zstded = Compression::Zstd.encode(&body).unwrap();
+        assert_eq!(zstd::decode_all(&zstded[..]).unwrap(), body);
+
+        assert_eq!("ZSTD".parse::<Compression>().unwrap(), Compression::Zstd);
+        assert!("brotli".parse::<Compression>().is_err());
+    }
+
+    #[tokio::test]
+    async fn test_large_batches_are_compressed() {
+        let client = GliaClient::with_config(100, WorkerConfig {
+            compression: Compression::Gzip,
+            compression_min_bytes: 64,
+            ..WorkerConfig::from_env()
+        });
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .match_header("content-encoding", "gzip")
+            .expect(1)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        for _ in 0..10 {
+            client.enqueue_to_background("[{\"hostname\": \"node-1\"}]", &url, 1.0).unwrap();
+        }
+        let summary = client.flush();
+
+        assert_eq!(summary.failed_jobs, 0);
+        mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_small_batches_are_sent_plain() {
+        let client = GliaClient::new(100);
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .match_header("content-encoding", mockito::Matcher::Missing)
+            .expect(1)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        client.enqueue_to_background("{}", &url, 1.0).unwrap();
+        let summary = client.flush();
+
+        assert_eq!(summary.failed_jobs, 0);
+        mock.assert_async().await;
+    }
+
+    #[tokio::test]
+    async fn test_flush_waits_for_all_in_flight_batches() {
+        let client = GliaClient::with_config(100, WorkerConfig {
+            batch_size: 2,
+            max_in_flight: 2,
+            ..WorkerConfig::from_env()
+        });
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        // 7 items with a batch size of 2: three full batches plus the flushed remainder
+        let mock = server.mock("POST", "/ingest")
+            .expect(4)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        for _ in 0..7 {
+            client.enqueue_to_background("{\"id\": 1}", &url, 1.0).unwrap();
+        }
+        let summary = client.flush();
+
+        assert_eq!(summary.failed_jobs, 0);
+        mock.assert_async().await;
+    }
+
+    fn spool_dir(name: &str) -> std::path::PathBuf {
+        let dir = std::env::temp_dir().join(format!("gcore-client-spool-{}-{}", name, std::process::id()));
+        let _ = std::fs::remove_dir_all(&dir);
+        dir
+    }
+
+    fn spool_files(dir: &std::path::Path) -> Vec<String> {
+        std::fs::read_dir(dir)
+            .map(|rd| rd.filter_map(|e| e.ok()).map(|e| e.file_name().to_string_lossy().into_owned()).collect())
+            .unwrap_or_default()
+    }
+
+    /// A client of its own on `dir`, so parallel tests neither spill into nor replay it.
+    fn spool_client(limit: usize, dir: &std::path::Path, config: WorkerConfig) -> GliaClient {
+        GliaClient::with_config(limit, WorkerConfig {
+            spool_dir: Some(dir.to_string_lossy().into_owned()),
+            overflow_policy: OverflowPolicy::Spill,
+            ..config
+        })
+    }
+
+    #[tokio::test]
+    async fn test_undeliverable_batches_are_spooled() {
+        let dir = spool_dir("undeliverable");
+        let defaults = WorkerConfig::from_env();
+        let client = spool_client(100, &dir, WorkerConfig {
+            retry: RetryPolicy { max_retries: 0, ..defaults.retry.clone() },
+            spool_replay_sec: 3600,
+            ..defaults
+        });
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        let mock = server.mock("POST", "/ingest")
+            .with_status(503)
+            .create_async()
+            .await;
+
+        client.enqueue_to_background("[{\"id\": 1}]", &url, 1.0).unwrap();
+        let summary = client.flush();
+
+        assert_eq!(summary.failed_jobs, 0);
+        assert_eq!(summary.spilled_jobs, 1);
+        // Flush seals the segment so a later process can replay it
+        assert!(spool_files(&dir).iter().any(|f| f.ends_with(".seg")));
+        mock.assert_async().await;
+
+        let _ = std::fs::remove_dir_all(&dir);
+    }
+
+    #[tokio::test]
+    async fn test_spool_left_by_earlier_process_is_replayed() {
+        let dir = spool_dir("replay");
+        let mut server = mockito::Server::new_async().await;
+        let url = format!("{}/ingest", server.url());
+
+        {
+            let spool = Spool::open(&dir, 1 << 20, 1 << 20).unwrap();
+            spool.append(&SpoolRecord {
+                url: url.clone(),
+                timeout_sec: 1.0,
+                jobs: 1,
+                body: "[{\"id\": 42}]".to_string(),
+            }).unwrap();
+        }
+
+        let mock = server.mock("POST", "/ingest")
+            .match_body(mockito::Matcher::JsonString("[{\"id\": 42}]".to_string()))
+            .expect(1)
+            .with_status(202)
+            .create_async()
+            .await;
+
+        let _client = spool_client(100, &dir, WorkerConfig::from_env());
+
+        let deadline = std::time::Instant::now() + Duration::from_secs(5);
+        while !spool_files(&dir).is_empty() && std::time::Instant::now() < deadline {
+            tokio::time::sleep(Duration::from_millis(20)).await;
+        }
+
+        assert!(spool_files(&dir).is_empty());
+        mock.assert_async().await;
+
+        let _ = std::fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    fn test_full_queue_spills_to_disk() {
+        let dir = spool_dir("overflow");
+        let client = spool_client(2, &dir, WorkerConfig {
+            spool_replay_sec: 3600,
+            batch_linger_ms: 60_000,
+            ..WorkerConfig::from_env()
+        });
+        for _ in 0..3 {
+            assert!(client.enqueue_to_background("{}", "http://test-host", 1.0).is_ok());
+        }
+
+        // Written by the worker, not by the producer
+        let deadline = std::time::Instant::now() + Duration::from_secs(5);
+        while client.stats().spilled_jobs == 0 && std::time::Instant::now() < deadline {
+            std::thread::sleep(Duration::from_millis(10));
+        }
+        assert_eq!(client.stats().spilled_jobs, 1);
+        assert!(!spool_files(&dir).is_empty());
+
+        let _ = std::fs::remove_dir_all(&dir);
+    }
+
     #[tokio::test]
     async fn test_flush_timeout_config() {
         std::env::set_var("CORE_FLUSH_TIMEOUT_SEC", "1");
@@ -1,4 +1,13 @@
+#[cfg(unix)]
+pub mod agent;
+pub mod batching;
 pub mod gcore;
+pub mod metrics;
+pub mod overflow;
+pub mod process_client;
+pub mod retry;
+pub mod spool;
+pub mod stats;
 
 #[cfg(feature = "python")]
 pub mod python_module;
@@ -18,8 +27,21 @@ use crate::python_module::*;
 #[doc(hidden)]
 fn gcore_py(m: &Bound<'_, PyModule>) -> PyResult<()> {
     m.add_class::<PyFlushSummary>()?;
+    m.add_class::<PyCoreStats>()?;
+    m.add_class::<PyProcessMetrics>()?;
     m.add_function(wrap_pyfunction!(enqueue_to_background, m)?)?;
+    m.add_function(wrap_pyfunction!(enqueue_record, m)?)?;
+    m.add_function(wrap_pyfunction!(enqueue_many, m)?)?;
+    m.add_function(wrap_pyfunction!(configure, m)?)?;
     m.add_function(wrap_pyfunction!(flush_queue, m)?)?;
+    m.add_function(wrap_pyfunction!(stats, m)?)?;
+    m.add_function(wrap_pyfunction!(process_metrics, m)?)?;
+    m.add_function(wrap_pyfunction!(process_cpu_times, m)?)?;
+    m.add_function(wrap_pyfunction!(process_memory, m)?)?;
+    m.add_function(wrap_pyfunction!(process_usage, m)?)?;
+    m.add_function(wrap_pyfunction!(process_io, m)?)?;
+    m.add_function(wrap_pyfunction!(process_cgroup, m)?)?;
+    m.add_function(wrap_pyfunction!(process_tree_rss, m)?)?;
     m.add_function(wrap_pyfunction!(trigger_panic, m)?)?;
     Ok(())
 }
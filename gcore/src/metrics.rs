@@ -0,0 +1,343 @@
+//! Linux-native process metrics for the Python and R trackers.
+//!
+//! Reads /proc/self/{stat,status,io} and the process's cgroup v2 files
+//! directly, so both clients get the same numbers without psutil or ps.
+//! Inside a container the cgroup figures are the ones limits are enforced on.
+
+use std::collections::HashMap;
+use std::io;
+
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct ProcessMetrics {
+    pub user_sec: f64,
+    pub system_sec: f64,
+    /// CPU of children that have exited and been waited for (RUSAGE_CHILDREN)
+    pub children_user_sec: f64,
+    pub children_system_sec: f64,
+    /// VmRSS and VmHWM from /proc/self/status
+    pub rss_kb: u64,
+    pub peak_rss_kb: u64,
+    /// None where /proc/self/io is not readable (some hardened kernels)
+    pub io: Option<IoCounters>,
+    /// None outside a cgroup v2 hierarchy
+    pub cgroup: Option<CgroupMetrics>,
+}
+
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct IoCounters {
+    /// Bytes that reached the storage layer, not page cache hits
+    pub read_bytes: u64,
+    pub write_bytes: u64,
+    /// read(2)/write(2)-family syscalls
+    pub read_count: u64,
+    pub write_count: u64,
+}
+
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct CgroupMetrics {
+    /// CPU used by every process in the cgroup
+    pub cpu_usage_sec: f64,
+    pub nr_throttled: u64,
+    pub throttled_sec: f64,
+    pub memory_current_kb: Option<u64>,
+    /// memory.peak needs Linux 5.19+
+    pub memory_peak_kb: Option<u64>,
+}
+
+/// CPU times of the calling process, from /proc/self/stat.
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct CpuTimes {
+    pub user_sec: f64,
+    pub system_sec: f64,
+    pub children_user_sec: f64,
+    pub children_system_sec: f64,
+}
+
+/// VmRSS and VmHWM of the calling process, from /proc/self/status.
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct MemoryUsage {
+    pub rss_kb: u64,
+    pub peak_rss_kb: u64,
+}
+
+/// RSS of a process and all of its live descendants.
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct TreeRss {
+    pub rss_kb: u64,
+    pub processes: usize,
+}
+
+/// Takes one reading of the calling process: every reader below, about a
+/// dozen file reads. Hot paths should use the narrow reader they need.
+pub fn read_process_metrics() -> io::Result<ProcessMetrics> {
+    let cpu = read_cpu_times()?;
+    let memory = read_memory()?;
+    Ok(ProcessMetrics {
+        user_sec: cpu.user_sec,
+        system_sec: cpu.system_sec,
+        children_user_sec: cpu.children_user_sec,
+        children_system_sec: cpu.children_system_sec,
+        rss_kb: memory.rss_kb,
+        peak_rss_kb: memory.peak_rss_kb,
+        io: read_io().ok(),
+        cgroup: read_cgroup(),
+    })
+}
+
+/// One read of /proc/self/stat.
+#[cfg(target_os = "linux")]
+pub fn read_cpu_times() -> io::Result<CpuTimes> {
+    parse_stat_cpu(&std::fs::read_to_string("/proc/self/stat")?, clock_ticks())
+}
+
+/// One read of /proc/self/status.
+#[cfg(target_os = "linux")]
+pub fn read_memory() -> io::Result<MemoryUsage> {
+    let status = std::fs::read_to_string("/proc/self/status")?;
+    Ok(MemoryUsage {
+        rss_kb: status_kb(&status, "VmRSS").unwrap_or(0),
+        peak_rss_kb: status_kb(&status, "VmHWM").unwrap_or(0),
+    })
+}
+
+/// One read of /proc/self/io; fails where it is not readable (some hardened kernels).
+#[cfg(target_os = "linux")]
+pub fn read_io() -> io::Result<IoCounters> {
+    Ok(parse_io(&std::fs::read_to_string("/proc/self/io")?))
+}
+
+#[cfg(not(target_os = "linux"))]
+pub fn read_cpu_times() -> io::Result<CpuTimes> {
+    Err(unsupported())
+}
+
+#[cfg(not(target_os = "linux"))]
+pub fn read_memory() -> io::Result<MemoryUsage> {
+    Err(unsupported())
+}
+
+#[cfg(not(target_os = "linux"))]
+pub fn read_io() -> io::Result<IoCounters> {
+    Err(unsupported())
+}
+
+#[cfg(not(target_os = "linux"))]
+fn unsupported() -> io::Error {
+    io::Error::new(io::ErrorKind::Unsupported, "process metrics are only read natively on Linux")
+}
+
+/// Sums the RSS of the calling process and its descendants, e.g. the workers
+/// of a multiprocessing pool or a shelled-out command, with one scan of /proc.
+#[cfg(target_os = "linux")]
+pub fn read_tree_rss() -> io::Result<TreeRss> {
+    let mut processes = Vec::new();
+    for entry in std::fs::read_dir("/proc")? {
+        let Some(pid) = entry.ok().and_then(|e| e.file_name().to_str()?.parse::<u32>().ok()) else {
+            continue;
+        };
+        // Processes may exit while we scan
+        if let Some(fields) = std::fs::read_to_string(format!("/proc/{}/stat", pid)).ok().as_deref().and_then(parse_stat_tree) {
+            processes.push((pid, fields.0, fields.1));
+        }
+    }
+    Ok(tree_rss(&processes, std::process::id(), page_kb()))
+}
+
+#[cfg(not(target_os = "linux"))]
+pub fn read_tree_rss() -> io::Result<TreeRss> {
+    Err(io::Error::new(io::ErrorKind::Unsupported, "process trees are only read natively on Linux"))
+}
+
+#[cfg(target_os = "linux")]
+fn page_kb() -> u64 {
+    static PAGE_KB: std::sync::OnceLock<u64> = std::sync::OnceLock::new();
+    *PAGE_KB.get_or_init(|| {
+        let bytes = unsafe { libc::sysconf(libc::_SC_PAGESIZE) };
+        if bytes > 0 { bytes as u64 / 1024 } else { 4 }
+    })
+}
+
+/// `processes` are (pid, ppid, rss in pages) triples.
+fn tree_rss(processes: &[(u32, u32, u64)], root: u32, page_kb: u64) -> TreeRss {
+    let mut children: HashMap<u32, Vec<(u32, u64)>> = HashMap::new();
+    let mut total = TreeRss::default();
+    for &(pid, ppid, rss_pages) in processes {
+        if pid == root {
+            total.rss_kb += rss_pages * page_kb;
+            total.processes += 1;
+        } else {
+            children.entry(ppid).or_default().push((pid, rss_pages));
+        }
+    }
+    let mut pending = vec![root];
+    while let Some(parent) = pending.pop() {
+        for &(pid, rss_pages) in children.get(&parent).map(Vec::as_slice).unwrap_or_default() {
+            total.rss_kb += rss_pages * page_kb;
+            total.processes += 1;
+            pending.push(pid);
+        }
+    }
+    total
+}
+
+#[cfg(target_os = "linux")]
+fn clock_ticks() -> f64 {
+    static TICKS: std::sync::OnceLock<f64> = std::sync::OnceLock::new();
+    *TICKS.get_or_init(|| {
+        let ticks = unsafe { libc::sysconf(libc::_SC_CLK_TCK) };
+        if ticks > 0 { ticks as f64 } else { 100.0 }
+    })
+}
+
+/// The cgroup v2 CPU and memory counters; None outside a cgroup v2 hierarchy.
+#[cfg(target_os = "linux")]
+pub fn read_cgroup() -> Option<CgroupMetrics> {
+    // cgroup v2 has a single "0::<path>" line
+    let membership = std::fs::read_to_string("/proc/self/cgroup").ok()?;
+    let path = membership.lines().find_map(|line| line.strip_prefix("0::"))?;
+    let dir = std::path::Path::new("/sys/fs/cgroup").join(path.trim_start_matches('/'));
+
+    let mut metrics = parse_cpu_stat(&std::fs::read_to_string(dir.join("cpu.stat")).ok()?);
+    let read_kb = |file: &str| {
+        std::fs::read_to_string(dir.join(file)).ok()?.trim().parse::<u64>().ok().map(|bytes| bytes / 1024)
+    };
+    metrics.memory_current_kb = read_kb("memory.current");
+    metrics.memory_peak_kb = read_kb("memory.peak");
+    Some(metrics)
+}
+
+#[cfg(not(target_os = "linux"))]
+pub fn read_cgroup() -> Option<CgroupMetrics> {
+    None
+}
+
+/// Fields of /proc/<pid>/stat from "state" (field 3) on.
+fn stat_fields(stat: &str) -> Vec<&str> {
+    // The command name is in parentheses and may itself contain spaces or ')'
+    stat.rsplit_once(')')
+        .map(|(_, rest)| rest.split_whitespace().collect())
+        .unwrap_or_default()
+}
+
+/// utime, stime, cutime and cstime (fields 14 to 17), in seconds.
+fn parse_stat_cpu(stat: &str, ticks_per_sec: f64) -> io::Result<CpuTimes> {
+    let fields = stat_fields(stat);
+    let seconds = |index: usize| fields.get(index).and_then(|v| v.parse::<u64>().ok()).map(|t| t as f64 / ticks_per_sec);
+    match (seconds(11), seconds(12), seconds(13), seconds(14)) {
+        (Some(user_sec), Some(system_sec), Some(children_user_sec), Some(children_system_sec)) => Ok(CpuTimes {
+            user_sec,
+            system_sec,
+            children_user_sec,
+            children_system_sec,
+        }),
+        _ => Err(io::Error::new(io::ErrorKind::InvalidData, "unexpected /proc/self/stat format")),
+    }
+}
+
+/// ppid (field 4) and rss in pages (field 24).
+fn parse_stat_tree(stat: &str) -> Option<(u32, u64)> {
+    let fields = stat_fields(stat);
+    Some((fields.get(1)?.parse().ok()?, fields.get(21)?.parse().ok()?))
+}
+
+/// A "Key:   1234 kB" line of /proc/<pid>/status.
+fn status_kb(status: &str, key: &str) -> Option<u64> {
+    status.lines().find_map(|line| {
+        let value = line.strip_prefix(key)?.strip_prefix(':')?;
+        value.split_whitespace().next()?.parse().ok()
+    })
+}
+
+fn key_values(text: &str) -> impl Iterator<Item = (&str, u64)> {
+    text.lines().filter_map(|line| {
+        let (key, value) = line.split_once(|c: char| c == ':' || c == ' ')?;
+        Some((key, value.trim().parse().ok()?))
+    })
+}
+
+fn parse_io(io: &str) -> IoCounters {
+    let mut counters = IoCounters::default();
+    for (key, value) in key_values(io) {
+        match key {
+            "read_bytes" => counters.read_bytes = value,
+            "write_bytes" => counters.write_bytes = value,
+            "syscr" => counters.read_count = value,
+            "syscw" => counters.write_count = value,
+            _ => {}
+        }
+    }
+    counters
+}
+
+fn parse_cpu_stat(cpu_stat: &str) -> CgroupMetrics {
+    let mut metrics = CgroupMetrics::default();
+    for (key, value) in key_values(cpu_stat) {
+        match key {
+            "usage_usec" => metrics.cpu_usage_sec = value as f64 / 1e6,
+            "nr_throttled" => metrics.nr_throttled = value,
+            "throttled_usec" => metrics.throttled_sec = value as f64 / 1e6,
+            _ => {}
+        }
+    }
+    metrics
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_stat_cpu_with_awkward_command_name() {
+        let stat = "4242 (my (odd) job) S 1 4242 4242 0 -1 4194560 500 0 0 0 250 75 300 100 20 0 1 0 100 1000000 200";
+        let cpu = parse_stat_cpu(stat, 100.0).unwrap();
+        assert_eq!((cpu.user_sec, cpu.system_sec), (2.5, 0.75));
+        assert_eq!((cpu.children_user_sec, cpu.children_system_sec), (3.0, 1.0));
+        assert!(parse_stat_cpu("garbage", 100.0).is_err());
+        assert_eq!(parse_stat_tree(stat), Some((1, 200)));
+    }
+
+    #[test]
+    fn test_tree_rss_follows_descendants_only() {
+        // 10 -> 11 -> 12, and 10 -> 13; 20 is unrelated, 21 is its child
+        let processes = [(10, 1, 100), (11, 10, 50), (12, 11, 25), (13, 10, 5), (20, 1, 1000), (21, 20, 1000)];
+        assert_eq!(tree_rss(&processes, 10, 4), TreeRss { rss_kb: 720, processes: 4 });
+        assert_eq!(tree_rss(&processes, 11, 4), TreeRss { rss_kb: 300, processes: 2 });
+    }
+
+    #[test]
+    fn test_status_fields_in_kb() {
+        let status = "Name:\tpython3\nVmHWM:\t  204800 kB\nVmRSS:\t  102400 kB\nThreads:\t4\n";
+        assert_eq!(status_kb(status, "VmRSS"), Some(102400));
+        assert_eq!(status_kb(status, "VmHWM"), Some(204800));
+        assert_eq!(status_kb(status, "VmSwap"), None);
+    }
+
+    #[test]
+    fn test_io_counters() {
+        let io = "rchar: 5000\nwchar: 3000\nsyscr: 12\nsyscw: 7\nread_bytes: 4096\nwrite_bytes: 8192\ncancelled_write_bytes: 0\n";
+        assert_eq!(parse_io(io), IoCounters { read_bytes: 4096, write_bytes: 8192, read_count: 12, write_count: 7 });
+    }
+
+    #[test]
+    fn test_cgroup_cpu_stat() {
+        let cpu_stat = "usage_usec 2500000\nuser_usec 2000000\nsystem_usec 500000\nnr_periods 40\nnr_throttled 3\nthrottled_usec 150000\n";
+        let metrics = parse_cpu_stat(cpu_stat);
+        assert_eq!(metrics.cpu_usage_sec, 2.5);
+        assert_eq!(metrics.nr_throttled, 3);
+        assert_eq!(metrics.throttled_sec, 0.15);
+    }
+
+    #[cfg(target_os = "linux")]
+    #[test]
+    fn test_reads_this_process() {
+        let metrics = read_process_metrics().unwrap();
+        assert!(metrics.rss_kb > 0);
+        assert!(metrics.peak_rss_kb >= metrics.rss_kb);
+        assert!(read_cpu_times().unwrap().user_sec >= 0.0);
+        assert!(read_memory().unwrap().rss_kb > 0);
+
+        let tree = read_tree_rss().unwrap();
+        assert!(tree.processes >= 1);
+        assert!(tree.rss_kb > 0);
+    }
+}
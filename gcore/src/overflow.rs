@@ -0,0 +1,207 @@
+use std::str::FromStr;
+use std::collections::VecDeque;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Condvar, Mutex};
+use std::time::{Duration, Instant};
+
+/// What happens to new telemetry once the queue is full (CORE_OVERFLOW_POLICY).
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum OverflowPolicy {
+    /// Refuse the new job; the caller gets an error
+    DropNewest,
+    /// Accept the new job and discard the oldest queued one, like a ring buffer
+    DropOldest,
+    /// Wait up to `overflow_block_ms` for the worker to free a slot
+    Block,
+    /// Hand the new job to the worker, which writes it to the on-disk spool
+    /// (needs CORE_SPOOL_DIR); refused while too many writes are pending
+    Spill,
+    /// Once the queue is half full, keep only a `sample_rate` share of new jobs
+    Sample,
+}
+
+impl FromStr for OverflowPolicy {
+    type Err = String;
+
+    fn from_str(s: &str) -> Result<Self, Self::Err> {
+        match s.trim().to_lowercase().replace('_', "-").as_str() {
+            "drop-newest" => Ok(OverflowPolicy::DropNewest),
+            "drop-oldest" => Ok(OverflowPolicy::DropOldest),
+            "block" => Ok(OverflowPolicy::Block),
+            "spill" => Ok(OverflowPolicy::Spill),
+            "sample" => Ok(OverflowPolicy::Sample),
+            other => Err(format!("Unknown overflow policy '{}'", other)),
+        }
+    }
+}
+
+/// The worker's queue of jobs, bounded by a limit that can change at runtime.
+/// Producers push and the worker pops; under drop-oldest a producer evicts
+/// the oldest jobs itself, so memory never grows past the limit.
+pub struct QueueGate<T> {
+    limit: AtomicUsize,
+    jobs: Mutex<VecDeque<T>>,
+    waiters: AtomicUsize,
+    sampled: AtomicUsize,
+    space: Condvar,
+}
+
+impl<T> QueueGate<T> {
+    pub fn new(limit: usize) -> Self {
+        Self {
+            limit: AtomicUsize::new(limit),
+            jobs: Mutex::new(VecDeque::new()),
+            waiters: AtomicUsize::new(0),
+            sampled: AtomicUsize::new(0),
+            space: Condvar::new(),
+        }
+    }
+
+    pub fn limit(&self) -> usize {
+        self.limit.load(Ordering::SeqCst)
+    }
+
+    pub fn set_limit(&self, limit: usize) {
+        self.limit.store(limit, Ordering::SeqCst);
+        self.notify_waiters();
+    }
+
+    /// Jobs waiting for the worker.
+    pub fn depth(&self) -> usize {
+        self.jobs.lock().unwrap().len()
+    }
+
+    /// At least half full: where the sampling policy starts thinning jobs out.
+    pub fn under_pressure(&self) -> bool {
+        self.depth() * 2 >= self.limit()
+    }
+
+    /// Queues the job if the queue is below its limit, else hands it back.
+    pub fn try_push(&self, job: T) -> Result<(), T> {
+        let mut jobs = self.jobs.lock().unwrap();
+        if jobs.len() >= self.limit() {
+            return Err(job);
+        }
+        jobs.push_back(job);
+        Ok(())
+    }
+
+    /// Queues the job unconditionally and evicts the oldest ones, like a ring
+    /// buffer, until the queue is back within its limit. Returns the evicted jobs.
+    pub fn push_evicting(&self, job: T) -> Vec<T> {
+        let mut jobs = self.jobs.lock().unwrap();
+        jobs.push_back(job);
+        let excess = jobs.len().saturating_sub(self.limit());
+        jobs.drain(..excess).collect()
+    }
+
+    /// Waits up to `timeout` for room to queue the job, else hands it back.
+    pub fn push_blocking(&self, job: T, timeout: Duration) -> Result<(), T> {
+        let deadline = Instant::now() + timeout;
+        self.waiters.fetch_add(1, Ordering::SeqCst);
+        let mut jobs = self.jobs.lock().unwrap();
+        let result = loop {
+            if jobs.len() < self.limit() {
+                jobs.push_back(job);
+                break Ok(());
+            }
+            let now = Instant::now();
+            if now >= deadline {
+                break Err(job);
+            }
+            jobs = self.space.wait_timeout(jobs, deadline - now).unwrap().0;
+        };
+        drop(jobs);
+        self.waiters.fetch_sub(1, Ordering::SeqCst);
+        result
+    }
+
+    /// Called by the worker to take the oldest job.
+    pub fn pop(&self) -> Option<T> {
+        let job = self.jobs.lock().unwrap().pop_front();
+        if job.is_some() {
+            self.notify_waiters();
+        }
+        job
+    }
+
+    /// Keeps every n-th job, n being the inverse of `rate`.
+    pub fn sample(&self, rate: f64) -> bool {
+        if !(rate > 0.0) {
+            return false;
+        }
+        let every = (1.0 / rate).round().max(1.0) as usize;
+        self.sampled.fetch_add(1, Ordering::Relaxed) % every == 0
+    }
+
+    fn notify_waiters(&self) {
+        // Producers only wait under the Block policy, so this is rarely needed
+        if self.waiters.load(Ordering::SeqCst) > 0 {
+            self.space.notify_all();
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::sync::Arc;
+
+    #[test]
+    fn test_policy_names() {
+        assert_eq!("drop-oldest".parse::<OverflowPolicy>(), Ok(OverflowPolicy::DropOldest));
+        assert_eq!("DROP_NEWEST".parse::<OverflowPolicy>(), Ok(OverflowPolicy::DropNewest));
+        assert!("fifo".parse::<OverflowPolicy>().is_err());
+    }
+
+    #[test]
+    fn test_evicting_push_drops_the_oldest() {
+        let gate = QueueGate::new(2);
+        assert!(gate.try_push(1).is_ok());
+        assert!(gate.try_push(2).is_ok());
+        assert_eq!(gate.try_push(3), Err(3));
+
+        assert_eq!(gate.push_evicting(3), vec![1]);
+        assert_eq!(gate.depth(), 2);
+        assert_eq!(gate.pop(), Some(2));
+        assert_eq!(gate.pop(), Some(3));
+        assert_eq!(gate.pop(), None);
+    }
+
+    #[test]
+    fn test_evicting_never_holds_more_than_the_limit() {
+        let gate = QueueGate::new(3);
+        let evicted: usize = (0..1000).map(|i| gate.push_evicting(i).len()).sum();
+        assert_eq!(evicted, 997);
+        assert_eq!(gate.depth(), 3);
+
+        // A lowered limit is enforced on the next push
+        gate.set_limit(1);
+        assert_eq!(gate.push_evicting(1000), vec![997, 998, 999]);
+        assert_eq!(gate.pop(), Some(1000));
+    }
+
+    #[test]
+    fn test_blocked_producer_wakes_when_worker_frees_a_slot() {
+        let gate = Arc::new(QueueGate::new(1));
+        assert!(gate.try_push(1).is_ok());
+        assert_eq!(gate.push_blocking(2, Duration::from_millis(20)), Err(2));
+
+        let worker = Arc::clone(&gate);
+        let handle = std::thread::spawn(move || {
+            std::thread::sleep(Duration::from_millis(50));
+            worker.pop();
+        });
+        assert!(gate.push_blocking(2, Duration::from_secs(5)).is_ok());
+        handle.join().unwrap();
+        assert_eq!(gate.pop(), Some(2));
+    }
+
+    #[test]
+    fn test_sampling_keeps_the_configured_share() {
+        let gate = QueueGate::<()>::new(10);
+        let kept = (0..100).filter(|_| gate.sample(0.1)).count();
+        assert_eq!(kept, 10);
+        assert!(!gate.sample(0.0));
+    }
+}
@@ -0,0 +1,87 @@
+//! The process-wide client behind the Python and R bindings.
+//!
+//! A forked child (multiprocessing, gunicorn workers, R's mclapply) inherits
+//! the parent's client but not its worker thread, so jobs queued there would
+//! never be sent. The client is therefore tagged with the pid that created it,
+//! and a child lazily builds its own on first use.
+
+use crate::gcore::GliaClient;
+use std::ptr;
+use std::sync::atomic::{AtomicPtr, Ordering};
+
+struct Slot {
+    pid: u32,
+    client: GliaClient,
+}
+
+/// Lock-free holder: a lock held by another thread at fork time would stay
+/// locked forever in the child.
+pub struct ProcessClient {
+    slot: AtomicPtr<Slot>,
+}
+
+impl ProcessClient {
+    pub const fn new() -> Self {
+        Self {
+            slot: AtomicPtr::new(ptr::null_mut()),
+        }
+    }
+
+    /// This process's client, if it has created one.
+    pub fn get(&self) -> Option<&'static GliaClient> {
+        self.get_for(std::process::id())
+    }
+
+    /// This process's client, created on first use, including after a fork.
+    pub fn get_or_init(&self, init: impl FnOnce() -> GliaClient) -> &'static GliaClient {
+        self.get_or_init_for(std::process::id(), init)
+    }
+
+    fn get_for(&self, pid: u32) -> Option<&'static GliaClient> {
+        // Published slots are never freed, so the reference lives as long as the process
+        let slot = unsafe { self.slot.load(Ordering::Acquire).as_ref() }?;
+        (slot.pid == pid).then_some(&slot.client)
+    }
+
+    fn get_or_init_for(&self, pid: u32, init: impl FnOnce() -> GliaClient) -> &'static GliaClient {
+        if let Some(client) = self.get_for(pid) {
+            return client;
+        }
+
+        let fresh = Box::into_raw(Box::new(Slot { pid, client: init() }));
+        let mut seen = self.slot.load(Ordering::Acquire);
+        loop {
+            if let Some(existing) = unsafe { seen.as_ref() }.filter(|slot| slot.pid == pid) {
+                // Another thread of this process got there first
+                drop(unsafe { Box::from_raw(fresh) });
+                return &existing.client;
+            }
+            match self.slot.compare_exchange(seen, fresh, Ordering::AcqRel, Ordering::Acquire) {
+                // The replaced slot, if any, is the parent's. Its spool segment
+                // and sockets belong to the parent, so it is leaked, not dropped.
+                Ok(_) => return unsafe { &(*fresh).client },
+                Err(current) => seen = current,
+            }
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_forked_child_gets_its_own_client() {
+        let cell = ProcessClient::new();
+        assert!(cell.get_for(100).is_none());
+
+        let parent = cell.get_or_init_for(100, || GliaClient::new(10));
+        assert!(std::ptr::eq(parent, cell.get_or_init_for(100, || unreachable!())));
+
+        // Same cell, different pid: what a child sees after fork()
+        assert!(cell.get_for(200).is_none());
+        let child = cell.get_or_init_for(200, || GliaClient::new(10));
+        assert!(!std::ptr::eq(parent, child));
+        assert!(std::ptr::eq(child, cell.get_for(200).unwrap()));
+    }
+}
@@ -1,34 +1,35 @@
 #![allow(unused_imports)]
 use pyo3::prelude::*;
+use pyo3::types::{PyBool, PyDate, PyDict, PyFloat, PyInt, PyList, PyString, PyTime, PyTuple};
+use serde_json::{Map, Value};
 use std::option::Option;
 use crate::gcore::GliaClient;
 use crate::gcore;
-use once_cell::sync::Lazy;
-use std::sync::Mutex;
+use crate::stats::CoreStats;
+use crate::metrics::{self, ProcessMetrics};
+use crate::process_client::ProcessClient;
 use std::env;
 use std::panic;
 
-static CLIENT: Lazy<Mutex<Option<GliaClient>>> = Lazy::new(|| Mutex::new(None));
+// Created on first use in each process (again after a fork), then read
+// without any lock from every Python thread
+static CLIENT: ProcessClient = ProcessClient::new();
 
-fn get_client() -> std::sync::MutexGuard<'static, Option<GliaClient>> {
-    let mut client_lock = CLIENT.lock().unwrap();
-    if client_lock.is_none() {
+fn get_client() -> &'static GliaClient {
+    CLIENT.get_or_init(|| {
         let limit = env::var("CORE_QUEUE_LIMIT")
             .ok()
             .and_then(|s| s.parse().ok())
             .unwrap_or(1000);
-        *client_lock = Some(GliaClient::new(limit));
-    }
-    client_lock
+        GliaClient::new(limit)
+    })
 }
 
 #[pyfunction]
 #[pyo3(signature = (json_payload, url, timeout=1.0))]
-pub fn enqueue_to_background(json_payload: String, url: String, timeout: f64) -> PyResult<()> {
-    let result = panic::catch_unwind(|| {
-        let client_lock = get_client();
-        let client = client_lock.as_ref().unwrap();
-        client.enqueue_to_background(&json_payload, &url, timeout)
+pub fn enqueue_to_background(py: Python<'_>, json_payload: String, url: String, timeout: f64) -> PyResult<()> {
+    let result = py.allow_threads(|| {
+        panic::catch_unwind(|| get_client().enqueue_to_background(&json_payload, &url, timeout))
     });
 
     match result {
@@ -37,31 +38,227 @@ pub fn enqueue_to_background(json_payload: String, url: String, timeout: f64) ->
     }
 }
 
+/// Converts a Python job record into JSON while the GIL is held.
+/// datetime/date/time values become ISO 8601 strings; any other object
+/// (UUID, Path, ...) falls back to str().
+fn py_to_json(obj: &Bound<'_, PyAny>) -> PyResult<Value> {
+    if obj.is_none() {
+        return Ok(Value::Null);
+    }
+    // bool before int: Python's bool is an int subclass
+    if let Ok(b) = obj.downcast::<PyBool>() {
+        return Ok(Value::Bool(b.is_true()));
+    }
+    if let Ok(i) = obj.downcast::<PyInt>() {
+        if let Ok(v) = i.extract::<i64>() {
+            return Ok(Value::from(v));
+        }
+        if let Ok(v) = i.extract::<u64>() {
+            return Ok(Value::from(v));
+        }
+        return Ok(Value::from(i.extract::<f64>()?));
+    }
+    if let Ok(f) = obj.downcast::<PyFloat>() {
+        // NaN and infinities have no JSON form and become null
+        return Ok(Value::from(f.value()));
+    }
+    if let Ok(s) = obj.downcast::<PyString>() {
+        return Ok(Value::String(s.to_str()?.to_owned()));
+    }
+    if let Ok(dict) = obj.downcast::<PyDict>() {
+        let mut map = Map::with_capacity(dict.len());
+        for (key, value) in dict.iter() {
+            let key = match key.downcast::<PyString>() {
+                Ok(s) => s.to_str()?.to_owned(),
+                Err(_) => key.str()?.to_str()?.to_owned(),
+            };
+            map.insert(key, py_to_json(&value)?);
+        }
+        return Ok(Value::Object(map));
+    }
+    if let Ok(list) = obj.downcast::<PyList>() {
+        return list.iter().map(|v| py_to_json(&v)).collect::<PyResult<Vec<Value>>>().map(Value::Array);
+    }
+    if let Ok(tuple) = obj.downcast::<PyTuple>() {
+        return tuple.iter().map(|v| py_to_json(&v)).collect::<PyResult<Vec<Value>>>().map(Value::Array);
+    }
+    if obj.downcast::<PyDate>().is_ok() || obj.downcast::<PyTime>().is_ok() {
+        return Ok(Value::String(obj.call_method0("isoformat")?.extract()?));
+    }
+    Ok(Value::String(obj.str()?.to_str()?.to_owned()))
+}
+
+/// Queues a job record (a dict, e.g. from model_dump()) without going through
+/// a JSON string: gcore serializes it straight into the batch body.
 #[pyfunction]
-pub fn flush_queue() -> PyResult<PyFlushSummary> {
-    let result = panic::catch_unwind(|| {
-        let client_lock = CLIENT.lock().unwrap();
-        if let Some(client) = client_lock.as_ref() {
-            let summary = client.flush();
-            Some(PyFlushSummary {
-                failed_jobs: summary.failed_jobs,
-                common_errors: summary.common_errors,
-            })
-        } else {
-            None
+#[pyo3(signature = (record, url, timeout=1.0))]
+pub fn enqueue_record(py: Python<'_>, record: &Bound<'_, PyAny>, url: String, timeout: f64) -> PyResult<()> {
+    // Walking the Python objects needs the GIL; the hand-off itself does not
+    let value = py_to_json(record)?;
+    let result = py.allow_threads(|| {
+        panic::catch_unwind(|| get_client().enqueue_record(value, &url, timeout))
+    });
+
+    match result {
+        Ok(inner) => inner.map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(format!("[CORE] {}", e))),
+        Err(_) => Err(pyo3::exceptions::PyRuntimeError::new_err("[CORE] Rust panicked during enqueue_record")),
+    }
+}
+
+/// Queues a sequence of job records in one call. They reach the worker as one
+/// message per batch instead of one FFI call and channel send per job.
+/// Returns the number of records queued.
+#[pyfunction]
+#[pyo3(signature = (records, url, timeout=1.0))]
+pub fn enqueue_many(py: Python<'_>, records: &Bound<'_, PyAny>, url: String, timeout: f64) -> PyResult<usize> {
+    let values = records
+        .try_iter()?
+        .map(|record| py_to_json(&record?))
+        .collect::<PyResult<Vec<Value>>>()?;
+    let result = py.allow_threads(|| {
+        panic::catch_unwind(|| get_client().enqueue_many(values, &url, timeout))
+    });
+
+    match result {
+        Ok(inner) => inner.map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(format!("[CORE] {}", e))),
+        Err(_) => Err(pyo3::exceptions::PyRuntimeError::new_err("[CORE] Rust panicked during enqueue_many")),
+    }
+}
+
+/// Changes settings of the running gcore worker, e.g.
+/// configure(batch_size=500, linger_ms=100, compression="zstd").
+/// Raises ValueError, changing nothing, if any setting is unknown or invalid.
+#[pyfunction]
+#[pyo3(signature = (**settings))]
+pub fn configure(py: Python<'_>, settings: Option<&Bound<'_, PyDict>>) -> PyResult<()> {
+    let mut map = Map::new();
+    if let Some(settings) = settings {
+        for (key, value) in settings.iter() {
+            map.insert(key.extract::<String>()?, py_to_json(&value)?);
         }
+    }
+    let result = py.allow_threads(|| {
+        panic::catch_unwind(|| get_client().configure(&map))
+    });
+
+    match result {
+        Ok(inner) => inner.map_err(|e| pyo3::exceptions::PyValueError::new_err(format!("[CORE] {}", e))),
+        Err(_) => Err(pyo3::exceptions::PyRuntimeError::new_err("[CORE] Rust panicked during configure")),
+    }
+}
+
+/// Blocks for up to the flush timeout (CORE_FLUSH_TIMEOUT_SEC), so the GIL is released meanwhile
+/// and other Python threads keep running during the atexit flush.
+#[pyfunction]
+pub fn flush_queue(py: Python<'_>) -> PyResult<PyFlushSummary> {
+    let result = py.allow_threads(|| {
+        panic::catch_unwind(|| {
+            CLIENT.get().map(|client| {
+                let summary = client.flush();
+                PyFlushSummary {
+                    failed_jobs: summary.failed_jobs,
+                    spilled_jobs: summary.spilled_jobs,
+                    common_errors: summary.common_errors,
+                }
+            })
+        })
     });
 
     match result {
         Ok(Some(summary)) => Ok(summary),
         Ok(None) => Ok(PyFlushSummary {
             failed_jobs: 0,
+            spilled_jobs: 0,
             common_errors: Vec::new(),
         }),
         Err(_) => Err(pyo3::exceptions::PyRuntimeError::new_err("[CORE] Rust panicked during flush_queue")),
     }
 }
 
+/// Live counters of the gcore worker. Unlike flush_queue, reading them resets nothing.
+#[pyfunction]
+pub fn stats(py: Python<'_>) -> PyResult<PyCoreStats> {
+    let result = py.allow_threads(|| {
+        panic::catch_unwind(|| CLIENT.get().map(|client| client.stats()).unwrap_or_default())
+    });
+
+    match result {
+        Ok(stats) => Ok(stats.into()),
+        Err(_) => Err(pyo3::exceptions::PyRuntimeError::new_err("[CORE] Rust panicked during stats")),
+    }
+}
+
+/// Runs a native reader off the GIL, turning its I/O errors into OSError.
+fn read_natively<T: Send>(
+    py: Python<'_>,
+    name: &str,
+    read: impl FnOnce() -> std::io::Result<T> + Send + panic::UnwindSafe,
+) -> PyResult<T> {
+    match py.allow_threads(|| panic::catch_unwind(read)) {
+        Ok(inner) => inner.map_err(|e| pyo3::exceptions::PyOSError::new_err(format!("[CORE] {}", e))),
+        Err(_) => Err(pyo3::exceptions::PyRuntimeError::new_err(format!("[CORE] Rust panicked during {}", name))),
+    }
+}
+
+/// One reading of this process from /proc and its cgroup v2 files.
+/// Raises OSError where they are not available (anything but Linux).
+#[pyfunction]
+pub fn process_metrics(py: Python<'_>) -> PyResult<PyProcessMetrics> {
+    read_natively(py, "process_metrics", || metrics::read_process_metrics().map(PyProcessMetrics::from))
+}
+
+/// (user, system, children user, children system) CPU seconds, from
+/// /proc/self/stat alone. Raises OSError off Linux.
+#[pyfunction]
+pub fn process_cpu_times(py: Python<'_>) -> PyResult<(f64, f64, f64, f64)> {
+    read_natively(py, "process_cpu_times", || {
+        metrics::read_cpu_times().map(|c| (c.user_sec, c.system_sec, c.children_user_sec, c.children_system_sec))
+    })
+}
+
+/// (RSS, peak RSS) in kB, from /proc/self/status alone. Raises OSError off Linux.
+#[pyfunction]
+pub fn process_memory(py: Python<'_>) -> PyResult<(u64, u64)> {
+    read_natively(py, "process_memory", || metrics::read_memory().map(|m| (m.rss_kb, m.peak_rss_kb)))
+}
+
+/// (user CPU seconds, system CPU seconds, RSS in kB): one sampler tick.
+/// Raises OSError off Linux.
+#[pyfunction]
+pub fn process_usage(py: Python<'_>) -> PyResult<(f64, f64, u64)> {
+    read_natively(py, "process_usage", || {
+        let cpu = metrics::read_cpu_times()?;
+        Ok((cpu.user_sec, cpu.system_sec, metrics::read_memory()?.rss_kb))
+    })
+}
+
+/// (read calls, write calls, read bytes, write bytes), from /proc/self/io.
+/// Raises OSError off Linux or where the file is not readable.
+#[pyfunction]
+pub fn process_io(py: Python<'_>) -> PyResult<(u64, u64, u64, u64)> {
+    read_natively(py, "process_io", || {
+        metrics::read_io().map(|io| (io.read_count, io.write_count, io.read_bytes, io.write_bytes))
+    })
+}
+
+/// (CPU seconds, nr_throttled, throttled seconds, memory kB, peak memory kB)
+/// of this process's cgroup v2, or None outside one.
+#[pyfunction]
+pub fn process_cgroup(py: Python<'_>) -> PyResult<Option<(f64, u64, f64, Option<u64>, Option<u64>)>> {
+    read_natively(py, "process_cgroup", || {
+        Ok(metrics::read_cgroup().map(|c| {
+            (c.cpu_usage_sec, c.nr_throttled, c.throttled_sec, c.memory_current_kb, c.memory_peak_kb)
+        }))
+    })
+}
+
+/// (RSS in kB, process count) of this process and all its live descendants.
+/// Raises OSError off Linux.
+#[pyfunction]
+pub fn process_tree_rss(py: Python<'_>) -> PyResult<(u64, usize)> {
+    read_natively(py, "process_tree_rss", || metrics::read_tree_rss().map(|tree| (tree.rss_kb, tree.processes)))
+}
+
 #[pyfunction]
 pub fn trigger_panic() -> PyResult<()> {
     let result = panic::catch_unwind(|| {
@@ -79,5 +276,124 @@ pub struct PyFlushSummary {
     #[pyo3(get)]
     pub failed_jobs: usize,
     #[pyo3(get)]
+    pub spilled_jobs: usize,
+    #[pyo3(get)]
     pub common_errors: Vec<(String, usize)>,
 }
+
+#[pyclass(name = "CoreStats")]
+pub struct PyCoreStats {
+    #[pyo3(get)]
+    pub queue_depth: usize,
+    #[pyo3(get)]
+    pub queue_limit: usize,
+    #[pyo3(get)]
+    pub enqueued_jobs: usize,
+    #[pyo3(get)]
+    pub sent_jobs: usize,
+    #[pyo3(get)]
+    pub dropped_jobs: usize,
+    #[pyo3(get)]
+    pub evicted_jobs: usize,
+    #[pyo3(get)]
+    pub sampled_out_jobs: usize,
+    #[pyo3(get)]
+    pub blocked_enqueues: usize,
+    #[pyo3(get)]
+    pub block_timeouts: usize,
+    #[pyo3(get)]
+    pub failed_jobs: usize,
+    #[pyo3(get)]
+    pub spilled_jobs: usize,
+    #[pyo3(get)]
+    pub batches_sent: usize,
+    #[pyo3(get)]
+    pub bytes_sent: usize,
+    #[pyo3(get)]
+    pub batch_jobs: Vec<(f64, usize)>,
+    #[pyo3(get)]
+    pub send_latency_ms: Vec<(f64, usize)>,
+    #[pyo3(get)]
+    pub last_error: Option<String>,
+}
+
+impl From<CoreStats> for PyCoreStats {
+    fn from(stats: CoreStats) -> Self {
+        Self {
+            queue_depth: stats.queue_depth,
+            queue_limit: stats.queue_limit,
+            enqueued_jobs: stats.enqueued_jobs,
+            sent_jobs: stats.sent_jobs,
+            dropped_jobs: stats.dropped_jobs,
+            evicted_jobs: stats.evicted_jobs,
+            sampled_out_jobs: stats.sampled_out_jobs,
+            blocked_enqueues: stats.blocked_enqueues,
+            block_timeouts: stats.block_timeouts,
+            failed_jobs: stats.failed_jobs,
+            spilled_jobs: stats.spilled_jobs,
+            batches_sent: stats.batches_sent,
+            bytes_sent: stats.bytes_sent,
+            batch_jobs: stats.batch_jobs,
+            send_latency_ms: stats.send_latency_ms,
+            last_error: stats.last_error,
+        }
+    }
+}
+
+#[pyclass(name = "ProcessMetrics")]
+pub struct PyProcessMetrics {
+    #[pyo3(get)]
+    pub user_sec: f64,
+    #[pyo3(get)]
+    pub system_sec: f64,
+    #[pyo3(get)]
+    pub children_user_sec: f64,
+    #[pyo3(get)]
+    pub children_system_sec: f64,
+    #[pyo3(get)]
+    pub rss_kb: u64,
+    #[pyo3(get)]
+    pub peak_rss_kb: u64,
+    #[pyo3(get)]
+    pub read_bytes: Option<u64>,
+    #[pyo3(get)]
+    pub write_bytes: Option<u64>,
+    #[pyo3(get)]
+    pub read_count: Option<u64>,
+    #[pyo3(get)]
+    pub write_count: Option<u64>,
+    #[pyo3(get)]
+    pub cgroup_cpu_usage_sec: Option<f64>,
+    #[pyo3(get)]
+    pub cgroup_nr_throttled: Option<u64>,
+    #[pyo3(get)]
+    pub cgroup_throttled_sec: Option<f64>,
+    #[pyo3(get)]
+    pub cgroup_memory_current_kb: Option<u64>,
+    #[pyo3(get)]
+    pub cgroup_memory_peak_kb: Option<u64>,
+}
+
+impl From<ProcessMetrics> for PyProcessMetrics {
+    fn from(m: ProcessMetrics) -> Self {
+        let io = m.io.as_ref();
+        let cgroup = m.cgroup.as_ref();
+        Self {
+            user_sec: m.user_sec,
+            system_sec: m.system_sec,
+            children_user_sec: m.children_user_sec,
+            children_system_sec: m.children_system_sec,
+            rss_kb: m.rss_kb,
+            peak_rss_kb: m.peak_rss_kb,
+            read_bytes: io.map(|io| io.read_bytes),
+            write_bytes: io.map(|io| io.write_bytes),
+            read_count: io.map(|io| io.read_count),
+            write_count: io.map(|io| io.write_count),
+            cgroup_cpu_usage_sec: cgroup.map(|c| c.cpu_usage_sec),
+            cgroup_nr_throttled: cgroup.map(|c| c.nr_throttled),
+            cgroup_throttled_sec: cgroup.map(|c| c.throttled_sec),
+            cgroup_memory_current_kb: cgroup.and_then(|c| c.memory_current_kb),
+            cgroup_memory_peak_kb: cgroup.and_then(|c| c.memory_peak_kb),
+        }
+    }
+}
@@ -1,31 +1,29 @@
 use extendr_api::prelude::*;
 use crate::gcore::{self, GliaClient};
-use once_cell::sync::Lazy;
-use std::sync::Mutex;
+use crate::metrics;
+use crate::process_client::ProcessClient;
 use std::env;
 use std::panic;
+use serde_json::Value;
 
-static CLIENT: Lazy<Mutex<Option<GliaClient>>> = Lazy::new(|| Mutex::new(None));
+// Created on first use in each process, including mclapply's forked workers
+static CLIENT: ProcessClient = ProcessClient::new();
 
-fn get_client() -> std::sync::MutexGuard<'static, Option<GliaClient>> {
-    let mut client_lock = CLIENT.lock().unwrap();
-    if client_lock.is_none() {
+fn get_client() -> &'static GliaClient {
+    CLIENT.get_or_init(|| {
         let limit = env::var("CORE_QUEUE_LIMIT")
             .ok()
             .and_then(|s| s.parse().ok())
             .unwrap_or(1000);
-        *client_lock = Some(GliaClient::new(limit));
-    }
-    client_lock
+        GliaClient::new(limit)
+    })
 }
 
 /// @export
 #[extendr]
 pub fn enqueue_to_background(json_payload: String, url: String, timeout: f64) -> Robj {
     let result = panic::catch_unwind(|| {
-        let client_lock = get_client();
-        let client = client_lock.as_ref().unwrap();
-        client.enqueue_to_background(&json_payload, &url, timeout)
+        get_client().enqueue_to_background(&json_payload, &url, timeout)
     });
 
     match result {
@@ -35,12 +33,99 @@ pub fn enqueue_to_background(json_payload: String, url: String, timeout: f64) ->
     }
 }
 
+/// R lists with names become JSON objects and unnamed lists arrays;
+/// length-1 atomic vectors become scalars, like jsonlite's auto_unbox.
+/// NA becomes null.
+fn robj_to_json(robj: &Robj) -> Value {
+    match robj.rtype() {
+        Rtype::List => {
+            let list = robj.as_list().unwrap();
+            match robj.names() {
+                Some(names) => Value::Object(
+                    names.zip(list.values()).map(|(k, v)| (k.to_string(), robj_to_json(&v))).collect(),
+                ),
+                None => Value::Array(list.values().map(|v| robj_to_json(&v)).collect()),
+            }
+        }
+        Rtype::Logicals => unbox(robj.as_logical_slice().unwrap().iter()
+            .map(|b| if b.is_na() { Value::Null } else { Value::Bool(b.is_true()) })
+            .collect()),
+        Rtype::Integers => unbox(robj.as_integer_slice().unwrap().iter()
+            .map(|i| if i.is_na() { Value::Null } else { Value::from(*i) })
+            .collect()),
+        // NA_real_ is a NaN, which has no JSON form and becomes null
+        Rtype::Doubles => unbox(robj.as_real_slice().unwrap().iter().map(|f| Value::from(*f)).collect()),
+        Rtype::Strings => unbox(robj.as_str_iter().unwrap()
+            .map(|s| if s.is_na() { Value::Null } else { Value::String(s.to_string()) })
+            .collect()),
+        _ => Value::Null,
+    }
+}
+
+fn unbox(mut values: Vec<Value>) -> Value {
+    if values.len() == 1 {
+        values.pop().unwrap()
+    } else {
+        Value::Array(values)
+    }
+}
+
+/// @export
+#[extendr]
+pub fn enqueue_record(record: Robj, url: String, timeout: f64) -> Robj {
+    let result = panic::catch_unwind(panic::AssertUnwindSafe(|| {
+        get_client().enqueue_record(robj_to_json(&record), &url, timeout)
+    }));
+
+    match result {
+        Ok(Ok(_)) => list!(success = true).into(),
+        Ok(Err(e)) => list!(success = false, error = format!("[CORE] {}", e)).into(),
+        Err(_) => list!(success = false, error = "[CORE] Rust panicked during enqueue_record").into(),
+    }
+}
+
+/// @export
+#[extendr]
+pub fn enqueue_many(records: List, url: String, timeout: f64) -> Robj {
+    let result = panic::catch_unwind(panic::AssertUnwindSafe(|| {
+        let values = records.values().map(|record| robj_to_json(&record)).collect();
+        get_client().enqueue_many(values, &url, timeout)
+    }));
+
+    match result {
+        Ok(Ok(queued)) => list!(success = true, queued = queued as i32).into(),
+        Ok(Err(e)) => list!(success = false, error = format!("[CORE] {}", e)).into(),
+        Err(_) => list!(success = false, error = "[CORE] Rust panicked during enqueue_many").into(),
+    }
+}
+
+/// Changes settings of the running gcore worker from a named list,
+/// e.g. `list(batch_size = 500, linger_ms = 100)`.
+/// @export
+#[extendr]
+pub fn core_configure(settings: List) -> Robj {
+    let result = panic::catch_unwind(panic::AssertUnwindSafe(|| {
+        let settings: Robj = settings.into();
+        match robj_to_json(&settings) {
+            Value::Object(map) => get_client().configure(&map),
+            // An empty list() has no names
+            Value::Array(items) if items.is_empty() => Ok(()),
+            _ => Err("settings must be a named list".to_string()),
+        }
+    }));
+
+    match result {
+        Ok(Ok(_)) => list!(success = true).into(),
+        Ok(Err(e)) => list!(success = false, error = format!("[CORE] {}", e)).into(),
+        Err(_) => list!(success = false, error = "[CORE] Rust panicked during core_configure").into(),
+    }
+}
+
 /// @export
 #[extendr]
 pub fn flush_queue() -> Robj {
     let result = panic::catch_unwind(|| {
-        let client_lock = CLIENT.lock().unwrap();
-        if let Some(client) = client_lock.as_ref() {
+        if let Some(client) = CLIENT.get() {
             let summary = client.flush();
             let errors: Vec<Robj> = summary.common_errors
                 .into_iter()
@@ -49,6 +134,7 @@ pub fn flush_queue() -> Robj {
             
             Some(list!(
                 failed_jobs = summary.failed_jobs,
+                spilled_jobs = summary.spilled_jobs,
                 common_errors = errors
             ))
         } else {
@@ -58,11 +144,127 @@ pub fn flush_queue() -> Robj {
 
     match result {
         Ok(Some(summary)) => summary.into(),
-        Ok(None) => list!(failed_jobs = 0, common_errors = list!()).into(),
+        Ok(None) => list!(failed_jobs = 0, spilled_jobs = 0, common_errors = list!()).into(),
         Err(_) => list!(success = false, error = "[CORE] Rust panicked during flush_queue").into(),
     }
 }
 
+fn histogram_to_robj(buckets: Vec<(f64, usize)>) -> Robj {
+    let (le, count): (Vec<f64>, Vec<f64>) = buckets.into_iter().map(|(le, n)| (le, n as f64)).unzip();
+    list!(le = le, count = count).into()
+}
+
+/// Live counters of the gcore worker. Unlike flush_queue, reading them resets nothing.
+/// @export
+#[extendr]
+pub fn core_stats() -> Robj {
+    let result = panic::catch_unwind(|| CLIENT.get().map(|client| client.stats()).unwrap_or_default());
+
+    match result {
+        // Counts go to R as doubles, which do not overflow like R integers
+        Ok(stats) => list!(
+            queue_depth = stats.queue_depth as f64,
+            queue_limit = stats.queue_limit as f64,
+            enqueued_jobs = stats.enqueued_jobs as f64,
+            sent_jobs = stats.sent_jobs as f64,
+            dropped_jobs = stats.dropped_jobs as f64,
+            evicted_jobs = stats.evicted_jobs as f64,
+            sampled_out_jobs = stats.sampled_out_jobs as f64,
+            blocked_enqueues = stats.blocked_enqueues as f64,
+            block_timeouts = stats.block_timeouts as f64,
+            failed_jobs = stats.failed_jobs as f64,
+            spilled_jobs = stats.spilled_jobs as f64,
+            batches_sent = stats.batches_sent as f64,
+            bytes_sent = stats.bytes_sent as f64,
+            batch_jobs = histogram_to_robj(stats.batch_jobs),
+            send_latency_ms = histogram_to_robj(stats.send_latency_ms),
+            last_error = stats.last_error.map_or_else(|| Robj::from(()), Robj::from)
+        ).into(),
+        Err(_) => list!(success = false, error = "[CORE] Rust panicked during core_stats").into(),
+    }
+}
+
+fn optional_to_robj(value: Option<f64>) -> Robj {
+    value.map_or_else(|| Robj::from(()), Robj::from)
+}
+
+/// One reading of this process from /proc and its cgroup v2 files.
+/// NULL where they are not available (anything but Linux); fields that could
+/// not be read, such as the cgroup ones outside cgroup v2, are NULL too.
+/// @export
+#[extendr]
+pub fn process_metrics() -> Robj {
+    match panic::catch_unwind(metrics::read_process_metrics) {
+        Ok(Ok(m)) => {
+            let io = m.io.as_ref();
+            let cgroup = m.cgroup.as_ref();
+            list!(
+                user_sec = m.user_sec,
+                system_sec = m.system_sec,
+                children_user_sec = m.children_user_sec,
+                children_system_sec = m.children_system_sec,
+                rss_kb = m.rss_kb as f64,
+                peak_rss_kb = m.peak_rss_kb as f64,
+                read_bytes = optional_to_robj(io.map(|io| io.read_bytes as f64)),
+                write_bytes = optional_to_robj(io.map(|io| io.write_bytes as f64)),
+                read_count = optional_to_robj(io.map(|io| io.read_count as f64)),
+                write_count = optional_to_robj(io.map(|io| io.write_count as f64)),
+                cgroup_cpu_usage_sec = optional_to_robj(cgroup.map(|c| c.cpu_usage_sec)),
+                cgroup_nr_throttled = optional_to_robj(cgroup.map(|c| c.nr_throttled as f64)),
+                cgroup_throttled_sec = optional_to_robj(cgroup.map(|c| c.throttled_sec)),
+                cgroup_memory_current_kb = optional_to_robj(cgroup.and_then(|c| c.memory_current_kb).map(|kb| kb as f64)),
+                cgroup_memory_peak_kb = optional_to_robj(cgroup.and_then(|c| c.memory_peak_kb).map(|kb| kb as f64))
+            ).into()
+        }
+        _ => Robj::from(()),
+    }
+}
+
+/// CPU seconds of this process from /proc/self/stat alone, as list(user_sec,
+/// system_sec, children_user_sec, children_system_sec). NULL off Linux.
+/// @export
+#[extendr]
+pub fn process_cpu_times() -> Robj {
+    match panic::catch_unwind(metrics::read_cpu_times) {
+        Ok(Ok(cpu)) => list!(
+            user_sec = cpu.user_sec,
+            system_sec = cpu.system_sec,
+            children_user_sec = cpu.children_user_sec,
+            children_system_sec = cpu.children_system_sec
+        ).into(),
+        _ => Robj::from(()),
+    }
+}
+
+/// CPU seconds and memory of this process from /proc/self/stat and status,
+/// as list(user_sec, system_sec, rss_kb, peak_rss_kb): what a tracker needs
+/// at capture. NULL off Linux.
+/// @export
+#[extendr]
+pub fn process_usage() -> Robj {
+    let read = || -> std::io::Result<_> { Ok((metrics::read_cpu_times()?, metrics::read_memory()?)) };
+    match panic::catch_unwind(read) {
+        Ok(Ok((cpu, memory))) => list!(
+            user_sec = cpu.user_sec,
+            system_sec = cpu.system_sec,
+            rss_kb = memory.rss_kb as f64,
+            peak_rss_kb = memory.peak_rss_kb as f64
+        ).into(),
+        _ => Robj::from(()),
+    }
+}
+
+/// RSS of this process and all its live descendants, e.g. mclapply workers,
+/// as list(rss_kb, processes). NULL off Linux.
+/// @export
+#[extendr]
+pub fn process_tree_rss() -> Robj {
+    match panic::catch_unwind(metrics::read_tree_rss) {
+        Ok(Ok(tree)) => list!(rss_kb = tree.rss_kb as f64, processes = tree.processes as f64).into(),
+        _ => Robj::from(()),
+    }
+}
+
 /// @export
 #[extendr]
 pub fn trigger_panic() {
@@ -74,6 +276,14 @@ pub fn trigger_panic() {
 extendr_module! {
     mod gliar; 
     fn enqueue_to_background;
+    fn enqueue_record;
+    fn enqueue_many;
+    fn core_configure;
     fn flush_queue;
+    fn core_stats;
+    fn process_metrics;
+    fn process_cpu_times;
+    fn process_usage;
+    fn process_tree_rss;
     fn trigger_panic;
 }
@@ -0,0 +1,160 @@
+use std::collections::hash_map::RandomState;
+use std::hash::{BuildHasher, Hasher};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Mutex;
+use std::time::{Duration, Instant};
+
+/// How failed batch sends are retried.
+#[derive(Clone, Debug)]
+pub struct RetryPolicy {
+    pub max_retries: u32,
+    pub base_backoff_ms: u64,
+    pub max_backoff_ms: u64,
+}
+
+impl RetryPolicy {
+    /// Exponential backoff with full jitter: a random delay in
+    /// [0, min(max_backoff, base * 2^attempt)], so clients that failed
+    /// together do not retry together.
+    pub fn backoff(&self, attempt: u32) -> Duration {
+        let ceiling = self
+            .base_backoff_ms
+            .saturating_mul(1u64 << attempt.min(20))
+            .min(self.max_backoff_ms);
+        Duration::from_millis(random_u64() % (ceiling + 1))
+    }
+}
+
+/// RandomState is seeded per instance, which is enough randomness for jitter
+/// without pulling in a rand dependency.
+fn random_u64() -> u64 {
+    let mut hasher = RandomState::new().build_hasher();
+    hasher.write_u64(0);
+    hasher.finish()
+}
+
+/// Stops sending to a backend that keeps failing.
+/// After `threshold` consecutive failed attempts the breaker opens and batches
+/// fail fast for `cooldown`. After that it is half-open: a single send is let
+/// through as a probe while everything else keeps failing fast. A success
+/// closes the breaker, a failure re-opens it for another cooldown.
+pub struct CircuitBreaker {
+    threshold: usize,
+    cooldown: Duration,
+    consecutive_failures: AtomicUsize,
+    /// While open, when the next probe may go out
+    open_until: Mutex<Option<Instant>>,
+}
+
+impl CircuitBreaker {
+    pub fn new(threshold: usize, cooldown: Duration) -> Self {
+        Self {
+            threshold: threshold.max(1),
+            cooldown,
+            consecutive_failures: AtomicUsize::new(0),
+            open_until: Mutex::new(None),
+        }
+    }
+
+    /// Whether a send may go out now. Once the cooldown is over, the first
+    /// caller becomes the probe and pushes the deadline back by another
+    /// cooldown, so concurrent senders are still refused while it runs, and a
+    /// probe that never reports back cannot keep the breaker half-open forever.
+    pub fn allow(&self) -> bool {
+        let mut open_until = self.open_until.lock().unwrap();
+        match *open_until {
+            None => true,
+            Some(until) => {
+                let now = Instant::now();
+                if now < until {
+                    return false;
+                }
+                *open_until = Some(now + self.cooldown);
+                true
+            }
+        }
+    }
+
+    /// Whether sends are refused right now; unlike `allow`, never takes the probe.
+    pub fn is_open(&self) -> bool {
+        self.open_until.lock().unwrap().map_or(false, |until| Instant::now() < until)
+    }
+
+    pub fn record_success(&self) {
+        self.consecutive_failures.store(0, Ordering::SeqCst);
+        *self.open_until.lock().unwrap() = None;
+    }
+
+    pub fn record_failure(&self) {
+        let failures = self.consecutive_failures.fetch_add(1, Ordering::SeqCst) + 1;
+        if failures >= self.threshold {
+            *self.open_until.lock().unwrap() = Some(Instant::now() + self.cooldown);
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_backoff_is_bounded() {
+        let policy = RetryPolicy {
+            max_retries: 5,
+            base_backoff_ms: 100,
+            max_backoff_ms: 1000,
+        };
+        for attempt in 0..30 {
+            let ceiling = (100u64 << attempt.min(20)).min(1000);
+            assert!(policy.backoff(attempt) <= Duration::from_millis(ceiling));
+        }
+    }
+
+    #[test]
+    fn test_breaker_opens_after_threshold_and_recovers() {
+        let breaker = CircuitBreaker::new(2, Duration::from_millis(50));
+        assert!(breaker.allow());
+
+        breaker.record_failure();
+        assert!(breaker.allow());
+        breaker.record_failure();
+        assert!(breaker.is_open());
+
+        std::thread::sleep(Duration::from_millis(60));
+        assert!(!breaker.is_open());
+        assert!(breaker.allow()); // half-open probe
+        assert!(!breaker.allow()); // only one at a time
+
+        breaker.record_failure();
+        assert!(breaker.is_open()); // a failed probe re-opens immediately
+
+        std::thread::sleep(Duration::from_millis(60));
+        assert!(breaker.allow());
+        breaker.record_success();
+        assert!(breaker.allow());
+        assert!(breaker.allow());
+    }
+
+    #[test]
+    fn test_half_open_breaker_admits_a_single_probe() {
+        let breaker = CircuitBreaker::new(1, Duration::from_millis(20));
+        breaker.record_failure();
+        std::thread::sleep(Duration::from_millis(30));
+
+        let admitted = AtomicUsize::new(0);
+        std::thread::scope(|scope| {
+            for _ in 0..8 {
+                scope.spawn(|| {
+                    if breaker.allow() {
+                        admitted.fetch_add(1, Ordering::SeqCst);
+                    }
+                });
+            }
+        });
+        assert_eq!(admitted.load(Ordering::SeqCst), 1);
+
+        // A probe that never reports back frees the slot after another cooldown
+        std::thread::sleep(Duration::from_millis(30));
+        assert!(breaker.allow());
+    }
+}
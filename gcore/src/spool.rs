@@ -0,0 +1,368 @@
+use serde::{Deserialize, Serialize};
+use std::fs::{self, File, OpenOptions};
+use std::io::{BufRead, BufReader, Write};
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::{Arc, Mutex};
+use std::time::{Duration, SystemTime, UNIX_EPOCH};
+
+// Segment lifecycle, encoded in the file name so several processes can share one directory:
+//   <created_ms>-<pid>-<seq>.open           being appended to by <pid>
+//   <created_ms>-<pid>-<seq>.seg            sealed, waiting for replay
+//   <created_ms>-<pid>-<seq>.<claimer>.replay  claimed by process <claimer>
+const OPEN_EXT: &str = "open";
+const SEALED_EXT: &str = "seg";
+const REPLAY_EXT: &str = "replay";
+
+/// One undeliverable batch. The body is the merged, uncompressed JSON array.
+#[derive(Serialize, Deserialize, Debug, Clone, PartialEq)]
+pub struct SpoolRecord {
+    pub url: String,
+    pub timeout_sec: f64,
+    pub jobs: usize,
+    pub body: String,
+}
+
+struct ActiveSegment {
+    path: PathBuf,
+    file: File,
+    size: u64,
+}
+
+/// Append-only, segment-based spool for batches the backend could not take.
+/// Records are newline-delimited JSON; a torn last line from a crash is skipped
+/// on replay. Replay is at-least-once, which the backend's run_id dedup absorbs.
+pub struct Spool {
+    dir: PathBuf,
+    max_bytes: u64,
+    segment_max_bytes: u64,
+    active: Mutex<Option<ActiveSegment>>,
+    seq: AtomicU64,
+    /// Bytes in the directory: scanned once by `open`, then kept up to date
+    /// by appends and completed replays, so appends never list the directory.
+    /// Segments written by other processes sharing the directory since `open`
+    /// are not seen until the next one.
+    used: Arc<AtomicU64>,
+}
+
+impl Spool {
+    pub fn open(dir: impl Into<PathBuf>, max_bytes: u64, segment_max_bytes: u64) -> std::io::Result<Self> {
+        let dir = dir.into();
+        fs::create_dir_all(&dir)?;
+        let used = scan_disk_usage(&dir)?;
+        Ok(Self {
+            dir,
+            max_bytes,
+            segment_max_bytes: segment_max_bytes.max(1),
+            active: Mutex::new(None),
+            seq: AtomicU64::new(0),
+            used: Arc::new(AtomicU64::new(used)),
+        })
+    }
+
+    pub fn dir(&self) -> &Path {
+        &self.dir
+    }
+
+    /// Appends a record, rolling to a new segment past `segment_max_bytes`.
+    /// Fails rather than growing the directory past `max_bytes`.
+    pub fn append(&self, record: &SpoolRecord) -> std::io::Result<()> {
+        let mut line = serde_json::to_vec(record)?;
+        line.push(b'\n');
+
+        let len = line.len() as u64;
+
+        let mut active = self.active.lock().unwrap();
+        let reserved = self.used.fetch_update(Ordering::SeqCst, Ordering::SeqCst, |used| {
+            (used + len <= self.max_bytes).then_some(used + len)
+        });
+        if reserved.is_err() {
+            return Err(std::io::Error::new(
+                std::io::ErrorKind::Other,
+                format!("spool is full ({} bytes cap)", self.max_bytes),
+            ));
+        }
+
+        let written = self.write_line(&mut active, &line);
+        if written.is_err() {
+            release(&self.used, len);
+        }
+        written
+    }
+
+    fn write_line(&self, active: &mut Option<ActiveSegment>, line: &[u8]) -> std::io::Result<()> {
+        if active.as_ref().map_or(false, |s| s.size >= self.segment_max_bytes) {
+            Self::seal_segment(active.take());
+        }
+        if active.is_none() {
+            let path = self.dir.join(format!(
+                "{:013}-{}-{:06}.{}",
+                now_ms(),
+                std::process::id(),
+                self.seq.fetch_add(1, Ordering::SeqCst),
+                OPEN_EXT
+            ));
+            let file = OpenOptions::new().create(true).append(true).open(&path)?;
+            *active = Some(ActiveSegment { path, file, size: 0 });
+        }
+
+        let segment = active.as_mut().unwrap();
+        segment.file.write_all(line)?;
+        segment.file.flush()?;
+        segment.size += line.len() as u64;
+        Ok(())
+    }
+
+    /// Makes this process's open segment visible to replayers.
+    pub fn seal(&self) {
+        Self::seal_segment(self.active.lock().unwrap().take());
+    }
+
+    fn seal_segment(segment: Option<ActiveSegment>) {
+        if let Some(segment) = segment {
+            let _ = segment.file.sync_all();
+            let _ = fs::rename(&segment.path, segment.path.with_extension(SEALED_EXT));
+        }
+    }
+
+    /// Takes ownership of the oldest sealed segment, if any.
+    /// The claim is an atomic rename, so two processes never replay the same segment.
+    pub fn claim(&self) -> Option<ClaimedSegment> {
+        self.recover_orphans();
+
+        let mut sealed: Vec<PathBuf> = self.entries()
+            .into_iter()
+            .filter(|p| p.extension().map_or(false, |e| e == SEALED_EXT))
+            .collect();
+        sealed.sort();
+
+        for path in sealed {
+            let claimed = path.with_extension(format!("{}.{}", std::process::id(), REPLAY_EXT));
+            if fs::rename(&path, &claimed).is_ok() {
+                let size = fs::metadata(&claimed).map(|m| m.len()).unwrap_or(0);
+                return Some(ClaimedSegment {
+                    path: claimed,
+                    sealed: path,
+                    size,
+                    used: Arc::clone(&self.used),
+                    done: false,
+                });
+            }
+        }
+        None
+    }
+
+    /// Seals open segments and releases claims left behind by processes that have exited.
+    fn recover_orphans(&self) {
+        for path in self.entries() {
+            let Some(name) = path.file_name().and_then(|n| n.to_str()) else { continue };
+            let parts: Vec<&str> = name.split('.').collect();
+            match parts.as_slice() {
+                [stem, OPEN_EXT] => {
+                    let owner = stem.split('-').nth(1).and_then(|p| p.parse::<u32>().ok());
+                    if owner.map_or(false, |pid| !process_alive(pid)) {
+                        let _ = fs::rename(&path, path.with_extension(SEALED_EXT));
+                    }
+                }
+                [stem, claimer, REPLAY_EXT] => {
+                    if claimer.parse::<u32>().map_or(false, |pid| !process_alive(pid)) {
+                        let _ = fs::rename(&path, self.dir.join(format!("{}.{}", stem, SEALED_EXT)));
+                    }
+                }
+                _ => {}
+            }
+        }
+    }
+
+    pub fn disk_usage(&self) -> u64 {
+        self.used.load(Ordering::SeqCst)
+    }
+
+    fn entries(&self) -> Vec<PathBuf> {
+        fs::read_dir(&self.dir)
+            .map(|rd| rd.filter_map(|e| e.ok()).map(|e| e.path()).collect())
+            .unwrap_or_default()
+    }
+}
+
+impl Drop for Spool {
+    fn drop(&mut self) {
+        self.seal();
+    }
+}
+
+/// A sealed segment this process is replaying.
+/// Dropping it without `complete()` hands it back for a later attempt.
+pub struct ClaimedSegment {
+    path: PathBuf,
+    sealed: PathBuf,
+    size: u64,
+    used: Arc<AtomicU64>,
+    done: bool,
+}
+
+impl ClaimedSegment {
+    pub fn records(&self) -> std::io::Result<Vec<SpoolRecord>> {
+        let reader = BufReader::new(File::open(&self.path)?);
+        Ok(reader
+            .lines()
+            .filter_map(|line| line.ok())
+            .filter_map(|line| serde_json::from_str(&line).ok())
+            .collect())
+    }
+
+    pub fn complete(mut self) {
+        if fs::remove_file(&self.path).is_ok() {
+            release(&self.used, self.size);
+        }
+        self.done = true;
+    }
+}
+
+impl Drop for ClaimedSegment {
+    fn drop(&mut self) {
+        if !self.done {
+            let _ = fs::rename(&self.path, &self.sealed);
+        }
+    }
+}
+
+fn scan_disk_usage(dir: &Path) -> std::io::Result<u64> {
+    let mut total = 0;
+    for entry in fs::read_dir(dir)? {
+        total += entry?.metadata().map(|m| m.len()).unwrap_or(0);
+    }
+    Ok(total)
+}
+
+fn release(used: &AtomicU64, bytes: u64) {
+    // Saturating: another process may have replayed segments this one never counted
+    let _ = used.fetch_update(Ordering::SeqCst, Ordering::SeqCst, |used| Some(used.saturating_sub(bytes)));
+}
+
+fn now_ms() -> u128 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .unwrap_or(Duration::ZERO)
+        .as_millis()
+}
+
+#[cfg(target_os = "linux")]
+fn process_alive(pid: u32) -> bool {
+    Path::new(&format!("/proc/{}", pid)).exists()
+}
+
+// Without /proc we cannot tell, so leftovers wait for their owner to come back
+#[cfg(not(target_os = "linux"))]
+fn process_alive(_pid: u32) -> bool {
+    true
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    fn temp_dir(name: &str) -> PathBuf {
+        let dir = std::env::temp_dir().join(format!("gcore-spool-{}-{}-{}", name, std::process::id(), now_ms()));
+        let _ = fs::remove_dir_all(&dir);
+        dir
+    }
+
+    fn record(i: usize) -> SpoolRecord {
+        SpoolRecord {
+            url: "http://test-host/ingest".to_string(),
+            timeout_sec: 1.0,
+            jobs: 1,
+            body: format!("[{{\"id\": {}}}]", i),
+        }
+    }
+
+    #[test]
+    fn test_append_seal_and_replay() {
+        let dir = temp_dir("replay");
+        let spool = Spool::open(&dir, 1 << 20, 1 << 20).unwrap();
+        spool.append(&record(1)).unwrap();
+        spool.append(&record(2)).unwrap();
+
+        // Nothing is replayable until the segment is sealed
+        assert!(spool.claim().is_none());
+        spool.seal();
+
+        let segment = spool.claim().unwrap();
+        assert_eq!(segment.records().unwrap(), vec![record(1), record(2)]);
+        // A claimed segment is invisible to other replayers
+        assert!(spool.claim().is_none());
+
+        segment.complete();
+        assert!(spool.claim().is_none());
+        assert_eq!(spool.disk_usage(), 0);
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    fn test_released_claim_is_replayed_again() {
+        let dir = temp_dir("release");
+        let spool = Spool::open(&dir, 1 << 20, 1 << 20).unwrap();
+        spool.append(&record(1)).unwrap();
+        spool.seal();
+
+        drop(spool.claim().unwrap());
+        assert_eq!(spool.claim().unwrap().records().unwrap(), vec![record(1)]);
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    fn test_segments_roll_and_cap_is_enforced() {
+        let dir = temp_dir("cap");
+        let line_len = serde_json::to_vec(&record(1)).unwrap().len() as u64 + 1;
+        let spool = Spool::open(&dir, line_len * 3, line_len).unwrap();
+
+        for i in 0..3 {
+            spool.append(&record(i)).unwrap();
+        }
+        assert!(spool.append(&record(3)).is_err());
+
+        spool.seal();
+        let mut replayed = Vec::new();
+        while let Some(segment) = spool.claim() {
+            replayed.extend(segment.records().unwrap());
+            segment.complete();
+        }
+        assert_eq!(replayed, vec![record(0), record(1), record(2)]);
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    fn test_disk_usage_is_scanned_on_open_then_tracked() {
+        let dir = temp_dir("usage");
+        let line_len = serde_json::to_vec(&record(1)).unwrap().len() as u64 + 1;
+        let spool = Spool::open(&dir, 1 << 20, 1 << 20).unwrap();
+        spool.append(&record(1)).unwrap();
+        spool.append(&record(2)).unwrap();
+        assert_eq!(spool.disk_usage(), 2 * line_len);
+        spool.seal();
+
+        // A later process starts from what is already on disk
+        let reopened = Spool::open(&dir, 1 << 20, 1 << 20).unwrap();
+        assert_eq!(reopened.disk_usage(), 2 * line_len);
+        reopened.claim().unwrap().complete();
+        assert_eq!(reopened.disk_usage(), 0);
+        let _ = fs::remove_dir_all(&dir);
+    }
+
+    #[test]
+    fn test_torn_records_are_skipped() {
+        let dir = temp_dir("torn");
+        let spool = Spool::open(&dir, 1 << 20, 1 << 20).unwrap();
+        spool.append(&record(1)).unwrap();
+        {
+            let active = spool.active.lock().unwrap();
+            let mut file = OpenOptions::new().append(true).open(&active.as_ref().unwrap().path).unwrap();
+            file.write_all(b"{\"url\": \"http://te").unwrap();
+        }
+        spool.seal();
+
+        assert_eq!(spool.claim().unwrap().records().unwrap(), vec![record(1)]);
+        let _ = fs::remove_dir_all(&dir);
+    }
+}
@@ -0,0 +1,81 @@
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+/// Upper bounds of the jobs-per-batch buckets.
+pub const BATCH_JOBS_BOUNDS: &[f64] = &[1.0, 10.0, 50.0, 100.0, 500.0, 1000.0, 5000.0];
+/// Upper bounds of the send latency buckets, in milliseconds.
+pub const LATENCY_MS_BOUNDS: &[f64] = &[5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0];
+
+/// Fixed-bucket histogram that send tasks update without a lock.
+/// Buckets are not cumulative: each observation lands in exactly one bucket,
+/// the first whose upper bound it does not exceed, or the final +Inf bucket.
+pub struct Histogram {
+    bounds: &'static [f64],
+    counts: Vec<AtomicUsize>,
+}
+
+impl Histogram {
+    pub fn new(bounds: &'static [f64]) -> Self {
+        Self {
+            bounds,
+            counts: (0..=bounds.len()).map(|_| AtomicUsize::new(0)).collect(),
+        }
+    }
+
+    pub fn record(&self, value: f64) {
+        let bucket = self.bounds.iter().position(|bound| value <= *bound).unwrap_or(self.bounds.len());
+        self.counts[bucket].fetch_add(1, Ordering::Relaxed);
+    }
+
+    /// (upper bound, count) pairs, ending with the +Inf bucket.
+    pub fn snapshot(&self) -> Vec<(f64, usize)> {
+        self.bounds
+            .iter()
+            .copied()
+            .chain(std::iter::once(f64::INFINITY))
+            .zip(self.counts.iter().map(|c| c.load(Ordering::Relaxed)))
+            .collect()
+    }
+}
+
+/// A point-in-time view of a client's counters. Unlike `FlushSummary`,
+/// taking one resets nothing; every total counts from client start.
+#[derive(Clone, Debug, Default)]
+pub struct CoreStats {
+    /// Messages waiting for the worker, against the configured queue limit
+    pub queue_depth: usize,
+    pub queue_limit: usize,
+    pub enqueued_jobs: usize,
+    /// Jobs the backend (or the node-local agent) accepted
+    pub sent_jobs: usize,
+    /// Jobs turned away at enqueue because the queue was full
+    pub dropped_jobs: usize,
+    /// Queued jobs discarded by the drop-oldest policy to make room
+    pub evicted_jobs: usize,
+    /// Jobs left out by the sample policy while the queue was under pressure
+    pub sampled_out_jobs: usize,
+    /// Enqueue calls that waited under the block policy, and how many gave up
+    pub blocked_enqueues: usize,
+    pub block_timeouts: usize,
+    pub failed_jobs: usize,
+    pub spilled_jobs: usize,
+    pub batches_sent: usize,
+    /// Request body bytes on the wire, after compression
+    pub bytes_sent: usize,
+    pub batch_jobs: Vec<(f64, usize)>,
+    pub send_latency_ms: Vec<(f64, usize)>,
+    pub last_error: Option<String>,
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_histogram_buckets() {
+        let histogram = Histogram::new(&[1.0, 10.0]);
+        for value in [0.5, 1.0, 7.0, 10.0, 11.0, 1e9] {
+            histogram.record(value);
+        }
+        assert_eq!(histogram.snapshot(), vec![(1.0, 2), (10.0, 2), (f64::INFINITY, 2)]);
+    }
+}
@@ -24,3 +24,5 @@ class JobMetrics(BaseModel):
     max_rss_kb: int
     exit_code_int: int
     meta: dict[str, Any] = Field(default_factory=dict)
+    # Set when resource sampling is on; see glia_python.sampler.summarize
+    resources: dict[str, Any] | None = None
@@ -1,5 +1,7 @@
 import atexit
 import functools
+import multiprocessing.util
+import time
 from collections.abc import Callable
 from typing import Any
 
@@ -7,14 +9,27 @@ _global_config: dict[str, Any] = {}
 
 import gcore
 from glia_python.JobMetrics import JobMetrics
+from glia_python.aggregate import DEFAULT_INTERVAL_SEC, CallAggregator, flush_aggregates
 from glia_python.tracker import JobTracker
 
 __all__: list[str] = ["JobTracker", "JobMetrics", "Glia", "track"]
 
 # Ensure telemetry is flushed before exit
 atexit.register(gcore.flush_queue)
+# atexit runs handlers in reverse, so aggregated summaries are queued before that flush
+atexit.register(flush_aggregates)
 
 
+def _flush_on_child_exit(_: object) -> None:
+    """
+    gcore gives a forked child its own worker on first use, but multiprocessing
+    children leave through os._exit(), which skips atexit. Their exit
+    finalizers still run, so the child's telemetry is flushed there.
+    """
+    # Higher priorities run first: summaries must be queued before the flush
+    multiprocessing.util.Finalize(None, flush_aggregates, exitpriority=1)
+    multiprocessing.util.Finalize(None, gcore.flush_queue, exitpriority=0)
+
 
 class Glia:
     @staticmethod
@@ -23,7 +38,22 @@ class Glia:
         app_name: str | None = None,
         app_version: str | None = None,
         tags: dict[str, Any] | None = None,
+        core_settings: dict[str, Any] | None = None,
+        sample_interval_sec: float | None = None,
+        include_children: bool | None = None,
     ) -> None:
+        """
+        Sets the global defaults for tracked jobs.
+        'core_settings' tunes the gcore worker for this process, e.g.
+        {"batch_size": 500, "linger_ms": 100}; see gcore.configure for the keys.
+        'sample_interval_sec' turns on the background resource sampler
+        (also GLIA_SAMPLE_INTERVAL_SEC): jobs then carry their own peak RSS,
+        a CPU/RSS time series and I/O counters in 'resources'.
+        'include_children' (also GLIA_INCLUDE_CHILDREN=1) adds the CPU and
+        memory of child processes under resources['children'].
+        """
+        if core_settings:
+            gcore.configure(**core_settings)
         if api_url is not None:
             _global_config["api_url"] = api_url
         if app_name is not None:
@@ -32,6 +62,18 @@ class Glia:
             _global_config["app_version"] = app_version
         if tags is not None:
             _global_config["tags"] = tags
+        if sample_interval_sec is not None:
+            _global_config["sample_interval_sec"] = sample_interval_sec
+        if include_children is not None:
+            _global_config["include_children"] = include_children
+    @staticmethod
+    def stats() -> gcore.CoreStats:
+        """
+        Live counters of the telemetry worker: queue depth, sent/dropped/failed
+        totals, batch-size and latency histograms. Reading them resets nothing.
+        """
+        return gcore.stats()
+
     @staticmethod
     def tracker(
         program_name: str | None = None, context: dict[str, Any] | None = None
@@ -46,16 +88,29 @@ class Glia:
     def track(
         program_name: str | Callable[..., Any] | None = None,
         context: dict[str, Any] | None = None,
+        aggregate: bool = False,
+        interval_sec: float = DEFAULT_INTERVAL_SEC,
     ) -> Callable[..., Any]:
         """
         Decorator. Uses the function name as the block name unless 'program_name' is provided.
+        With 'aggregate=True', calls are not reported one by one: counts, errors and
+        wall/CPU-time histograms are summed in memory and sent as one job every
+        'interval_sec' seconds and at exit. Meant for functions called in hot loops.
         """
         # Handle case where used as @Glia.track without arguments
         if callable(program_name):
             func = program_name
-            return Glia.track(program_name=None, context=context)(func)
+            return Glia.track(
+                program_name=None,
+                context=context,
+                aggregate=aggregate,
+                interval_sec=interval_sec,
+            )(func)
 
         def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            if aggregate:
+                return _aggregating_wrapper(func)
+
             @functools.wraps(func)
             def wrapper(*args: Any, **kwargs: Any) -> Any:
                 func_name = getattr(func, "__name__", type(func).__name__)
@@ -67,7 +122,36 @@ class Glia:
 
             return wrapper
 
+        def _aggregating_wrapper(func: Callable[..., Any]) -> Callable[..., Any]:
+            func_name = getattr(func, "__name__", type(func).__name__)
+            aggregator = CallAggregator(
+                program_name=program_name or func_name,
+                context=context,
+                interval_sec=interval_sec,
+            )
+
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                wall_start = time.perf_counter()
+                cpu_start = time.thread_time()
+                failed = True
+                try:
+                    result = func(*args, **kwargs)
+                    failed = False
+                    return result
+                finally:
+                    aggregator.record(
+                        time.perf_counter() - wall_start,
+                        time.thread_time() - cpu_start,
+                        failed,
+                    )
+
+            return wrapper
+
         return decorator
 
 
 track = Glia.track
+
+# Runs in each multiprocessing child, after it has reset the inherited finalizers
+multiprocessing.util.register_after_fork(Glia, _flush_on_child_exit)
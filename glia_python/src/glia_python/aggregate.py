@@ -0,0 +1,237 @@
+import math
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from glia_python.JobMetrics import JobMetrics
+from glia_python.network import push_telemetry
+from glia_python.tracker import JobTracker
+
+DEFAULT_INTERVAL_SEC = 60.0
+# Shortest wait of the flusher thread, however many windows fall due at once
+_MIN_FLUSH_WAIT_SEC = 0.05
+
+# Calls faster than this (~1 microsecond) all land in the lowest bucket
+_LOWEST_EXPONENT = -10
+_LOWEST_BOUND_MS = 2.0**_LOWEST_EXPONENT
+
+
+class LogHistogram:
+    """
+    Power-of-two buckets, in milliseconds: a value v counts towards the bucket
+    whose upper bound is the smallest 2**k with v <= 2**k. Recording is a
+    frexp and a dict update, so it stays cheap on hot paths.
+    """
+
+    __slots__ = ("counts",)
+
+    def __init__(self) -> None:
+        self.counts: dict[int, int] = {}
+
+    def record(self, value_ms: float) -> None:
+        if value_ms <= _LOWEST_BOUND_MS:
+            exponent = _LOWEST_EXPONENT
+        else:
+            mantissa, exponent = math.frexp(value_ms)
+            if mantissa == 0.5:
+                exponent -= 1
+        self.counts[exponent] = self.counts.get(exponent, 0) + 1
+
+    def buckets(self) -> list[list[float]]:
+        """[upper bound in ms, count] pairs, smallest bound first."""
+        return [[2.0**e, n] for e, n in sorted(self.counts.items())]
+
+
+@dataclass
+class _Window:
+    """Everything recorded for one function since its last summary."""
+
+    started_at: float
+    ended_at: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    wall_ms_total: float = 0.0
+    wall_ms_min: float = math.inf
+    wall_ms_max: float = 0.0
+    cpu_sec_total: float = 0.0
+    wall_ms: LogHistogram = field(default_factory=LogHistogram)
+    cpu_ms: LogHistogram = field(default_factory=LogHistogram)
+
+
+_aggregators: "weakref.WeakSet[CallAggregator]" = weakref.WeakSet()
+
+_flusher_lock = threading.Lock()
+_flusher_wakeup = threading.Event()
+_flusher_thread: threading.Thread | None = None
+
+
+def _wake_flusher() -> None:
+    """Starts the flusher thread if needed and lets it pick up a new window."""
+    global _flusher_thread
+    with _flusher_lock:
+        if _flusher_thread is None or not _flusher_thread.is_alive():
+            _flusher_thread = threading.Thread(
+                target=_run_flusher, name="glia-aggregate-flusher", daemon=True
+            )
+            _flusher_thread.start()
+    _flusher_wakeup.set()
+
+
+def _run_flusher() -> None:
+    """
+    Reports windows whose interval is over even if their function is never
+    called again, sleeping until the earliest open window falls due.
+    """
+    while True:
+        # Cleared before the scan, so a window opened during it cuts the wait short
+        _flusher_wakeup.clear()
+        now = time.time()
+        next_due = now + DEFAULT_INTERVAL_SEC
+        for aggregator in list(_aggregators):
+            due = aggregator.flush_expired(now)
+            if due is not None:
+                next_due = min(next_due, due)
+        _flusher_wakeup.wait(max(next_due - time.time(), _MIN_FLUSH_WAIT_SEC))
+
+
+class CallAggregator:
+    """
+    Backs @Glia.track(aggregate=True). Instead of one job per call, it keeps
+    call and error counts plus wall/CPU-time histograms in memory and reports
+    them as a single summary job every 'interval_sec', and once more at exit.
+    A window is reported by the next call after its interval, or by a
+    background thread if no call comes. CPU time is the calling thread's,
+    so concurrent callers do not inflate it.
+    """
+
+    def __init__(
+        self,
+        program_name: str,
+        context: dict[str, Any] | None = None,
+        interval_sec: float = DEFAULT_INTERVAL_SEC,
+    ) -> None:
+        self.program_name = program_name
+        self.context = context
+        self.interval_sec = interval_sec
+        self._lock = threading.Lock()
+        self._window: _Window | None = None
+        _aggregators.add(self)
+
+    def record(self, wall_sec: float, cpu_sec: float, failed: bool) -> None:
+        now = time.time()
+        wall_ms = wall_sec * 1000
+        opened = False
+        with self._lock:
+            window = self._window
+            if window is None:
+                window = self._window = _Window(started_at=now - wall_sec)
+                opened = True
+            window.ended_at = now
+            window.calls += 1
+            if failed:
+                window.errors += 1
+            window.wall_ms_total += wall_ms
+            window.wall_ms_min = min(window.wall_ms_min, wall_ms)
+            window.wall_ms_max = max(window.wall_ms_max, wall_ms)
+            window.cpu_sec_total += cpu_sec
+            window.wall_ms.record(wall_ms)
+            window.cpu_ms.record(cpu_sec * 1000)
+
+            expired = now - window.started_at >= self.interval_sec
+            if expired:
+                self._window = None
+
+        if expired:
+            # Pushed outside the lock so other callers never wait on telemetry
+            self._emit(window)
+        elif opened:
+            _wake_flusher()
+
+    def flush_expired(self, now: float) -> float | None:
+        """
+        Reports the current window if its interval is over. Otherwise returns
+        when it will be, or None if there is no window.
+        """
+        with self._lock:
+            window = self._window
+            if window is None:
+                return None
+            due = window.started_at + self.interval_sec
+            if now < due:
+                return due
+            self._window = None
+        self._emit(window)
+        return None
+
+    def flush(self) -> None:
+        """Reports whatever has been recorded since the last summary."""
+        with self._lock:
+            window, self._window = self._window, None
+        if window is not None:
+            self._emit(window)
+
+    def _reset_after_fork(self) -> None:
+        # The parent reports the calls it made; the lock may have been held mid-fork
+        self._lock = threading.Lock()
+        self._window = None
+
+    def _emit(self, window: _Window) -> None:
+        tracker = JobTracker(program_name=self.program_name, context=self.context)
+        fields = tracker.common_fields()
+
+        cpu_percent = 0.0
+        if window.wall_ms_total > 0.1:
+            cpu_percent = (window.cpu_sec_total * 1000 / window.wall_ms_total) * 100
+
+        fields["meta"] = dict(fields["meta"])
+        fields["meta"]["aggregate"] = {
+            "interval_sec": self.interval_sec,
+            "calls": window.calls,
+            "errors": window.errors,
+            "wall_ms": {
+                "min": round(window.wall_ms_min, 4),
+                "max": round(window.wall_ms_max, 4),
+                "mean": round(window.wall_ms_total / window.calls, 4),
+                "histogram": window.wall_ms.buckets(),
+            },
+            "cpu_ms": {
+                "total": round(window.cpu_sec_total * 1000, 4),
+                "histogram": window.cpu_ms.buckets(),
+            },
+        }
+
+        push_telemetry(
+            JobMetrics(
+                **fields,
+                wall_time_ms=int(window.wall_ms_total),
+                started_at=datetime.fromtimestamp(window.started_at, tz=UTC),
+                ended_at=datetime.fromtimestamp(window.ended_at, tz=UTC),
+                cpu_time_sec=window.cpu_sec_total,
+                cpu_percent=round(cpu_percent, 2),
+                exit_code_int=1 if window.errors else 0,
+            )
+        )
+
+
+def flush_aggregates() -> None:
+    """Reports every aggregating decorator's pending calls. Runs at exit."""
+    for aggregator in list(_aggregators):
+        aggregator.flush()
+
+
+def _reset_aggregates_in_child() -> None:
+    global _flusher_lock, _flusher_wakeup, _flusher_thread
+    # The flusher thread did not survive the fork, and may have held its lock
+    _flusher_lock = threading.Lock()
+    _flusher_wakeup = threading.Event()
+    _flusher_thread = None
+    for aggregator in list(_aggregators):
+        aggregator._reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_aggregates_in_child)
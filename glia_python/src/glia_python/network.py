@@ -1,5 +1,6 @@
 # Written by Luis Felipe Montemayor, sometime around January of 2026
 import os
+from collections.abc import Sequence
 
 from common.logs import setup_logger
 
@@ -27,9 +28,36 @@ def push_telemetry(
 
     final_timeout = timeout if timeout is not None else 2.0
     try:
-        # The backend now only accepts batches (list of jobs)
-        json_payload = f"[{metrics.model_dump_json()}]"
-        gcore.enqueue_to_background(json_payload, target_url, final_timeout)
+        # gcore serializes the record straight into its batch body
+        gcore.enqueue_record(metrics.model_dump(), target_url, final_timeout)
+        return True
+
+    except Exception as e:
+        logger.warning(f"[GLIA_PYTHON] Unexpected error during telemetry queuing: {e}")
+        return False
+
+
+def push_telemetry_many(
+    metrics: Sequence[JobMetrics],
+    api_url: str | None = None,
+    timeout: float | None = None,
+) -> bool:
+    """
+    Bulk variant of push_telemetry for callers that report many jobs at once,
+    such as schedulers and wrappers tracking sub-jobs. All records cross into
+    gcore in a single call.
+    """
+    if not metrics:
+        return True
+
+    target_url: str | None = api_url or _get_api_url()
+    if not target_url:
+        logger.warning("[GLIA_PYTHON] No GLIA_API_URL configured. Telemetry dropped.")
+        return False
+
+    final_timeout = timeout if timeout is not None else 2.0
+    try:
+        gcore.enqueue_many([m.model_dump() for m in metrics], target_url, final_timeout)
         return True
 
     except Exception as e:
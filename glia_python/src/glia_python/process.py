@@ -0,0 +1,131 @@
+from typing import Any, NamedTuple
+
+import gcore
+
+
+class CpuTimes(NamedTuple):
+    user: float
+    system: float
+
+
+class MemoryInfo(NamedTuple):
+    rss: int
+
+
+class IOCounters(NamedTuple):
+    read_count: int
+    write_count: int
+    read_bytes: int
+    write_bytes: int
+
+
+class NativeProcess:
+    """
+    The part of psutil.Process that trackers use, read from /proc by gcore.
+    Every call takes a fresh reading of the current process, and reads only
+    the file it needs.
+    """
+
+    def cpu_times(self) -> CpuTimes:
+        user, system, _, _ = gcore.process_cpu_times()
+        return CpuTimes(user, system)
+
+    def memory_info(self) -> MemoryInfo:
+        return MemoryInfo(gcore.process_memory()[0] * 1024)
+
+    def io_counters(self) -> IOCounters:
+        return IOCounters(*gcore.process_io())
+
+    def usage(self) -> tuple[float, int]:
+        user, system, rss_kb = gcore.process_usage()
+        return user + system, rss_kb
+
+    def cgroup(self) -> tuple[float, int, float, int | None, int | None] | None:
+        return gcore.process_cgroup()
+
+    def tree_rss_kb(self) -> int:
+        return gcore.process_tree_rss()[0]
+
+
+_native_available: bool | None = None
+
+
+def native_available() -> bool:
+    """True where gcore can read /proc for us, i.e. on Linux."""
+    global _native_available
+    if _native_available is None:
+        try:
+            gcore.process_usage()
+            _native_available = True
+        except (AttributeError, OSError):
+            _native_available = False
+    return _native_available
+
+
+def process_handle() -> Any:
+    """
+    A handle on the current process: gcore's /proc reader on Linux, psutil
+    elsewhere. psutil is only imported when it is needed.
+    """
+    if native_available():
+        return NativeProcess()
+
+    import psutil
+
+    return psutil.Process()
+
+
+def usage(process: Any) -> tuple[float, int]:
+    """
+    CPU seconds (user + system) and RSS in kB, taken together: one
+    gcore call, or one psutil oneshot() reading.
+    """
+    if isinstance(process, NativeProcess):
+        return process.usage()
+    with process.oneshot():
+        cpu = process.cpu_times()
+        rss = process.memory_info().rss
+    return cpu.user + cpu.system, int(rss / 1024)
+
+
+def tree_rss_kb(process: Any) -> int | None:
+    """
+    RSS of the process and all its live descendants, in kB: pool workers,
+    shelled-out commands and their own children. None if it cannot be read.
+    """
+    try:
+        if isinstance(process, NativeProcess):
+            return process.tree_rss_kb()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except Exception:
+                # Exited while we were walking the tree
+                pass
+        return int(rss / 1024)
+    except Exception:
+        return None
+
+
+def cgroup_counters(process: Any) -> dict[str, Any] | None:
+    """
+    The cgroup v2 CPU and memory counters, where the native reader has them.
+    In a container they are what its limits are enforced against.
+    """
+    if not isinstance(process, NativeProcess):
+        return None
+    try:
+        cgroup = process.cgroup()
+    except OSError:
+        return None
+    if cgroup is None:
+        return None
+    cpu_usage_sec, nr_throttled, throttled_sec, memory_current_kb, memory_peak_kb = cgroup
+    return {
+        "cpu_usage_sec": cpu_usage_sec,
+        "nr_throttled": nr_throttled,
+        "throttled_sec": throttled_sec,
+        "memory_current_kb": memory_current_kb,
+        "memory_peak_kb": memory_peak_kb,
+    }
@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+from typing import Any
+
+from glia_python.process import process_handle, tree_rss_kb, usage
+
+# Series points kept per block; longer blocks are thinned out, not truncated
+MAX_SERIES_POINTS = 120
+
+
+class BlockSamples:
+    """
+    What the sampler has seen while one tracked block was running.
+    The series starts at one point per tick; once it reaches MAX_SERIES_POINTS
+    every other point is dropped and only every 2nd (4th, ...) tick is kept,
+    so memory stays bounded however long the block runs. The peak is kept
+    from every tick, whether or not it made it into the series.
+    A block started with a process-tree RSS also keeps the tree's peak.
+    """
+
+    __slots__ = (
+        "started_at",
+        "peak_rss_kb",
+        "peak_tree_rss_kb",
+        "samples",
+        "stride",
+        "series",
+    )
+
+    def __init__(
+        self, started_at: float, rss_kb: int, tree_rss_kb: int | None = None
+    ) -> None:
+        self.started_at = started_at
+        self.peak_rss_kb = rss_kb
+        self.peak_tree_rss_kb = tree_rss_kb
+        self.samples = 0
+        self.stride = 1
+        self.series: list[list[float]] = []
+
+    def add(
+        self,
+        timestamp: float,
+        cpu_percent: float,
+        rss_kb: int,
+        tree_rss_kb: int | None = None,
+    ) -> None:
+        if rss_kb > self.peak_rss_kb:
+            self.peak_rss_kb = rss_kb
+        if (
+            self.peak_tree_rss_kb is not None
+            and tree_rss_kb is not None
+            and tree_rss_kb > self.peak_tree_rss_kb
+        ):
+            self.peak_tree_rss_kb = tree_rss_kb
+        self.samples += 1
+        if self.samples % self.stride:
+            return
+        self.series.append(
+            [round(timestamp - self.started_at, 3), round(cpu_percent, 1), rss_kb]
+        )
+        if len(self.series) >= MAX_SERIES_POINTS:
+            del self.series[1::2]
+            self.stride *= 2
+
+
+class ResourceSampler:
+    """
+    One background thread per process, shared by every active tracker.
+    Each tick takes one CPU-and-RSS snapshot of the process and hands it
+    to all registered blocks, so nesting trackers costs no extra threads or
+    syscalls. The thread only runs while at least one block is registered.
+    """
+
+    def __init__(self, interval_sec: float) -> None:
+        self.interval_sec = interval_sec
+        self._pid = os.getpid()
+        self._process = process_handle()
+        self._lock = threading.Lock()
+        self._blocks: set[BlockSamples] = set()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: threading.Thread | None = None
+
+    def rss_kb(self) -> int:
+        return int(self._process.memory_info().rss / 1024)
+
+    def register(self, block: BlockSamples) -> None:
+        with self._lock:
+            self._blocks.add(block)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="glia-resource-sampler", daemon=True
+                )
+                self._thread.start()
+            self._wakeup.notify()
+
+    def unregister(self, block: BlockSamples) -> None:
+        with self._lock:
+            self._blocks.discard(block)
+
+    def _run(self) -> None:
+        last_time = time.time()
+        last_cpu = usage(self._process)[0]
+        while True:
+            with self._lock:
+                idle = not self._blocks
+                while not self._blocks:
+                    self._wakeup.wait()
+                # Walking the process tree costs more, so only when a block asked for it
+                track_tree = any(b.peak_tree_rss_kb is not None for b in self._blocks)
+            if idle:
+                # CPU use while nothing was tracked belongs to no block
+                last_time = time.time()
+                last_cpu = usage(self._process)[0]
+            time.sleep(self.interval_sec)
+
+            try:
+                now = time.time()
+                cpu_total, rss_kb = usage(self._process)
+                tree_kb = tree_rss_kb(self._process) if track_tree else None
+            except Exception:
+                # e.g. psutil.AccessDenied; a missed tick is not worth stopping for
+                continue
+            elapsed = now - last_time
+            cpu_percent = (cpu_total - last_cpu) / elapsed * 100 if elapsed > 0 else 0.0
+            last_time, last_cpu = now, cpu_total
+
+            with self._lock:
+                for block in self._blocks:
+                    block.add(now, cpu_percent, rss_kb, tree_kb)
+
+
+_sampler: ResourceSampler | None = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler(interval_sec: float) -> ResourceSampler:
+    """
+    The process's sampler. A forked child gets a new one, since its
+    threads do not survive the fork. A new interval is applied to the
+    running sampler from its next tick, so blocks already registered keep
+    being sampled and no thread is left behind.
+    """
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None or _sampler._pid != os.getpid():
+            _sampler = ResourceSampler(interval_sec)
+        else:
+            _sampler.interval_sec = interval_sec
+        return _sampler
+
+
+def io_counters(process: Any) -> dict[str, int] | None:
+    """Read/write bytes and calls so far, or None where there are no I/O counters (macOS)."""
+    try:
+        counters = process.io_counters()
+    except Exception:
+        return None
+    return {
+        "read_bytes": counters.read_bytes,
+        "write_bytes": counters.write_bytes,
+        "read_count": counters.read_count,
+        "write_count": counters.write_count,
+    }
+
+
+def summarize(
+    sampler: ResourceSampler,
+    block: BlockSamples,
+    io_start: dict[str, int] | None,
+    io_end: dict[str, int] | None,
+    cgroup_start: dict[str, Any] | None = None,
+    cgroup_end: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """
+    The 'resources' field of a job: per-block peak RSS, time series and I/O
+    deltas, plus the cgroup's CPU and throttling over the block where known.
+    """
+    resources: dict[str, Any] = {
+        "interval_sec": sampler.interval_sec,
+        "samples": block.samples,
+        "peak_rss_kb": block.peak_rss_kb,
+        # [seconds since start, process CPU % over the tick, RSS kB]
+        "series": block.series,
+    }
+    if io_start is not None and io_end is not None:
+        resources["io"] = {key: io_end[key] - io_start[key] for key in io_end}
+    if cgroup_start is not None and cgroup_end is not None:
+        resources["cgroup"] = {
+            "cpu_usage_sec": round(cgroup_end["cpu_usage_sec"] - cgroup_start["cpu_usage_sec"], 6),
+            "nr_throttled": cgroup_end["nr_throttled"] - cgroup_start["nr_throttled"],
+            "throttled_sec": round(cgroup_end["throttled_sec"] - cgroup_start["throttled_sec"], 6),
+            "memory_peak_kb": cgroup_end["memory_peak_kb"],
+        }
+    return resources
@@ -5,13 +5,12 @@ import platform
 import sys
 import time
 import uuid
+from dataclasses import dataclass
 from datetime import UTC, datetime
 from pathlib import Path
 from types import TracebackType
 from typing import Any
 
-import psutil
-
 try:
     import resource
 except ImportError:
@@ -20,6 +19,14 @@ except ImportError:
 from glia_python import _global_config
 from glia_python.JobMetrics import JobMetrics
 from glia_python.network import push_telemetry
+from glia_python.process import cgroup_counters, process_handle, tree_rss_kb
+from glia_python.sampler import (
+    BlockSamples,
+    ResourceSampler,
+    get_sampler,
+    io_counters,
+    summarize,
+)
 
 
 def is_interactive() -> bool:
@@ -37,12 +44,81 @@ def is_interactive() -> bool:
     return False
 
 
+@dataclass(frozen=True)
+class _ProcessIdentity:
+    """What a tracker reports about the process; fixed for the process's lifetime."""
+
+    pid: int
+    # gcore's /proc reader on Linux, a psutil.Process elsewhere
+    process: Any
+    user_name: str
+    hostname: str
+    os_info: str
+
+
+_identity: _ProcessIdentity | None = None
+# Script path -> ((st_mtime_ns, st_size), sha256)
+_script_hashes: dict[Path, tuple[tuple[int, int], str]] = {}
+
+
+def _process_identity() -> _ProcessIdentity:
+    """
+    Built once per process. A pid change means we are in a forked child,
+    whose process handle must point at itself rather than the parent.
+    """
+    global _identity
+    pid = os.getpid()
+    if _identity is None or _identity.pid != pid:
+        _identity = _ProcessIdentity(
+            pid=pid,
+            process=process_handle(),
+            user_name=getpass.getuser(),
+            hostname=platform.node(),
+            os_info=f"{platform.system()} {platform.release()}",
+        )
+    return _identity
+
+
+def _sample_interval_sec() -> float | None:
+    """Init > Env. Sampling stays off unless one of them sets an interval."""
+    interval = _global_config.get("sample_interval_sec")
+    if interval is None:
+        env_interval = os.getenv("GLIA_SAMPLE_INTERVAL_SEC")
+        if env_interval:
+            try:
+                interval = float(env_interval)
+            except ValueError:
+                return None
+    return interval if interval and interval > 0 else None
+
+
+def _include_children() -> bool:
+    """Init > Env. Child-process accounting is opt-in."""
+    include = _global_config.get("include_children")
+    if include is None:
+        include = os.getenv("GLIA_INCLUDE_CHILDREN", "").lower() in ("1", "true", "yes")
+    return bool(include)
+
+
+def reset_identity_cache() -> None:
+    """Forgets the cached process identity and script hashes."""
+    global _identity
+    _identity = None
+    _script_hashes.clear()
+
 
 class JobTracker:
-    process: psutil.Process
+    process: Any
+    _identity: _ProcessIdentity
     _start_time: float | None
     _cpu_start: Any | None
     _user_meta: dict[str, Any]
+    _sampler: ResourceSampler | None
+    _samples: BlockSamples | None
+    _io_start: dict[str, int] | None
+    _cgroup_start: dict[str, Any] | None
+    _include_children: bool
+    _children_start: tuple[float, int] | None
     run_id: str
     user_name: str
     script_path: Path | None
@@ -53,12 +129,22 @@ class JobTracker:
     def __init__(
         self, program_name: str | None = None, context: dict[str, Any] | None = None
     ) -> None:
-        self.process = psutil.Process()
+        identity = _process_identity()
+        self._identity = identity
+        self.process = identity.process
         self.metrics = None
         self._start_time = None
         self._cpu_start = None
         self._user_meta = context or {}
 
+        interval = _sample_interval_sec()
+        self._sampler = get_sampler(interval) if interval else None
+        self._samples = None
+        self._io_start = None
+        self._cgroup_start = None
+        self._include_children = _include_children()
+        self._children_start = None
+
         # Merge config: Local > Init > Env
         init_tags = _global_config.get("tags", {})
         merged_meta = init_tags.copy()
@@ -78,11 +164,11 @@ class JobTracker:
         self._user_meta = merged_meta
 
         self.run_id = str(uuid.uuid4())
-        self.user_name = getpass.getuser()
+        self.user_name = identity.user_name
 
         if sys.argv and sys.argv[0] and not is_interactive():
             self.script_path = Path(os.path.abspath(sys.argv[0]))
-            self.script_sha256 = self._calculate_sha256(self.script_path)
+            self.script_sha256 = self._script_sha256(self.script_path)
             base_name = self.script_path.name
         else:
             self.script_path = None
@@ -97,6 +183,17 @@ class JobTracker:
     def start(self) -> None:
         self._start_time = time.time()
         self._cpu_start = self.process.cpu_times()
+        if self._include_children:
+            self._children_start = self._get_children_usage()
+        if self._sampler is not None:
+            self._io_start = io_counters(self.process)
+            self._cgroup_start = cgroup_counters(self.process)
+            self._samples = BlockSamples(
+                self._start_time,
+                self._sampler.rss_kb(),
+                tree_rss_kb(self.process) if self._include_children else None,
+            )
+            self._sampler.register(self._samples)
 
     def log_metadata(self, data: dict[str, Any]) -> None:
         """
@@ -120,6 +217,22 @@ class JobTracker:
         push_telemetry(self.metrics)
         return None
 
+    def _script_sha256(self, file_path: Path) -> str:
+        """Hashes the script once per process, and again only if it changes on disk."""
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return self._calculate_sha256(file_path)
+
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = _script_hashes.get(file_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        sha256 = self._calculate_sha256(file_path)
+        _script_hashes[file_path] = (version, sha256)
+        return sha256
+
     def _calculate_sha256(self, file_path: Path) -> str:
         sha256: hashlib._Hash = hashlib.sha256()
         try:
@@ -130,6 +243,46 @@ class JobTracker:
         except OSError:
             return "access-denied"
 
+    def _get_children_usage(self) -> tuple[float, int] | None:
+        """
+        CPU seconds of children that have exited and been waited for, and the
+        largest peak RSS (kB) among them. None where getrusage is missing.
+        """
+        if sys.platform != "win32" and "resource" in sys.modules:
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            max_rss: float = usage.ru_maxrss
+            if sys.platform == "darwin":
+                max_rss /= 1024
+            return usage.ru_utime + usage.ru_stime, int(max_rss)
+        return None
+
+    def _children_summary(
+        self, cpu_time_consumed: float, wall_time_sec: float
+    ) -> dict[str, Any]:
+        """
+        Child-process usage over the block, next to the self-only numbers in
+        cpu_time_sec/cpu_percent. Children count once they have been reaped,
+        which multiprocessing pools and subprocess.run do on their own; the
+        sampled tree peak also covers children that are still running.
+        """
+        children: dict[str, Any] = {}
+        children_end = self._get_children_usage()
+        if self._children_start is not None and children_end is not None:
+            children_cpu = children_end[0] - self._children_start[0]
+            inclusive_cpu = cpu_time_consumed + children_cpu
+            children["cpu_time_sec"] = round(children_cpu, 4)
+            # RUSAGE_CHILDREN keeps one high-water mark for the whole process, so
+            # this is the largest child since start-up, not just this block's
+            children["lifetime_max_child_rss_kb"] = children_end[1]
+            children["cpu_time_sec_inclusive"] = round(inclusive_cpu, 4)
+            if wall_time_sec > 0.0001:
+                children["cpu_percent_inclusive"] = round(
+                    inclusive_cpu / wall_time_sec * 100, 2
+                )
+        if self._samples is not None and self._samples.peak_tree_rss_kb is not None:
+            children["peak_tree_rss_kb"] = self._samples.peak_tree_rss_kb
+        return children
+
     def _get_peak_rss_kb(self) -> int:
         if sys.platform != "win32" and "resource" in sys.modules:
             usage: float = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
@@ -138,6 +291,24 @@ class JobTracker:
             return int(usage)
         return int(self.process.memory_info().rss / 1024)
 
+    def common_fields(self) -> dict[str, Any]:
+        """
+        The JobMetrics fields any job reported by this tracker carries,
+        whatever it measured: who ran what, where, and the process's peak RSS.
+        """
+        return {
+            "run_id": self.run_id,
+            "program_name": self.program_name,
+            "user_name": self.user_name,
+            "script_sha256": self.script_sha256,
+            "hostname": self._identity.hostname,
+            "os_info": self._identity.os_info,
+            "script_path": str(self.script_path) if self.script_path else None,
+            "argv": sys.argv[1:],
+            "max_rss_kb": self._get_peak_rss_kb(),
+            "meta": self._user_meta,
+        }
+
     def capture(self, exit_code: int = 0) -> JobMetrics:
         if self._start_time is None or self._cpu_start is None:
             raise RuntimeError(
@@ -158,21 +329,41 @@ class JobTracker:
         if wall_time_sec > 0.0001:
             cpu_percent = (cpu_time_consumed / wall_time_sec) * 100
 
+        resources: dict[str, Any] | None = None
+        if self._sampler is not None and self._samples is not None:
+            self._sampler.unregister(self._samples)
+            # Blocks shorter than one tick still get a peak from their end state
+            self._samples.peak_rss_kb = max(
+                self._samples.peak_rss_kb, self._sampler.rss_kb()
+            )
+            if self._samples.peak_tree_rss_kb is not None:
+                end_tree_rss_kb = tree_rss_kb(self.process)
+                if end_tree_rss_kb is not None:
+                    self._samples.peak_tree_rss_kb = max(
+                        self._samples.peak_tree_rss_kb, end_tree_rss_kb
+                    )
+            resources = summarize(
+                self._sampler,
+                self._samples,
+                self._io_start,
+                io_counters(self.process),
+                self._cgroup_start,
+                cgroup_counters(self.process),
+            )
+        if self._include_children:
+            if resources is None:
+                resources = {}
+            resources["children"] = self._children_summary(
+                cpu_time_consumed, wall_time_sec
+            )
+
         return JobMetrics(
-            run_id=self.run_id,
-            program_name=self.program_name,
-            user_name=self.user_name,
-            script_sha256=self.script_sha256,
-            hostname=platform.node(),
-            os_info=f"{platform.system()} {platform.release()}",
-            script_path=str(self.script_path) if self.script_path else None,
-            argv=sys.argv[1:],
+            **self.common_fields(),
             wall_time_ms=wall_time_ms,
             started_at=datetime.fromtimestamp(self._start_time, tz=UTC),
             ended_at=datetime.fromtimestamp(end_time, tz=UTC),
             cpu_time_sec=cpu_time_consumed,
             cpu_percent=round(cpu_percent, 2),
-            max_rss_kb=self._get_peak_rss_kb(),
             exit_code_int=exit_code,
-            meta=self._user_meta,
+            resources=resources,
         )
@@ -0,0 +1,97 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from glia_python import Glia
+from glia_python.aggregate import LogHistogram, flush_aggregates
+
+
+@pytest.fixture(autouse=True)
+def mock_push_telemetry():
+    with patch("glia_python.aggregate.push_telemetry") as mock_push:
+        yield mock_push
+
+
+# 1. Many calls produce one summary, not one job each.
+def test_calls_are_summarised_at_flush(mock_push_telemetry):
+    @Glia.track(aggregate=True)
+    def hot_path(x):
+        return x * 2
+
+    assert [hot_path(i) for i in range(1000)][-1] == 1998
+    mock_push_telemetry.assert_not_called()
+
+    flush_aggregates()
+    mock_push_telemetry.assert_called_once()
+    metrics = mock_push_telemetry.call_args[0][0]
+    summary = metrics.meta["aggregate"]
+    assert metrics.program_name.endswith(":hot_path")
+    assert metrics.exit_code_int == 0
+    assert summary["calls"] == 1000
+    assert summary["errors"] == 0
+    assert sum(count for _, count in summary["wall_ms"]["histogram"]) == 1000
+
+    # Nothing new to report
+    flush_aggregates()
+    mock_push_telemetry.assert_called_once()
+
+
+# 2. Exceptions still propagate and are counted as errors.
+def test_errors_are_counted(mock_push_telemetry):
+    @Glia.track("parse", context={"stage": "ingest"}, aggregate=True)
+    def parse(value):
+        return int(value)
+
+    parse("1")
+    with pytest.raises(ValueError):
+        parse("x")
+
+    flush_aggregates()
+    metrics = mock_push_telemetry.call_args[0][0]
+    assert metrics.meta["stage"] == "ingest"
+    assert metrics.meta["aggregate"]["calls"] == 2
+    assert metrics.meta["aggregate"]["errors"] == 1
+    assert metrics.exit_code_int == 1
+
+
+# 3. A summary goes out from the calling thread once the interval has passed.
+def test_summary_is_emitted_each_interval(mock_push_telemetry):
+    @Glia.track(aggregate=True, interval_sec=0)
+    def tick():
+        pass
+
+    for _ in range(3):
+        tick()
+    assert mock_push_telemetry.call_count == 3
+    assert all(c[0][0].meta["aggregate"]["calls"] == 1 for c in mock_push_telemetry.call_args_list)
+
+
+# 4. A function that goes quiet is still reported once its interval is over.
+def test_quiet_function_is_flushed_by_timer(mock_push_telemetry):
+    @Glia.track(aggregate=True, interval_sec=0.1)
+    def rarely_called():
+        pass
+
+    rarely_called()
+    deadline = time.time() + 5
+    while not mock_push_telemetry.called and time.time() < deadline:
+        time.sleep(0.01)
+
+    mock_push_telemetry.assert_called_once()
+    assert mock_push_telemetry.call_args[0][0].meta["aggregate"]["calls"] == 1
+
+
+# 5. Values fall in power-of-two millisecond buckets.
+def test_log_histogram_buckets():
+    histogram = LogHistogram()
+    for value_ms in [0.0, 0.3, 1.0, 1.5, 2.0, 3.0, 1000.0]:
+        histogram.record(value_ms)
+    assert histogram.buckets() == [
+        [2.0**-10, 1],
+        [0.5, 1],
+        [1.0, 1],
+        [2.0, 2],
+        [4.0, 1],
+        [1024.0, 1],
+    ]
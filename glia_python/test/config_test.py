@@ -1,6 +1,6 @@
 import os
-from unittest.mock import patch
-from glia_python import Glia, _global_config
+from unittest.mock import call, patch
+from glia_python import Glia, _flush_on_child_exit, _global_config
 from glia_python.tracker import JobTracker
 from glia_python.network import push_telemetry
 import pytest
@@ -25,6 +25,33 @@ def test_tracker_merges_config():
     assert tracker._user_meta["app_name"] == "env-app"
     assert tracker._user_meta["app_version"] == "2.0.0"
 
+@patch("glia_python.gcore.configure")
+def test_init_applies_core_settings(mock_configure):
+    Glia.init(app_name="init-app", core_settings={"batch_size": 500, "linger_ms": 100})
+    mock_configure.assert_called_once_with(batch_size=500, linger_ms=100)
+
+@patch("glia_python.gcore.configure")
+def test_init_without_core_settings_leaves_core_alone(mock_configure):
+    Glia.init(app_name="init-app")
+    mock_configure.assert_not_called()
+
+@patch("glia_python.gcore.stats")
+def test_stats_reads_core_counters(mock_stats):
+    assert Glia.stats() is mock_stats.return_value
+    mock_stats.assert_called_once_with()
+
+@patch("glia_python.multiprocessing.util.Finalize")
+def test_forked_children_flush_on_exit(mock_finalize):
+    import gcore
+    from glia_python.aggregate import flush_aggregates
+
+    _flush_on_child_exit(Glia)
+    # Aggregated summaries are queued before the queue is flushed
+    assert mock_finalize.call_args_list == [
+        call(None, flush_aggregates, exitpriority=1),
+        call(None, gcore.flush_queue, exitpriority=0),
+    ]
+
 def test_network_uses_merged_api_url():
     # If init is set, it overrides env
     with patch.dict(os.environ, {"GLIA_API_URL": "http://env-url"}):
@@ -1,8 +1,16 @@
 import pytest
 from glia_python import _global_config
+from glia_python.tracker import reset_identity_cache
 
 @pytest.fixture(autouse=True)
 def reset_global_config():
     _global_config.clear()
     yield
     _global_config.clear()
+
+@pytest.fixture(autouse=True)
+def reset_process_identity():
+    # Tests patch the process handle/platform per test; a cached identity would leak across them
+    reset_identity_cache()
+    yield
+    reset_identity_cache()
@@ -1,10 +1,9 @@
-import json
 from datetime import UTC, datetime
 from unittest.mock import patch
 
 import pytest
 from glia_python.JobMetrics import JobMetrics
-from glia_python.network import push_telemetry
+from glia_python.network import push_telemetry, push_telemetry_many
 
 import gcore
 
@@ -30,7 +29,7 @@ def create_sample_metrics() -> JobMetrics:
     )
 
 
-@patch("glia_python.network.gcore.enqueue_to_background")
+@patch("glia_python.network.gcore.enqueue_record")
 def test_push_telemetry_success(mock_queue):
     """Verify that metrics are correctly serialized and queued."""
     metrics = create_sample_metrics()
@@ -43,14 +42,14 @@ def test_push_telemetry_success(mock_queue):
     assert success is True
     mock_queue.assert_called_once()
 
-    json_payload = mock_queue.call_args.args[0]
-    payload = json.loads(json_payload)
-    assert payload[0]["run_id"] == "test-uuid"
-    assert payload[0]["wall_time_ms"] == 10000
+    record = mock_queue.call_args.args[0]
+    assert record["run_id"] == "test-uuid"
+    assert record["wall_time_ms"] == 10000
+    assert record["started_at"] == datetime(2026, 1, 1, 12, 0, 0, tzinfo=UTC)
 
 
 @patch("os.getenv")
-@patch("glia_python.network.gcore.enqueue_to_background")
+@patch("glia_python.network.gcore.enqueue_record")
 def test_push_telemetry_uses_env_var(mock_queue, mock_getenv):
     metrics = create_sample_metrics()
     mock_getenv.return_value = "http://env-var-url:9000"
@@ -66,7 +65,7 @@ def test_push_telemetry_uses_env_var(mock_queue, mock_getenv):
     # but the logic is what we want to test.
 
 
-@patch("glia_python.network.gcore.enqueue_to_background")
+@patch("glia_python.network.gcore.enqueue_record")
 def test_push_telemetry_fail_fast(mock_queue):
     metrics = create_sample_metrics()
 
@@ -79,6 +78,30 @@ def test_push_telemetry_fail_fast(mock_queue):
     mock_queue.assert_called_once()
 
 
+@patch("glia_python.network.gcore.enqueue_many")
+def test_push_telemetry_many_single_call(mock_queue):
+    """All records cross the FFI boundary in one call."""
+    metrics = [create_sample_metrics() for _ in range(3)]
+
+    success = push_telemetry_many(metrics, api_url="http://test-host:8000/ingest")
+
+    assert success is True
+    mock_queue.assert_called_once()
+    records = mock_queue.call_args.args[0]
+    assert [r["run_id"] for r in records] == ["test-uuid"] * 3
+
+
+@patch("glia_python.network.gcore.enqueue_many")
+def test_push_telemetry_many_fail_fast(mock_queue):
+    mock_queue.side_effect = RuntimeError("[CORE] no available capacity")
+
+    success = push_telemetry_many(
+        [create_sample_metrics()], api_url="http://test-host:8000/ingest"
+    )
+
+    assert success is False
+
+
 def test_rust_panic_caught():
     """Verify that a Rust panic doesn't crash the Python process."""
     with pytest.raises(RuntimeError, match="Intentional Rust panic caught"):
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import glia_python.process
+from glia_python.process import (
+    NativeProcess,
+    cgroup_counters,
+    process_handle,
+    tree_rss_kb,
+    usage,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_native_probe():
+    glia_python.process._native_available = None
+    yield
+    glia_python.process._native_available = None
+
+
+# 1. On Linux the native reader is used, and probed only once.
+@patch("glia_python.process.gcore")
+def test_native_reader_preferred(mock_gcore):
+    mock_gcore.process_usage.return_value = (8.0, 2.0, 1024)
+    assert isinstance(process_handle(), NativeProcess)
+    assert isinstance(process_handle(), NativeProcess)
+    mock_gcore.process_usage.assert_called_once()
+
+
+# 2. Elsewhere gcore raises OSError and psutil takes over.
+@patch("glia_python.process.gcore")
+def test_psutil_fallback(mock_gcore):
+    import psutil
+
+    mock_gcore.process_usage.side_effect = OSError("only on Linux")
+    assert isinstance(process_handle(), psutil.Process)
+
+
+# 3. The native handle answers the psutil calls trackers make, each from
+#    the one narrow reader it needs rather than a full process_metrics().
+@patch("glia_python.process.gcore")
+def test_native_process_matches_psutil_shape(mock_gcore):
+    mock_gcore.process_cpu_times.return_value = (8.0, 2.0, 0.5, 0.25)
+    mock_gcore.process_memory.return_value = (1024, 4096)
+    mock_gcore.process_io.return_value = (12, 7, 4096, 8192)
+    process = NativeProcess()
+
+    cpu = process.cpu_times()
+    assert (cpu.user, cpu.system) == (8.0, 2.0)
+    assert process.memory_info().rss == 1024 * 1024
+    io = process.io_counters()
+    assert (io.read_bytes, io.write_bytes, io.read_count, io.write_count) == (4096, 8192, 12, 7)
+    mock_gcore.process_metrics.assert_not_called()
+
+    mock_gcore.process_io.side_effect = OSError("/proc/self/io is not readable")
+    with pytest.raises(OSError):
+        process.io_counters()
+
+
+# 4. cgroup counters come only from the native reader, and only under cgroup v2.
+@patch("glia_python.process.gcore")
+def test_cgroup_counters(mock_gcore):
+    mock_gcore.process_cgroup.return_value = (30.5, 2, 0.25, 2048, 8192)
+    assert cgroup_counters(NativeProcess()) == {
+        "cpu_usage_sec": 30.5,
+        "nr_throttled": 2,
+        "throttled_sec": 0.25,
+        "memory_current_kb": 2048,
+        "memory_peak_kb": 8192,
+    }
+
+    mock_gcore.process_cgroup.return_value = None
+    assert cgroup_counters(NativeProcess()) is None
+    assert cgroup_counters(object()) is None
+
+
+# 5. A sampler tick is one snapshot: one gcore call, or one psutil oneshot().
+@patch("glia_python.process.gcore")
+def test_usage_snapshot(mock_gcore):
+    mock_gcore.process_usage.return_value = (8.0, 2.0, 1024)
+    assert usage(NativeProcess()) == (10.0, 1024)
+
+    process = MagicMock()
+    process.cpu_times.return_value = SimpleNamespace(user=1.5, system=0.5)
+    process.memory_info.return_value.rss = 2048 * 1024
+    assert usage(process) == (2.0, 2048)
+    process.oneshot.assert_called_once()
+
+
+# 6. Tree RSS sums the live descendants, from gcore or psutil.
+@patch("glia_python.process.gcore")
+def test_tree_rss(mock_gcore):
+    mock_gcore.process_tree_rss.return_value = (3072, 3)
+    assert tree_rss_kb(NativeProcess()) == 3072
+
+    process = MagicMock()
+    process.memory_info.return_value.rss = 1024 * 1024
+    child = MagicMock()
+    child.memory_info.return_value.rss = 2048 * 1024
+    gone = MagicMock()
+    gone.memory_info.side_effect = ProcessLookupError
+    process.children.return_value = [child, gone]
+    assert tree_rss_kb(process) == 3072
+    process.children.assert_called_once_with(recursive=True)
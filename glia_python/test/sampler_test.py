@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from glia_python import Glia
+from glia_python.sampler import MAX_SERIES_POINTS, BlockSamples, get_sampler
+
+
+@pytest.fixture(autouse=True)
+def mock_push_telemetry():
+    with patch("glia_python.tracker.push_telemetry") as mock_push:
+        yield mock_push
+
+
+# 1. Sampling is opt-in.
+def test_sampling_off_by_default():
+    with Glia.tracker(program_name="plain") as tracker:
+        pass
+    assert tracker.metrics.resources is None
+
+
+# 2. A sampled block reports its own peak and a time series.
+def test_sampled_block_reports_resources():
+    Glia.init(sample_interval_sec=0.01)
+    with Glia.tracker(program_name="sampled") as tracker:
+        ballast = bytearray(32 * 1024 * 1024)
+        time.sleep(0.2)
+        del ballast
+
+    resources = tracker.metrics.resources
+    assert resources["interval_sec"] == 0.01
+    assert resources["samples"] > 0
+    assert len(resources["series"]) > 0
+    assert resources["peak_rss_kb"] >= 32 * 1024
+    assert all(len(point) == 3 for point in resources["series"])
+
+
+# 3. Nested trackers share one sampler thread.
+@patch.dict(os.environ, {"GLIA_SAMPLE_INTERVAL_SEC": "0.01"})
+def test_nested_trackers_share_the_sampler():
+    with Glia.tracker(program_name="outer") as outer:
+        with Glia.tracker(program_name="inner") as inner:
+            time.sleep(0.05)
+    assert outer._sampler is inner._sampler is get_sampler(0.01)
+    assert outer.metrics.resources["samples"] >= inner.metrics.resources["samples"]
+
+
+# 4. A new interval is applied in place: one thread, no orphaned blocks.
+def test_interval_change_keeps_the_sampler():
+    Glia.init(sample_interval_sec=0.01)
+    with Glia.tracker(program_name="before") as before:
+        Glia.init(sample_interval_sec=0.02)
+        with Glia.tracker(program_name="after") as after:
+            time.sleep(0.1)
+
+    assert before._sampler is after._sampler
+    assert before._sampler.interval_sec == 0.02
+    assert before.metrics.resources["samples"] > 0
+    threads = [t for t in threading.enumerate() if t.name == "glia-resource-sampler"]
+    assert len(threads) == 1
+
+
+# 5. Long blocks are thinned out, but the peak survives.
+def test_series_is_downsampled():
+    block = BlockSamples(started_at=0.0, rss_kb=100)
+    for tick in range(1, 10_001):
+        block.add(float(tick), 50.0, 5000 if tick == 7777 else 200)
+
+    assert block.samples == 10_000
+    assert len(block.series) < MAX_SERIES_POINTS
+    assert block.peak_rss_kb == 5000
+    timestamps = [point[0] for point in block.series]
+    assert timestamps == sorted(timestamps)
+    assert timestamps[-1] > 9000
+
+
+# 6. With child accounting on, the sampler also follows the process tree.
+def test_sampler_tracks_process_tree_peak():
+    import subprocess
+    import sys
+
+    Glia.init(sample_interval_sec=0.01, include_children=True)
+    hungry_child = "import time\nballast = bytearray(64 * 1024 * 1024)\ntime.sleep(0.3)"
+    with Glia.tracker(program_name="pool") as tracker:
+        subprocess.run([sys.executable, "-c", hungry_child], check=True)
+
+    resources = tracker.metrics.resources
+    assert resources["children"]["peak_tree_rss_kb"] >= resources["peak_rss_kb"] + 64 * 1024
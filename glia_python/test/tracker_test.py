@@ -15,7 +15,7 @@ def mock_push_telemetry():
         yield mock_push
 
 
-def setup_system_mocks(mock_psutil, mock_time):
+def setup_system_mocks(mock_process_handle, mock_time):
     """
     Configures mocks for a standard run:
     - CPU Time: 0s start -> 10s end (8s user + 2s system)
@@ -23,7 +23,7 @@ def setup_system_mocks(mock_psutil, mock_time):
     Result: 50% CPU load.
     """
     mock_process = MagicMock()
-    mock_psutil.Process.return_value = mock_process
+    mock_process_handle.return_value = mock_process
 
     mock_process.cpu_times.side_effect = [
         MagicMock(user=0.0, system=0.0),  # Start
@@ -46,11 +46,11 @@ def setup_platform_ram(mock_sys, mock_resource, platform: str, usage_val: int):
 
 # 1. The tracker correctly captures CPU/Wall time and infers script name from mocked argv.
 @patch("glia_python.tracker.sys")
-@patch("glia_python.tracker.psutil")
+@patch("glia_python.tracker.process_handle")
 @patch("glia_python.tracker.time")
 @patch("glia_python.tracker.is_interactive", return_value=False)
-def test_context_manager_tracker(mock_is_int, mock_time, mock_psutil, mock_sys):
-    setup_system_mocks(mock_psutil, mock_time)
+def test_context_manager_tracker(mock_is_int, mock_time, mock_process_handle, mock_sys):
+    setup_system_mocks(mock_process_handle, mock_time)
     mock_sys.argv = ["/path/to/script.py", "--arg"]
 
     with Glia.tracker(program_name="test_job") as tracker:
@@ -64,11 +64,11 @@ def test_context_manager_tracker(mock_is_int, mock_time, mock_psutil, mock_sys):
 
 # 2. The @Glia.track decorator correctly initializes and runs.
 @patch("glia_python.tracker.sys")
-@patch("glia_python.tracker.psutil")
+@patch("glia_python.tracker.process_handle")
 @patch("glia_python.tracker.time")
 @patch("glia_python.tracker.is_interactive", return_value=False)
-def test_decorator_usage(mock_is_int, mock_time, mock_psutil, mock_sys):
-    setup_system_mocks(mock_psutil, mock_time)
+def test_decorator_usage(mock_is_int, mock_time, mock_process_handle, mock_sys):
+    setup_system_mocks(mock_process_handle, mock_time)
 
     mock_sys.argv = ["app.py"]
 
@@ -201,11 +201,11 @@ def test_mac_ram_conversion(mock_resource, mock_sys):
 
 # 11. RAM Conversion (Windows)
 @patch("glia_python.tracker.sys")
-@patch("glia_python.tracker.psutil")
-def test_windows_ram_conversion(mock_psutil, mock_sys):
+@patch("glia_python.tracker.process_handle")
+def test_windows_ram_conversion(mock_process_handle, mock_sys):
     mock_sys.platform = "win32"
     mock_sys.modules = {}
-    mock_psutil.Process.return_value.memory_info.return_value.rss = 52_428_800
+    mock_process_handle.return_value.memory_info.return_value.rss = 52_428_800
     tracker = JobTracker()
     assert tracker._get_peak_rss_kb() == 51200
 
@@ -226,3 +226,76 @@ def test_sha256_access_denied():
         tracker = JobTracker()
         sha = tracker._calculate_sha256(Path("secret.py"))
         assert sha == "access-denied"
+
+
+# 14. Process identity is built once and shared by later trackers
+@patch("glia_python.tracker.getpass")
+@patch("glia_python.tracker.process_handle")
+def test_identity_is_cached_across_trackers(mock_process_handle, mock_getpass):
+    first = JobTracker()
+    second = JobTracker()
+
+    mock_process_handle.assert_called_once()
+    mock_getpass.getuser.assert_called_once()
+    assert first.process is second.process
+
+
+# 15. A forked child (new pid) rebuilds the identity for itself
+@patch("glia_python.tracker.process_handle")
+def test_identity_is_rebuilt_after_fork(mock_process_handle):
+    with patch("glia_python.tracker.os.getpid", return_value=100):
+        JobTracker()
+    with patch("glia_python.tracker.os.getpid", return_value=200):
+        JobTracker()
+
+    assert mock_process_handle.call_count == 2
+
+
+# 16. The script is hashed once, then again only when it changes on disk
+@patch("glia_python.tracker.sys")
+@patch("glia_python.tracker.is_interactive", return_value=False)
+def test_script_is_rehashed_only_when_changed(mock_is_int, mock_sys, tmp_path):
+    script = tmp_path / "job.py"
+    script.write_bytes(b"print(1)\n")
+    mock_sys.argv = [str(script)]
+
+    with patch.object(
+        JobTracker, "_calculate_sha256", autospec=True, side_effect=JobTracker._calculate_sha256
+    ) as hasher:
+        first = JobTracker()
+        second = JobTracker()
+        assert hasher.call_count == 1
+
+        script.write_bytes(b"print(2)\nprint(3)\n")
+        third = JobTracker()
+        assert hasher.call_count == 2
+
+    assert first.script_sha256 == second.script_sha256
+    assert third.script_sha256 == hashlib.sha256(b"print(2)\nprint(3)\n").hexdigest()
+
+
+# 17. Child-process accounting is reported only when asked for
+def test_children_not_reported_by_default():
+    with Glia.tracker() as tracker:
+        pass
+    assert tracker.metrics.resources is None
+
+
+# 18. CPU burnt in a child shows up next to the self-only numbers
+def test_children_cpu_is_reported_alongside_self():
+    import subprocess
+    import sys
+
+    Glia.init(include_children=True)
+    busy_child = "import time\nend = time.process_time() + 0.3\nwhile time.process_time() < end: pass"
+    with Glia.tracker(program_name="shell_out") as tracker:
+        subprocess.run([sys.executable, "-c", busy_child], check=True)
+
+    metrics = tracker.metrics
+    children = metrics.resources["children"]
+    assert children["cpu_time_sec"] >= 0.25
+    assert children["cpu_time_sec_inclusive"] >= metrics.cpu_time_sec + 0.25
+    assert children["cpu_percent_inclusive"] > metrics.cpu_percent
+    assert children["lifetime_max_child_rss_kb"] > 0
+    # Without the sampler there is no live tree peak
+    assert "peak_tree_rss_kb" not in children
@@ -39,7 +39,7 @@ async def push_telemetry_direct(client, url, iteration, load_factor):
     try:
         start = time.perf_counter()
         response = await client.post(url, json=[payload])
-        if response.status_code != 201:
+        if response.status_code != 202:
             logger.warning(f"Error {response.status_code}: {response.text}")
         return response.status_code, time.perf_counter() - start
     except Exception as e:
@@ -63,7 +63,7 @@ async def run_benchmark(iterations, concurrency):
         results = await asyncio.gather(*tasks)
         total_duration = time.perf_counter() - start_time
 
-    successes = [r for r in results if r[0] == 201]
+    successes = [r for r in results if r[0] == 202]
     latencies = [r[1] for r in results if r[1] > 0]
     avg_latency_ms = (sum(latencies) / len(latencies)) * 1000 if latencies else 0
     throughput = len(successes) / total_duration
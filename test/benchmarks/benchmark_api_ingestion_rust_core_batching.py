@@ -16,9 +16,8 @@ if not API_URL:
     raise RuntimeError("GLIA_API_URL environment variable is not set.")
 
 
-def push_telemetry_core(url, iteration, load_factor):
-    """Uses gcore.enqueue_to_background to hit the FastAPI /ingest endpoint."""
-    payload = {
+def build_payload(iteration, load_factor):
+    return {
         "run_id": str(uuid.uuid4()),
         "hostname": "db-stress-node-gcore",
         "os_info": "Linux Performance-Test-Core",
@@ -36,6 +35,11 @@ def push_telemetry_core(url, iteration, load_factor):
         "meta": {"iteration": iteration, "load": load_factor},
     }
 
+
+def push_telemetry_core(url, iteration, load_factor):
+    """Uses gcore.enqueue_to_background to hit the FastAPI /ingest endpoint."""
+    payload = build_payload(iteration, load_factor)
+
     try:
         # enqueue_to_background is synchronous and adds to an internal Rust queue
         gcore.enqueue_to_background(json.dumps(payload), url)
@@ -45,12 +49,25 @@ def push_telemetry_core(url, iteration, load_factor):
         return False
 
 
-def run_benchmark(iterations):
+def push_telemetry_core_many(url, start, count, load_factor):
+    """Uses gcore.enqueue_many: one FFI call and one worker message per chunk."""
+    payloads = [build_payload(i, load_factor) for i in range(start, start + count)]
+
+    try:
+        return gcore.enqueue_many(payloads, url)
+    except Exception as e:
+        logger.error(f"Error queueing telemetry: {e}")
+        return 0
+
+
+def run_benchmark(iterations, mode="item", chunk_size=100):
     """
     Performance test for the 'Persistence Barrier' using gcore.
     Measures the time it takes to queue and then FLUSH all telemetry.
+    mode="many" hands jobs over in chunks of chunk_size via enqueue_many,
+    for comparison with the per-item path.
     """
-    logger.info(f"Starting DB stress test (via gcore): {iterations} writes")
+    logger.info(f"Starting DB stress test (via gcore, {mode}): {iterations} writes")
 
     # Set the queue limit via environment variable for the Rust gcore
     os.environ["CORE_QUEUE_LIMIT"] = str(iterations + 100)
@@ -58,10 +75,16 @@ def run_benchmark(iterations):
     start_time = time.perf_counter()
     
     success_count = 0
-    for i in range(iterations):
-        if push_telemetry_core(API_URL, i, iterations):
-            success_count += 1
-            
+    if mode == "many":
+        for start in range(0, iterations, chunk_size):
+            count = min(chunk_size, iterations - start)
+            success_count += push_telemetry_core_many(API_URL, start, count, iterations)
+    else:
+        for i in range(iterations):
+            if push_telemetry_core(API_URL, i, iterations):
+                success_count += 1
+    enqueue_duration_ms = (time.perf_counter() - start_time) * 1000
+
     # The actual "DB write" latency in this model is mostly in the FLUSH
     # because enqueue_to_background is just a memory push.
     logger.info(f"Queued {success_count} items. Flushing to DB...")
@@ -81,10 +104,11 @@ def run_benchmark(iterations):
     throughput = iterations / total_duration if total_duration > 0 else 0
 
     report = {
-        "metric_type": "backend_to_db_core",
+        "metric_type": "backend_to_db_core" + ("_many" if mode == "many" else ""),
         "load": iterations,
         "throughput": round(throughput, 2),
         "latency_ms": round(avg_latency_ms, 2),
+        "enqueue_duration_ms": round(enqueue_duration_ms, 2),
         "flush_duration_ms": round(flush_duration_ms, 2),
         "success_rate": round(success_rate, 2),
         "failed_jobs": summary.failed_jobs
@@ -103,5 +127,17 @@ if __name__ == "__main__":
         default=int(os.environ.get("CORE_QUEUE_LIMIT", "1000")),
         help="Number of iterations to run",
     )
+    parser.add_argument(
+        "--mode",
+        choices=["item", "many"],
+        default="item",
+        help="Per-item enqueue_to_background or bulk enqueue_many",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100,
+        help="Records per enqueue_many call",
+    )
     args = parser.parse_args()
-    run_benchmark(args.iterations)
+    run_benchmark(args.iterations, args.mode, args.chunk_size)
@@ -2,28 +2,54 @@ import argparse
 import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 from common.logs import setup_logger
-from glia_python.tracker import JobTracker
+from glia_python.tracker import JobTracker, reset_identity_cache
 
 logger = setup_logger("GLIA_PYTHON STRESS TEST")
 
 
-def run_benchmark(iterations):
+def track_jobs(indices: range, stress_load: int, cold_identity: bool = False) -> float:
+    """Returns the time spent constructing trackers, in seconds."""
+    init_time = 0.0
+    for i in indices:
+        if cold_identity:
+            # What every tracker paid before the identity cache
+            reset_identity_cache()
+        init_start = time.perf_counter()
+        tracker = JobTracker(program_name="stress_worker")
+        init_time += time.perf_counter() - init_start
+        with tracker:
+            tracker.log_metadata({"iteration": i, "stress_load": stress_load})
+            pass
+    return init_time
+
+
+def run_benchmark(iterations, threads=1, cold_identity=False):
     """
     Performance test for the 'Client-to-Core' inflection point.
     Target: Measure the delta introduced by JobTracker -> gcore hand-off.
+    With threads > 1 the jobs are tracked concurrently, which shows whether
+    the hand-off scales or serializes on the GIL.
+    With cold_identity the process identity cache is dropped before every
+    tracker, so the report shows what the cache saves per tracked job.
     """
     stress_load = iterations * 5
 
-    logger.info(f"Starting stress test: {iterations} jobs (Load Factor: {stress_load})")
+    logger.info(
+        f"Starting stress test: {iterations} jobs on {threads} threads "
+        f"(Load Factor: {stress_load})"
+    )
 
     start_time = time.perf_counter()
 
-    for i in range(iterations):
-        with JobTracker(program_name="stress_worker") as tracker:
-            tracker.log_metadata({"iteration": i, "stress_load": stress_load})
-            pass
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(track_jobs, range(t, iterations, threads), stress_load, cold_identity)
+            for t in range(threads)
+        ]
+        init_time = sum(future.result() for future in futures)
 
     end_time = time.perf_counter()
 
@@ -32,10 +58,13 @@ def run_benchmark(iterations):
     throughput = iterations / total_duration
 
     report = {
-        "metric_type": "client_to_core_python",
+        "metric_type": "client_to_core_python"
+        + (f"_{threads}_threads" if threads > 1 else "")
+        + ("_cold_identity" if cold_identity else ""),
         "load": iterations,
         "throughput": round(throughput, 2),
         "latency_ms": round(avg_overhead_ms, 4),
+        "tracker_init_ms": round((init_time / iterations) * 1000, 4),
         "success_rate": 1.0,
     }
 
@@ -52,5 +81,16 @@ if __name__ == "__main__":
         default=int(os.environ.get("CORE_QUEUE_LIMIT", "1000")),
         help="Number of iterations to run",
     )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=1,
+        help="Number of threads tracking jobs concurrently",
+    )
+    parser.add_argument(
+        "--cold-identity",
+        action="store_true",
+        help="Rebuild the process identity and script hash for every tracker",
+    )
     args = parser.parse_args()
-    run_benchmark(args.iterations)
+    run_benchmark(args.iterations, args.threads, args.cold_identity)
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import UTC, datetime
+
+from common.logs import setup_logger
+from sqlmodel import delete
+
+from backend.database import AsyncSessionLocal, engine
+from backend.ingest import bulk_insert_jobs
+from backend.models import Job, JobCreate
+
+logger = setup_logger("GLIA_DB BULK INSERT BENCHMARK")
+
+BENCHMARK_HOSTNAME = "db-bulk-insert-node"
+
+
+def build_batch(batch_size: int, round_index: int) -> list[JobCreate]:
+    now = datetime.now(UTC)
+    return [
+        JobCreate(
+            run_id=uuid.uuid4(),
+            hostname=BENCHMARK_HOSTNAME,
+            os_info="Linux Performance-Test",
+            user_name="stressed_user",
+            program_name="db_bulk_insert_worker",
+            started_at=now,
+            ended_at=now,
+            wall_time_ms=100,
+            cpu_time_sec=0.05,
+            cpu_percent=10.0,
+            max_rss_kb=51200,
+            exit_code_int=0,
+            argv=["--db-bulk-insert"],
+            script_sha256="db-bulk-insert-hash",
+            meta={"round": round_index, "index": i},
+        )
+        for i in range(batch_size)
+    ]
+
+
+async def insert_orm(batch: list[JobCreate]) -> None:
+    """The pre-bulk /ingest path: add_all, commit, then one refresh per row."""
+    async with AsyncSessionLocal() as session:
+        job_instances = [Job.model_validate(t) for t in batch]
+        session.add_all(job_instances)
+        await session.commit()
+        for job in job_instances:
+            await session.refresh(job)
+
+
+async def insert_bulk(batch: list[JobCreate]) -> None:
+    async with AsyncSessionLocal() as session:
+        await bulk_insert_jobs(session, batch)
+        await session.commit()
+
+
+INSERT_PATHS = {"orm": insert_orm, "bulk": insert_bulk}
+
+
+async def cleanup() -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Job).where(Job.hostname == BENCHMARK_HOSTNAME))
+        await session.commit()
+
+
+async def run_benchmark(batch_size: int, rounds: int, path: str):
+    """
+    Measures the DB write cost of one /ingest batch for a given insert path.
+    run_benchmarks.py sweeps ITERATIONS_LIST as the batch size, so running
+    this once per path yields the ORM vs bulk throughput curve.
+    """
+    logger.info(f"Starting bulk insert benchmark: path={path}, batch={batch_size}")
+    insert = INSERT_PATHS[path]
+
+    batches = [build_batch(batch_size, r) for r in range(rounds)]
+    latencies = []
+    try:
+        start_time = time.perf_counter()
+        for batch in batches:
+            batch_start = time.perf_counter()
+            await insert(batch)
+            latencies.append(time.perf_counter() - batch_start)
+        total_duration = time.perf_counter() - start_time
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+    total_jobs = batch_size * rounds
+    avg_latency_ms = (sum(latencies) / len(latencies)) * 1000 if latencies else 0
+
+    report = {
+        "metric_type": f"db_insert_{path}",
+        "load": batch_size,
+        "rounds": rounds,
+        "throughput": round(total_jobs / total_duration, 2),
+        "latency_ms": round(avg_latency_ms, 2),
+        "success_rate": 1.0,
+    }
+
+    print(f"REPORT_START{json.dumps(report)}REPORT_END")
+
+    logger.info("Bulk insert benchmark complete.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run DB insert path benchmark")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=int(os.environ.get("CORE_QUEUE_LIMIT", "1000")),
+        help="Number of jobs per batch",
+    )
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        default=5,
+        help="Number of batches to insert",
+    )
+    parser.add_argument(
+        "--path",
+        choices=sorted(INSERT_PATHS),
+        default="bulk",
+        help="Insert path to measure",
+    )
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.batch_size, args.rounds, args.path))
@@ -19,12 +19,24 @@ BENCHMARKS = [
         "name": "Client-to-Core (Python)",
         "cmd": "python benchmark_client_to_core_python.py",
     },
+    {
+        "name": "Client-to-Core (Python, 8 threads)",
+        "cmd": "python benchmark_client_to_core_python.py --threads 8",
+    },
+    {
+        "name": "Client-to-Core (Python, uncached identity)",
+        "cmd": "python benchmark_client_to_core_python.py --cold-identity",
+    },
     {
         "name": "Client-to-Core (R)",
         "cmd": "Rscript benchmark_client_to_core_r.r",
     },
     {"name": "API Ingestion (Python Async HTTP)", "cmd": "python benchmark_api_ingestion_python_async_http.py"},
     {"name": "API Ingestion (Rust Core Batching)", "cmd": "python benchmark_api_ingestion_rust_core_batching.py"},
+    {"name": "API Ingestion (Rust Core enqueue_many)", "cmd": "python benchmark_api_ingestion_rust_core_batching.py --mode many"},
+    # ITERATIONS_LIST doubles as the batch size sweep for the DB insert paths
+    {"name": "DB Insert (ORM add_all + refresh)", "cmd": "PYTHONPATH=../..:$PYTHONPATH python benchmark_db_ingestion_bulk_insert.py --path orm"},
+    {"name": "DB Insert (Bulk INSERT RETURNING)", "cmd": "PYTHONPATH=../..:$PYTHONPATH python benchmark_db_ingestion_bulk_insert.py --path bulk"},
 ]
 
 